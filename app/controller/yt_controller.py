@@ -1,10 +1,32 @@
 import os
+import mimetypes
+import json
+import time
+import asyncio
+import hashlib
+from functools import partial
+from datetime import datetime, timezone
 from pathlib import Path
-from fastapi import Form, APIRouter, Request, Query
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from typing import Optional
+from urllib.parse import quote
+from fastapi import Form, APIRouter, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
-from service.job_service import JobService
+from pydantic import BaseModel
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from service.job_service import JobService, job_queue, MAX_BATCH_SIZE
+from service.metrics import QUEUE_DEPTH, ACTIVE_WORKERS
+from models.job import JobStatus
+from service.job_events import job_events
 from utils.datetime_helper import format_datetime_utc
+from utils.file_response import build_file_response, content_disposition, etag_matches
+from utils.zip_stream import iter_zip
+from service.storage_manager import storage_manager
+from service.admission import admission_controller, AdmissionRejected
+from service.progressive import progressive_outputs
+from service.artifact_storage import artifact_storage
+from utils.url_helper import extract_playlist_id
+from utils.client_helper import submitter_id
 from random import random
 import math
 import subprocess
@@ -19,76 +41,298 @@ templates.env.filters['to_iso'] = format_datetime_utc
 DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+# 이벤트가 없을 때 연결 유지를 위해 보내는 heartbeat 간격 (초)
+STREAM_HEARTBEAT_INTERVAL = float(os.getenv("STREAM_HEARTBEAT_INTERVAL", "15"))
+
+# /api/jobs?since= 커서를 이만큼 앞당겨 발급 (초)
+# 다른 프로세스의 메모리에만 있는 변경(PROGRESS_FLUSH_INTERVAL)과 초 단위로 저장되는 DB 시각을 놓치지 않도록
+# 겹치게 조회하므로, 같은 변경이 다음 응답에 한 번 더 포함될 수 있음
+JOB_DELTA_OVERLAP = float(os.getenv("JOB_DELTA_OVERLAP", "5"))
+
+# 변환 중 스트리밍을 아직 시작할 수 없을 때 안내하는 재시도 대기 시간 (초)
+STREAM_RETRY_AFTER = 2
+
+def job_to_dict(job) -> dict:
+    return {
+        "job_id": job.job_id,
+        "batch_id": job.batch_id,
+        "priority": job.priority,
+        "status": job.status,
+        "progress": job.progress,
+        "speed": job.speed,
+        "eta": job.eta,
+        "title": job.title,
+        "filename": job.filename,
+        "error_message": job.error_message,
+        "version": job.version,
+        "created_at": format_datetime_utc(job.created_at) or None,
+        "updated_at": format_datetime_utc(job.updated_at) or None,
+        "completed_at": format_datetime_utc(job.completed_at) or None
+    }
+
+def versions_etag(versions: dict[str, int]) -> str:
+    """
+    작업 목록의 ETag (작업 ID와 버전의 해시)
+    """
+    signature = ",".join(f"{job_id}:{versions[job_id]}" for job_id in sorted(versions))
+    return '"' + hashlib.sha1(signature.encode()).hexdigest()[:20] + '"'
+
+def status_headers(etag: str) -> dict:
+    # 브라우저도 캐시된 응답을 쓰기 전에 항상 ETag로 재검증
+    return {"etag": etag, "cache-control": "no-cache"}
+
 @router.get("/ping", response_class=JSONResponse)
 async def ping():
     return {"pong": True}
 
+@router.get("/metrics")
+async def metrics():
+    # 큐 상태는 수집 시점에 갱신 (대기 작업 수는 모든 프로세스 기준, 실행 중 워커는 이 프로세스 기준)
+    QUEUE_DEPTH.set(await job_queue.depth())
+    ACTIVE_WORKERS.set(job_queue.active)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @router.get("/")
 async def home(request: Request):
     return templates.TemplateResponse(request, "index.html")
 
 @router.post("/convert")
-async def convert(request: Request, ext: str = Form(...), quality: str = Form(...), url: str = Form(...)):
-    # 백그라운드 작업 생성
-    job_id = await JobService.create_job(url, ext, quality)
+async def convert(request: Request, ext: str = Form(...), quality: str = Form(...), url: str = Form(...),
+                  priority: int = Form(0)):
+    # 재생목록 URL이나 여러 줄의 URL은 일괄 작업으로 생성
+    urls = [line.strip() for line in url.splitlines() if line.strip()]
+    submitter = submitter_id(request)
+    if len(urls) > MAX_BATCH_SIZE:
+        return templates.TemplateResponse(request, "error.html", {
+            "error_message": f"Too many URLs ({len(urls)} > {MAX_BATCH_SIZE})"
+        }, status_code=400)
+
+    # 과부하/속도 제한 시 작업을 만들지 않고 Retry-After와 함께 거절
+    prepaid = max(len(urls), 1)
+    try:
+        await admission_controller.admit(submitter, prepaid)
+    except AdmissionRejected as e:
+        return templates.TemplateResponse(request, "error.html", {"error_message": str(e)},
+                                          status_code=e.status_code, headers=e.headers)
+
+    if len(urls) == 1 and not extract_playlist_id(urls[0]):
+        # 백그라운드 작업 생성
+        job_id = await JobService.create_job(urls[0], ext, quality, submitter, priority)
+    else:
+        # 재생목록을 펼쳐 늘어난 작업 수만큼 추가로 수락 (만들지 못하면 먼저 수락한 몫은 돌려줌)
+        charged = prepaid
+        try:
+            expanded, source_url, durations = await JobService.expand_urls(urls)
+            await admission_controller.admit(submitter, len(expanded), prepaid=prepaid)
+            charged = max(len(expanded), prepaid)
+            await JobService.create_batch(expanded, ext, quality, source_url, submitter, priority, durations)
+        except AdmissionRejected as e:
+            admission_controller.refund(submitter, charged)
+            return templates.TemplateResponse(request, "error.html", {"error_message": str(e)},
+                                              status_code=e.status_code, headers=e.headers)
+        except (RuntimeError, ValueError) as e:
+            admission_controller.refund(submitter, charged)
+            return templates.TemplateResponse(request, "error.html", {"error_message": str(e)}, status_code=400)
     
     # 작업 상태 페이지로 리다이렉트
     return RedirectResponse(url=f"/jobs", status_code=303)
 
+class BatchRequest(BaseModel):
+    urls: list[str]
+    format: str
+    quality: str
+    priority: int = 0
+
+@router.post("/api/batch")
+async def create_batch_api(request: Request, batch: BatchRequest):
+    """
+    URL 목록(재생목록 URL 포함)으로 작업을 한 번에 생성
+    """
+    submitter = submitter_id(request)
+    if len(batch.urls) > MAX_BATCH_SIZE:
+        return JSONResponse({"error": f"Too many URLs ({len(batch.urls)} > {MAX_BATCH_SIZE})"}, status_code=400)
+
+    prepaid = max(len(batch.urls), 1)
+    try:
+        await admission_controller.admit(submitter, prepaid)
+    except AdmissionRejected as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status_code, headers=e.headers)
+
+    # 재생목록을 펼쳐 늘어난 작업 수만큼 추가로 수락 (만들지 못하면 먼저 수락한 몫은 돌려줌)
+    charged = prepaid
+    try:
+        urls, source_url, durations = await JobService.expand_urls(batch.urls)
+        await admission_controller.admit(submitter, len(urls), prepaid=prepaid)
+        charged = max(len(urls), prepaid)
+        batch_id, job_ids = await JobService.create_batch(
+            urls, batch.format, batch.quality, source_url,
+            submitter, batch.priority, durations
+        )
+    except AdmissionRejected as e:
+        admission_controller.refund(submitter, charged)
+        return JSONResponse({"error": str(e)}, status_code=e.status_code, headers=e.headers)
+    except (RuntimeError, ValueError) as e:
+        admission_controller.refund(submitter, charged)
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"batch_id": batch_id, "total": len(job_ids), "job_ids": job_ids}
+
+@router.get("/api/batch/{batch_id}")
+async def get_batch_api(batch_id: str):
+    """
+    일괄 작업의 집계 진행 상태 (개별 작업을 각각 조회하지 않아도 됨)
+    """
+    batch = await JobService.get_batch(batch_id)
+    if not batch:
+        return {"error": "Batch not found"}
+    return batch
+
 @router.get("/jobs")
-async def jobs_list(request: Request, page: int = 1, per_page: int = 10):
-    # 페이지 번호와 페이지당 항목 수 검증
-    page = max(1, page)
+async def jobs_list(request: Request, per_page: int = 10, after: Optional[int] = None,
+                    before: Optional[int] = None, last: bool = False, status: str = ""):
+    # 페이지당 항목 수와 상태 필터 검증
     if per_page not in [10, 20, 100]:
         per_page = 10
+    status_filter = JobStatus(status) if status in {s.value for s in JobStatus} else None
 
-    # 전체 작업 수와 페이지네이션된 작업 목록 가져오기
-    total_jobs, jobs = await JobService.get_paginated_jobs(page, per_page)
-
-    # 전체 페이지 수 계산
-    total_pages = (total_jobs + per_page - 1) // per_page
+    # 커서(after/before) 기준으로 작업 목록과 전체 작업 수 가져오기
+    job_page = await JobService.get_jobs_page(per_page, after=after, before=before, last=last, status=status_filter)
 
     return templates.TemplateResponse(request, "jobs.html", {
-        "jobs": jobs,
-        "page": page,
+        "jobs": job_page.jobs,
         "per_page": per_page,
-        "total_jobs": total_jobs,
-        "total_pages": total_pages
+        "status": status_filter.value if status_filter else "",
+        "total_jobs": job_page.total_count,
+        "next_cursor": job_page.next_cursor,
+        "prev_cursor": job_page.prev_cursor
     })
 
 @router.get("/api/job/{job_id}")
-async def get_job_api(job_id: str):
+async def get_job_api(request: Request, job_id: str):
+    """
+    작업 상태 - ETag(작업 버전)가 If-None-Match와 같으면 레코드를 읽지 않고 304
+    """
+    versions = await JobService.get_job_versions([job_id])
+    if job_id not in versions:
+        return {"error": "Job not found"}
+    etag = f'"{versions[job_id]}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=status_headers(etag))
+
     job = await JobService.get_job(job_id)
     if not job:
         return {"error": "Job not found"}
-
-    return {
-        "job_id": job.job_id,
-        "status": job.status,
-        "progress": job.progress,
-        "title": job.title,
-        "filename": job.filename,
-        "error_message": job.error_message,
-        "created_at": format_datetime_utc(job.created_at) or None,
-        "completed_at": format_datetime_utc(job.completed_at) or None
-    }
+    return JSONResponse(job_to_dict(job), headers=status_headers(f'"{job.version}"'))
 
 @router.get("/api/jobs")
-async def get_jobs_api(job_ids: list[str] = Query(default=[])):
+async def get_jobs_api(request: Request, job_ids: list[str] = Query(default=[]), since: Optional[int] = None):
+    """
+    여러 작업의 상태
+    - ETag(작업 ID/버전 목록의 해시)가 If-None-Match와 같으면 레코드를 읽지 않고 304
+    - since=<커서>이면 그 이후에 변경된 작업만 {"jobs": [...], "cursor": <다음 커서>}로 반환 (처음에는 since=0)
+    """
+    if since is not None:
+        # 조회 전에 다음 커서를 정해 조회 중에 바뀐 작업도 다음 응답에 포함
+        cursor = int((time.time() - JOB_DELTA_OVERLAP) * 1000)
+        jobs = await JobService.get_jobs(job_ids, since=datetime.fromtimestamp(since / 1000, timezone.utc))
+        return JSONResponse({"jobs": [job_to_dict(job) for job in jobs], "cursor": max(cursor, since)},
+                            headers={"cache-control": "no-store"})
+
+    versions = await JobService.get_job_versions(job_ids)
+    if not versions:
+        return {"error": "Jobs not found"}
+    etag = versions_etag(versions)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=status_headers(etag))
+
     jobs = await JobService.get_jobs(job_ids)
     if not jobs:
         return {"error": "Jobs not found"}
-    
-    return [{
-        "job_id": job.job_id,
-        "status": job.status,
-        "progress": job.progress,
-        "title": job.title,
-        "filename": job.filename,
-        "error_message": job.error_message,
-        "created_at": format_datetime_utc(job.created_at) or None,
-        "completed_at": format_datetime_utc(job.completed_at) or None
-    } for job in jobs]
+    etag = versions_etag({job.job_id: job.version for job in jobs})
+    return JSONResponse([job_to_dict(job) for job in jobs], headers=status_headers(etag))
+
+@router.get("/api/jobs/bundle")
+async def bundle_jobs_api(job_ids: list[str] = Query(default=[]), batch_id: Optional[str] = None):
+    """
+    완료된 작업들의 파일을 하나의 ZIP으로 묶어 스트리밍
+    - MP3/MP4는 이미 압축되어 있으므로 무압축(store)으로 묶음
+    - 임시 파일 없이 즉석에서 생성하며 파일 크기와 관계없이 메모리 사용량이 일정함
+    - 원격 저장소에만 있는 파일은 hot tier로 가져오지 않고 저장소에서 읽는 대로 ZIP에 기록
+    """
+    filenames = await JobService.get_completed_filenames(job_ids, batch_id)
+    if not filenames:
+        return JSONResponse({"error": "No completed jobs"}, status_code=404)
+
+    # 전송을 시작한 뒤에는 오류 응답을 보낼 수 없으므로 없는 파일이 있으면 미리 거절
+    # (전송 중에 읽을 수 없게 된 파일은 연결을 끊어 ZIP이 불완전함을 알림)
+    available = await asyncio.gather(*(artifact_storage.exists(filename) for filename in filenames))
+    missing = [filename for filename, exists in zip(filenames, available) if not exists]
+    if missing:
+        return JSONResponse({"error": "Some files are no longer available", "missing": missing}, status_code=409)
+
+    files = [(partial(artifact_storage.open_file, filename), filename) for filename in filenames]
+    bundle_name = f"yt-converter-{batch_id[:8] if batch_id else len(filenames)}.zip"
+    # 동기 제너레이터이므로 파일 읽기는 스레드풀에서 실행됨
+    return StreamingResponse(iter_zip(files), media_type="application/zip", headers={
+        "Content-Disposition": f'attachment; filename="{bundle_name}"'
+    })
+
+@router.get("/api/jobs/stream")
+async def stream_jobs_api(request: Request, job_ids: list[str] = Query(default=[])):
+    """
+    작업 상태 변경을 Server-Sent Events로 전달
+    - 연결 시 한 번만 DB를 조회해 현재 상태를 보내고, 이후에는 이벤트 버스로만 전달
+    - job_ids가 없으면 모든 작업의 이벤트를 전달
+    """
+    async def event_stream():
+        # 스냅샷 조회 전에 구독해야 그 사이의 변경을 놓치지 않음
+        async with job_events.subscribe(job_ids) as subscription:
+            if job_ids:
+                for job in await JobService.get_jobs(job_ids):
+                    yield f"event: job\ndata: {json.dumps(job_to_dict(job))}\n\n"
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=STREAM_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: job\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@router.websocket("/ws/jobs")
+async def jobs_websocket(websocket: WebSocket, job_ids: list[str] = Query(default=[])):
+    """
+    /api/jobs/stream과 같은 이벤트를 WebSocket으로 전달
+    """
+    await websocket.accept()
+    async with job_events.subscribe(job_ids) as subscription:
+        try:
+            if job_ids:
+                for job in await JobService.get_jobs(job_ids):
+                    await websocket.send_json(job_to_dict(job))
+
+            receiver = asyncio.ensure_future(websocket.receive())
+            try:
+                while True:
+                    getter = asyncio.ensure_future(subscription.get())
+                    done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter in done:
+                        await websocket.send_json(getter.result())
+                    else:
+                        getter.cancel()
+                    if receiver in done:
+                        if receiver.result()["type"] == "websocket.disconnect":
+                            break
+                        # 클라이언트 메시지는 무시하고 계속 대기
+                        receiver = asyncio.ensure_future(websocket.receive())
+            finally:
+                receiver.cancel()
+        except WebSocketDisconnect:
+            pass
 
 
 @router.delete("/api/job/{job_id}")
@@ -98,17 +342,76 @@ async def delete_job_api(job_id: str):
         return {"message": "Job deleted successfully"}
     return {"error": "Job not found or could not be deleted"}
 
+@router.post("/api/job/{job_id}/cancel")
+async def cancel_job_api(job_id: str):
+    """
+    대기/진행 중인 작업 취소 (실행 중인 yt-dlp/ffmpeg 프로세스 종료, 임시 파일 정리)
+    """
+    if await JobService.cancel_job(job_id):
+        return {"message": "Job cancelled"}
+    return JSONResponse({"error": "Job not found or already finished"}, status_code=409)
+
 @router.post("/api/job/{job_id}/retry")
-async def retry_job_api(job_id: str):
-    new_job_id = await JobService.retry_job(job_id)
+async def retry_job_api(request: Request, job_id: str):
+    new_job_id = await JobService.retry_job(job_id, submitter_id(request))
     if new_job_id:
         return {"message": "Job retry started", "new_job_id": new_job_id}
     return {"error": "Job not found or could not be retried"}
 
+@router.get("/api/job/{job_id}/stream")
+async def stream_job_output_api(job_id: str):
+    """
+    변환 중인 MP3를 만들어지는 대로 전송 (chunked, 변환이 끝날 때까지 파일 끝을 따라감)
+    - 같은 작업(합류한 작업 포함)을 보는 요청은 모두 하나의 변환 결과를 함께 읽음
+    - 이미 완료된 작업은 /download로 redirect
+    - 변환을 실행 중인 프로세스에서만 가능 (아직 시작 전이거나 다른 프로세스에서 실행 중이면 409)
+    """
+    output = progressive_outputs.get(job_id)
+    if output and output.streaming:
+        return StreamingResponse(progressive_outputs.read(output), media_type="audio/mpeg", headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no"
+        })
+
+    job = await JobService.get_job(job_id)
+    if not job:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    if job.status == JobStatus.COMPLETED and job.filename:
+        return RedirectResponse(f"/download/{quote(job.filename)}", status_code=307)
+    if job.status in (JobStatus.PENDING, JobStatus.PROCESSING):
+        return JSONResponse({"error": "Streaming is not available for this job yet"}, status_code=409,
+                            headers={"retry-after": str(STREAM_RETRY_AFTER)})
+    return JSONResponse({"error": "Job did not complete"}, status_code=409)
+
 @router.get("/download/{filename}")
-async def download(filename: str):
-    filepath = DOWNLOAD_DIR / filename
-    if filepath.exists():
-        return FileResponse(path=filepath, filename=filename, media_type='application/octet-stream')
-    return {"error": "파일이 존재하지 않음"}
+async def download(request: Request, filename: str):
+    # 임시 파일(.<id>.mp4)/메타데이터 캐시 디렉터리 등 숨김 파일은 제공하지 않음
+    if filename.startswith("."):
+        return JSONResponse({"error": "파일이 존재하지 않음"}, status_code=404)
+
+    # 로컬(hot tier)에 없으면 원격 저장소에서 redirect 또는 가져오면서 전달
+    # If-Range의 검증값은 로컬 파일 기준이므로 원격 저장소에는 Range를 넘기지 않음 (전체 전달)
+    artifact = await artifact_storage.open(
+        filename, range=request.headers.get("range") if "if-range" not in request.headers else None
+    )
+    if not artifact:
+        return JSONResponse({"error": "파일이 존재하지 않음"}, status_code=404)
+
+    # 용량 관리(LRU)를 위해 마지막 다운로드 시각 기록
+    await storage_manager.touch(filename)
+    if artifact.url:
+        return RedirectResponse(artifact.url, status_code=307)
+    if artifact.stream:
+        headers = {
+            "content-length": str(artifact.size),
+            "content-disposition": content_disposition(filename),
+            "accept-ranges": "bytes",
+            "cache-control": "private, max-age=0, must-revalidate"
+        }
+        if artifact.content_range:
+            headers["content-range"] = artifact.content_range
+        return StreamingResponse(artifact.stream, status_code=206 if artifact.content_range else 200,
+                                 media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+                                 headers=headers)
+    return build_file_response(request, artifact.path, filename, artifact.stat_result)
 
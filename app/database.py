@@ -1,11 +1,16 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from models.job import Base
+from service.metrics import instrument_engine
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///jobs.db")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# SQL 로그 출력 (디버깅용, 쿼리 시간은 /metrics로 확인)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+engine = create_async_engine(DATABASE_URL, echo=DB_ECHO)
+instrument_engine(engine)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def create_tables():
@@ -1,20 +1,60 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from controller import yt_controller
 from database import create_tables
+from service.job_service import job_queue
+from service.job_store import job_store
+from service.storage_manager import storage_manager
+from service.artifact_storage import artifact_storage
+from service.source_cache import source_cache
+from service.bandwidth import bandwidth_manager
+from service.ytdlp_runner import start_engine, stop_engine
+from service.metrics import HTTP_REQUEST_SECONDS
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 시작 시 데이터베이스 테이블 생성
     await create_tables()
+    # yt-dlp 실행 엔진 준비 (pool 엔진이면 프로세스 풀을 미리 띄움)
+    await start_engine()
+    # 진행 중인 작업 상태를 주기적으로 DB에 반영
+    await job_store.start()
+    # 원격 저장소 업로드 (STORAGE_BACKEND=s3일 때만, 이전 실행에서 남은 업로드도 이어서 진행)
+    await artifact_storage.start()
+    # DOWNLOAD_DIR 용량/보관 기간 관리
+    await storage_manager.start()
+    # 이전 실행에서 남은 원본 스트림 캐시 정리
+    await source_cache.start()
+    # 다운로드 대역폭 관리 프록시 (DOWNLOAD_BANDWIDTH_LIMIT가 있을 때만)
+    await bandwidth_manager.start()
+    # 이전 실행에서 남은 작업 복구 및 워커 시작
+    await job_queue.start()
     yield
-    # 종료 시 정리 작업 (필요한 경우)
+    # 종료 시 워커 정리 후 남은 변경 사항 반영
+    await job_queue.stop()
+    await job_store.stop()
+    await storage_manager.stop()
+    await artifact_storage.stop()
+    await bandwidth_manager.stop()
+    await stop_engine()
 
 app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    # 요청 처리 시간 (경로 파라미터가 아닌 라우트 경로 기준으로 집계)
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route else "unmatched", str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
 load_dotenv()
 app.include_router(yt_controller.router)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Index, literal_column, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -11,20 +11,82 @@ class JobStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    EXPIRED = "expired"  # 용량 관리로 파일이 삭제됨 (재변환 가능)
+    CANCELLED = "cancelled"  # 사용자가 취소함 (재변환 가능)
 
 class ConversionJob(Base):
     __tablename__ = "conversion_jobs"
+    __table_args__ = (
+        # /jobs 키셋 페이지네이션 (최신순, 전체/상태별)
+        Index("ix_conversion_jobs_created_at_id", "created_at", "id"),
+        Index("ix_conversion_jobs_status_created_at_id", "status", "created_at", "id"),
+        # 스케줄러 후보 조회 (상태별, 요청자별 우선순위 내림차순/생성 순 - ORDER BY와 같은 순서라 LIMIT에서 멈춤)
+        Index("ix_conversion_jobs_status_submitter_priority",
+              "status", "submitter", text("priority DESC"), "created_at", "id"),
+        # 수락 제어의 최근 처리량 조회 (완료 시각 범위)
+        Index("ix_conversion_jobs_completed_at", "completed_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(String(36), unique=True, index=True)  # UUID
     url = Column(Text, nullable=False)
+    video_id = Column(String(32), nullable=True, index=True)  # YouTube 영상 ID (캐시 키)
+    batch_id = Column(String(36), nullable=True, index=True)  # 일괄/재생목록 요청으로 생성된 경우 ConversionBatch.batch_id
     format = Column(String(10), nullable=False)  # mp3, mp4
     quality = Column(String(10), nullable=False)  # 320, 1080, etc
+    submitter = Column(String(64), nullable=True)  # 요청자 (클라이언트 IP 또는 API 키 해시, 공정 분배 기준)
+    priority = Column(Integer, default=0, server_default="0", nullable=False)  # 클수록 먼저 실행
+    duration = Column(Integer, nullable=True)  # 영상 길이 (초, 메타데이터에서 얻은 경우 SJF 기준)
     title = Column(String(500), nullable=True)  # YouTube video title
     filename = Column(String(255), nullable=True)
+    file_size = Column(BigInteger, nullable=True)  # 결과 파일 크기 (bytes)
+    last_downloaded_at = Column(DateTime(timezone=True), nullable=True)  # 마지막 다운로드 시각 (용량 관리 LRU 기준)
     status = Column(String(20), default=JobStatus.PENDING)
     progress = Column(Integer, default=0)  # 0-100%
+    speed = Column(Integer, nullable=True)  # 다운로드 속도 (bytes/s)
+    eta = Column(Integer, nullable=True)  # 남은 예상 시간 (초)
     error_message = Column(Text, nullable=True)
+    stage_timings = Column(Text, nullable=True)  # 단계별 소요 시간 JSON (초, queue_wait/metadata/download/postprocess/total)
+    claimed_by = Column(String(64), nullable=True)  # 작업을 점유한 워커 ID
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # 점유 만료 시각 (heartbeat로 연장)
+    # 변경될 때마다 1씩 증가 (상태 API의 ETag 기준, UPDATE 문에 값을 지정하지 않으면 자동 증가)
+    version = Column(Integer, default=0, server_default="0", nullable=False,
+                     onupdate=literal_column("version") + 1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
-    completed_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class ConversionBatch(Base):
+    """
+    일괄 변환 요청 (URL 목록 또는 재생목록)
+    소속 작업은 ConversionJob.batch_id로 연결됨
+    """
+    __tablename__ = "conversion_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(36), unique=True, index=True)  # UUID
+    source_url = Column(Text, nullable=True)  # 재생목록 URL (URL 목록으로 요청한 경우 None)
+    format = Column(String(10), nullable=False)
+    quality = Column(String(10), nullable=False)
+    total = Column(Integer, nullable=False)  # 소속 작업 수
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ConversionArtifact(Base):
+    """
+    변환 결과 파일 캐시 인덱스
+    같은 (video_id, format, quality) 요청은 이 파일을 공유하며,
+    ref_count는 이 파일을 참조하는 작업 수
+    """
+    __tablename__ = "conversion_artifacts"
+    __table_args__ = (
+        Index("ix_conversion_artifacts_key", "video_id", "format", "quality"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(String(32), nullable=False)
+    format = Column(String(10), nullable=False)
+    quality = Column(String(10), nullable=False)
+    title = Column(String(500), nullable=True)
+    filename = Column(String(255), unique=True, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,214 @@
+import asyncio
+import math
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import select, func
+from models.job import ConversionJob, JobStatus
+from database import async_session
+from service.scheduler import SCHEDULER_DEFAULT_DURATION
+from service.metrics import ADMISSION_REJECTED
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+
+# 대기 작업(PENDING, 모든 프로세스 기준)이 이 수를 넘으면 새 작업을 받지 않음 (0이면 제한 없음)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "1000"))
+
+# DOWNLOAD_DIR의 남은 공간이 이보다 적으면 새 작업을 받지 않음 (bytes, 0이면 확인 안 함)
+ADMISSION_MIN_FREE_BYTES = int(os.getenv("ADMISSION_MIN_FREE_BYTES", str(1024 ** 3)))
+
+# 디스크 공간 부족 시 안내하는 재시도 대기 시간 (초) - 보관 기간/용량 관리로 공간이 확보되기를 기다림
+ADMISSION_DISK_RETRY_AFTER = int(os.getenv("ADMISSION_DISK_RETRY_AFTER", "300"))
+
+# 큐 상태/디스크 공간 조회 결과를 재사용하는 시간 (초) - 요청이 몰려도 DB 조회는 이 간격으로 한 번
+ADMISSION_CHECK_INTERVAL = float(os.getenv("ADMISSION_CHECK_INTERVAL", "1"))
+
+# 재시도 대기 시간 계산에 쓰는 처리량 측정 구간 (초)
+ADMISSION_THROUGHPUT_WINDOW = float(os.getenv("ADMISSION_THROUGHPUT_WINDOW", "300"))
+
+# 요청자별 작업 생성 속도 제한 (token bucket) - 분당 작업 수 / 버킷 크기 (0이면 제한 없음)
+# 버킷보다 큰 일괄 요청은 버킷이 가득 찼을 때 받고 넘는 만큼은 이후 요청을 늦춰 갚음 (요청 크기 상한은 MAX_BATCH_SIZE)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+
+# 보관하는 요청자별 버킷 수 상한 (넘으면 가득 찬 버킷부터 정리)
+RATE_LIMIT_MAX_CLIENTS = 10000
+
+# Retry-After 범위 (초)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 3600
+
+
+class AdmissionRejected(Exception):
+    """
+    과부하/속도 제한으로 요청을 거절
+    status_code: 429(요청자 속도 제한) 또는 503(서비스 포화)
+    retry_after: 다시 시도할 때까지 기다릴 시간 (초, 기다려도 받을 수 없는 요청이면 None)
+    """
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[int]):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, retry_after)) if retry_after is not None else None
+
+    @property
+    def headers(self) -> dict:
+        return {"retry-after": str(self.retry_after)} if self.retry_after is not None else {}
+
+
+@dataclass
+class TokenBucket:
+    tokens: float
+    updated: float
+
+
+@dataclass
+class LoadSnapshot:
+    pending: int
+    processing: int
+    free_bytes: Optional[int]
+    completed: int  # 최근 ADMISSION_THROUGHPUT_WINDOW 동안 완료된 작업 수 (처리량)
+    checked_at: float
+
+
+class AdmissionController:
+    """
+    /convert, /api/batch 요청의 수락 여부 결정
+    1. 요청자별 token bucket 속도 제한 -> 429
+    2. DOWNLOAD_DIR 남은 공간 -> 503
+    3. 대기 작업 수 -> 503 (Retry-After는 최근 처리량 또는 실행 중인 작업 수로 계산)
+    거절된 요청은 토큰을 소비하지 않음
+    """
+
+    def __init__(self, max_queue: int = ADMISSION_MAX_QUEUE, min_free_bytes: int = ADMISSION_MIN_FREE_BYTES,
+                 rate_per_minute: float = RATE_LIMIT_PER_MINUTE, burst: int = RATE_LIMIT_BURST):
+        self.max_queue = max_queue
+        self.min_free_bytes = min_free_bytes
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._snapshot: Optional[LoadSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    async def admit(self, client: Optional[str], jobs: int = 1, prepaid: int = 0):
+        """
+        jobs개의 작업을 새로 만들어도 되는지 확인하고 작업 수만큼 속도 제한 토큰을 소비
+        버킷 크기보다 큰 요청은 버킷이 가득 차 있으면 받고 토큰을 음수까지 소비 (다음 요청은 그만큼 늦게 받음)
+        prepaid: 같은 요청에서 이미 수락된 작업 수 (재생목록을 펼치기 전에 URL 수만큼 먼저 수락한 경우)
+
+        Raises:
+            AdmissionRejected: 속도 제한 초과 또는 서비스 포화
+        """
+        cost = max(jobs - prepaid, 0)
+        bucket = self._refill(client)
+        # 먼저 수락한 몫을 포함해 요청 전체가 필요로 하는 토큰 (버킷 크기까지만)
+        needed = min(jobs, self.burst) - prepaid
+        if bucket and cost and bucket.tokens < needed:
+            ADMISSION_REJECTED.labels("rate_limit").inc()
+            raise AdmissionRejected(
+                429, "Too many requests, please slow down",
+                math.ceil((needed - bucket.tokens) / self.rate)
+            )
+
+        snapshot = await self._load()
+        if self.min_free_bytes and snapshot.free_bytes is not None and snapshot.free_bytes < self.min_free_bytes:
+            ADMISSION_REJECTED.labels("disk").inc()
+            raise AdmissionRejected(503, "Server is low on disk space, please try again later",
+                                    ADMISSION_DISK_RETRY_AFTER)
+
+        if self.max_queue and snapshot.pending + cost > self.max_queue:
+            ADMISSION_REJECTED.labels("queue").inc()
+            excess = snapshot.pending + cost - self.max_queue
+            raise AdmissionRejected(503, "Server is busy, please try again later",
+                                    self._drain_seconds(excess, snapshot))
+
+        if bucket:
+            bucket.tokens -= cost
+        # 방금 받은 작업도 다음 판단에 반영 (조회 결과를 재사용하는 동안 한도를 넘지 않도록)
+        snapshot.pending += cost
+
+    def refund(self, client: Optional[str], jobs: int):
+        """
+        수락했지만 만들지 못한 작업(재생목록 추출 실패, 추가 수락 거절 등)의 토큰을 돌려줌
+        """
+        bucket = self._refill(client)
+        if bucket:
+            bucket.tokens = min(self.burst, bucket.tokens + jobs)
+        if self._snapshot:
+            self._snapshot.pending = max(self._snapshot.pending - jobs, 0)
+
+    def _refill(self, client: Optional[str]) -> Optional[TokenBucket]:
+        if not self.rate or not client:
+            return None
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if not bucket:
+            if len(self._buckets) >= RATE_LIMIT_MAX_CLIENTS:
+                self._prune(now)
+            bucket = self._buckets[client] = TokenBucket(tokens=self.burst, updated=now)
+            return bucket
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        return bucket
+
+    def _prune(self, now: float):
+        # 다시 가득 찼을 버킷은 새로 만든 것과 같으므로 삭제
+        for client, bucket in list(self._buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst:
+                del self._buckets[client]
+
+    async def _load(self) -> LoadSnapshot:
+        """
+        대기/실행 중인 작업 수, 최근 처리량, 남은 디스크 공간 (ADMISSION_CHECK_INTERVAL 동안 재사용)
+        """
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot and time.monotonic() - snapshot.checked_at < ADMISSION_CHECK_INTERVAL:
+                return snapshot
+
+            async with async_session() as session:
+                result = await session.execute(
+                    select(ConversionJob.status, func.count())
+                    .where(ConversionJob.status.in_([JobStatus.PENDING, JobStatus.PROCESSING]))
+                    .group_by(ConversionJob.status)
+                )
+                counts = dict(result.all())
+                completed = 0
+                if self.max_queue:
+                    since = datetime.now(timezone.utc) - timedelta(seconds=ADMISSION_THROUGHPUT_WINDOW)
+                    result = await session.execute(
+                        select(func.count())
+                        .select_from(ConversionJob)
+                        .where(ConversionJob.completed_at >= since)
+                    )
+                    completed = result.scalar_one()
+            free_bytes = None
+            if self.min_free_bytes:
+                free_bytes = (await asyncio.to_thread(shutil.disk_usage, DOWNLOAD_DIR)).free
+
+            self._snapshot = LoadSnapshot(
+                pending=counts.get(JobStatus.PENDING, 0),
+                processing=counts.get(JobStatus.PROCESSING, 0),
+                free_bytes=free_bytes,
+                completed=completed,
+                checked_at=time.monotonic()
+            )
+            return self._snapshot
+
+    @staticmethod
+    def _drain_seconds(excess: int, snapshot: LoadSnapshot) -> int:
+        """
+        대기 작업이 excess개 줄어드는 데 걸릴 예상 시간
+        최근 ADMISSION_THROUGHPUT_WINDOW 동안의 완료 수로 처리량을 구하고,
+        완료 기록이 없으면 실행 중인 작업 수(전체 워커)와 기본 영상 길이로 추정
+        """
+        if snapshot.completed:
+            return math.ceil(excess * ADMISSION_THROUGHPUT_WINDOW / snapshot.completed)
+        return math.ceil(excess * SCHEDULER_DEFAULT_DURATION / max(snapshot.processing, 1))
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,127 @@
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.job import ConversionArtifact
+from database import async_session
+from service.artifact_storage import artifact_storage
+
+# (video_id, format, quality)
+CacheKey = tuple[str, str, str]
+
+
+class InflightConversion:
+    """
+    진행 중인 변환 작업과 그 결과를 기다리는 작업 목록
+    """
+
+    def __init__(self, leader_job_id: str):
+        self.leader_job_id = leader_job_id
+        self.followers: list[str] = []
+
+    @property
+    def job_ids(self) -> list[str]:
+        return [self.leader_job_id, *self.followers]
+
+
+class ArtifactCache:
+    """
+    (video_id, format, quality) 기준 변환 결과 캐시
+    - 완료된 파일이 있으면 새 작업은 yt-dlp 실행 없이 같은 파일을 참조
+    - 같은 변환이 진행 중이면 새 작업은 그 변환에 합류 (yt-dlp는 한 번만 실행)
+    - 파일은 참조하는 작업이 모두 삭제되었을 때만 지움
+    """
+
+    def __init__(self):
+        self._inflight: dict[CacheKey, InflightConversion] = {}
+
+    async def acquire(self, key: CacheKey) -> Optional[ConversionArtifact]:
+        """
+        완료된 변환 파일을 찾아 참조 수를 증가시킴
+        DB에는 있지만 파일이 사라진 항목은 정리하고 None 반환
+        """
+        async with async_session() as session:
+            result = await session.execute(
+                select(ConversionArtifact)
+                .where(ConversionArtifact.video_id == key[0])
+                .where(ConversionArtifact.format == key[1])
+                .where(ConversionArtifact.quality == key[2])
+                .order_by(ConversionArtifact.id.desc())
+            )
+            for artifact in result.scalars().all():
+                if await artifact_storage.exists(artifact.filename):
+                    await session.execute(
+                        update(ConversionArtifact)
+                        .where(ConversionArtifact.id == artifact.id)
+                        .values(ref_count=ConversionArtifact.ref_count + 1)
+                    )
+                    await session.commit()
+                    return artifact
+                await session.delete(artifact)
+            await session.commit()
+        return None
+
+    def store(self, session: AsyncSession, key: CacheKey, filename: str, title: Optional[str], ref_count: int):
+        """
+        새로 변환된 파일을 캐시에 등록 (호출한 쪽의 트랜잭션에서 함께 커밋됨)
+        """
+        session.add(ConversionArtifact(
+            video_id=key[0],
+            format=key[1],
+            quality=key[2],
+            title=title,
+            filename=filename,
+            ref_count=ref_count
+        ))
+
+    async def release(self, session: AsyncSession, filename: str) -> bool:
+        """
+        파일 참조 수를 감소시키고, 파일을 지워도 되는지 반환
+        캐시에 등록되지 않은 파일은 해당 작업만 사용하므로 True
+        """
+        result = await session.execute(
+            select(ConversionArtifact).where(ConversionArtifact.filename == filename)
+        )
+        artifact = result.scalar_one_or_none()
+        if not artifact:
+            return True
+
+        artifact.ref_count -= 1
+        if artifact.ref_count > 0:
+            return False
+        await session.delete(artifact)
+        return True
+
+    def attach(self, key: CacheKey, job_id: str) -> bool:
+        """
+        같은 변환이 진행 중이면 job_id를 합류시키고 True 반환
+        """
+        inflight = self._inflight.get(key)
+        if not inflight:
+            return False
+        inflight.followers.append(job_id)
+        return True
+
+    def detach(self, job_id: str) -> bool:
+        """
+        삭제/취소된 작업을 진행 중인 변환의 대기 목록에서 제거하고, 대기 중이었는지 반환
+        """
+        for inflight in self._inflight.values():
+            if job_id in inflight.followers:
+                inflight.followers.remove(job_id)
+                return True
+        return False
+
+    def begin(self, key: CacheKey, job_id: str) -> InflightConversion:
+        inflight = InflightConversion(job_id)
+        self._inflight[key] = inflight
+        return inflight
+
+    def end(self, key: CacheKey, inflight: InflightConversion):
+        """
+        진행 중 목록에서 제거 (이후 들어오는 작업은 합류하지 않고 캐시 조회부터 시작)
+        """
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+
+
+artifact_cache = ArtifactCache()
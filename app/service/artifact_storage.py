@@ -0,0 +1,542 @@
+import asyncio
+import fcntl
+import logging
+import mimetypes
+import os
+import stat
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+from service.progressive import ProgressiveOutputs, ProgressiveOutput
+from service.metrics import STORAGE_UPLOADS, HOT_TIER_REQUESTS
+from utils.file_response import content_disposition
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+
+# 변환 결과 파일 저장소
+#   local: DOWNLOAD_DIR에만 보관
+#   s3: DOWNLOAD_DIR은 최근 파일을 두는 로컬 hot tier로 쓰고, 모든 파일을 S3 호환 저장소(AWS S3, MinIO 등)에 업로드
+#       인증 정보는 boto3 기본 방식(AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY 환경 변수 등)을 사용
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # MinIO 등 (비우면 AWS)
+S3_REGION = os.getenv("S3_REGION", "")
+
+# 로컬에 없는 파일의 다운로드 방식
+#   redirect: 서명된 URL(presigned URL)로 redirect하여 클라이언트가 저장소에서 직접 받음
+#   proxy: 저장소에서 hot tier로 가져오면서 그대로 전달 (이후 요청은 로컬 파일로 응답)
+S3_DOWNLOAD_MODE = os.getenv("S3_DOWNLOAD_MODE", "redirect").lower()
+
+# 서명된 URL 유효 시간 (초)
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "3600"))
+
+# multipart 업로드 조각 크기 (bytes) - 이보다 큰 파일은 조각 단위로 읽어 올림 (파일 전체를 메모리에 올리지 않음)
+S3_MULTIPART_CHUNK_SIZE = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", str(16 * 1024 * 1024)))
+
+# 동시에 업로드하는 파일 수 / 파일 하나의 동시 업로드 조각 수
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "2"))
+S3_UPLOAD_PART_CONCURRENCY = int(os.getenv("S3_UPLOAD_PART_CONCURRENCY", "4"))
+
+# 업로드 실패 시 다시 시도하기까지 기다리는 시간 (초)
+S3_UPLOAD_RETRY_DELAY = float(os.getenv("S3_UPLOAD_RETRY_DELAY", "60"))
+
+# 로컬 hot tier 최대 용량 (bytes, 0이면 제한 없음) - 넘으면 업로드가 끝난 파일부터 가장 오래 쓰지 않은 순으로 로컬에서 삭제
+HOT_TIER_BUDGET_BYTES = int(os.getenv("HOT_TIER_BUDGET_BYTES", str(10 * 1024 ** 3)))
+
+# 저장소에서 가져올 때 한 번에 읽는 크기
+FETCH_CHUNK_SIZE = 1024 * 1024
+
+# 저장소에서 가져오는 중인 파일 이름 앞에 붙는 접두사 (숨김 파일이므로 /download에서 제공하지 않음)
+FETCH_PREFIX = ".fetch-"
+
+# 이 시간(초) 동안 기록되지 않은 가져오기 파일은 중단된 것으로 보고 시작 시 삭제 (다른 프로세스가 가져오는 중인 파일은 유지)
+FETCH_STALE_SECONDS = 300
+
+# 시작 시 복구(hot tier 목록 구성, 업로드되지 않은 파일 업로드)를 맡을 프로세스를 정하는 잠금 파일
+RECOVER_LOCK_FILE = ".storage-recover.lock"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredArtifact:
+    """
+    다운로드 요청에 응답할 방법 (셋 중 하나)
+    path/stat_result: 로컬 파일
+    url: 저장소에서 직접 받는 서명된 URL
+    stream: 저장소에서 받는 대로 전달하는 본문, size는 본문 크기
+            content_range가 있으면 Range 요청에 대한 부분 응답(206)
+    """
+    path: Optional[Path] = None
+    stat_result: Optional[os.stat_result] = None
+    url: Optional[str] = None
+    stream: Optional[AsyncIterator[bytes]] = None
+    size: Optional[int] = None
+    content_range: Optional[str] = None
+
+
+class ArtifactStorage(ABC):
+    """
+    변환 결과 파일 저장소 (STORAGE_BACKEND로 선택)
+    변환 결과는 항상 DOWNLOAD_DIR에 만들어진 뒤 store()로 등록됨
+    """
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def store(self, filename: str, size: int):
+        """
+        DOWNLOAD_DIR에 새로 만들어진 파일을 등록
+        """
+
+    @abstractmethod
+    async def open(self, filename: str, range: Optional[str] = None) -> Optional[StoredArtifact]:
+        """
+        다운로드 응답에 사용할 파일 (없으면 None)
+        range: 요청의 Range 헤더 (로컬 파일 응답은 FileResponse가 요청에서 직접 처리)
+        """
+
+    @abstractmethod
+    def open_file(self, filename: str) -> tuple[BinaryIO, float]:
+        """
+        파일을 처음부터 순서대로 읽는 스트림과 수정 시각 (ZIP 묶음 등, 블로킹이므로 스레드에서 호출)
+
+        Raises:
+            OSError: 파일이 없거나 읽을 수 없음
+        """
+
+    @abstractmethod
+    async def exists(self, filename: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def delete(self, filename: str) -> bool:
+        """
+        파일을 삭제하고 로컬 파일이 있었는지 반환
+        """
+
+
+class LocalStorage(ArtifactStorage):
+    """
+    변환 결과를 DOWNLOAD_DIR에만 보관하는 저장소 (기본)
+    """
+
+    async def store(self, filename: str, size: int):
+        pass
+
+    async def open(self, filename: str, range: Optional[str] = None) -> Optional[StoredArtifact]:
+        path = DOWNLOAD_DIR / filename
+        # 파일 정보 조회는 이벤트 루프를 막지 않도록 스레드에서 실행
+        try:
+            stat_result = await asyncio.to_thread(os.stat, path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return StoredArtifact(path=path, stat_result=stat_result)
+
+    def open_file(self, filename: str) -> tuple[BinaryIO, float]:
+        file = open(DOWNLOAD_DIR / filename, "rb")
+        return file, os.fstat(file.fileno()).st_mtime
+
+    async def exists(self, filename: str) -> bool:
+        return await asyncio.to_thread((DOWNLOAD_DIR / filename).is_file)
+
+    async def delete(self, filename: str) -> bool:
+        path = DOWNLOAD_DIR / filename
+        try:
+            await asyncio.to_thread(path.unlink)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+@dataclass
+class HotFile:
+    size: int
+    uploaded: bool  # 저장소에 올라가 있어 로컬에서 지워도 되는지
+
+
+class S3Storage(ArtifactStorage):
+    """
+    S3 호환 저장소 + 로컬 hot tier (DOWNLOAD_DIR의 파일은 LocalStorage로 다룸)
+    - 새로 만든 파일은 DOWNLOAD_DIR에 둔 채 백그라운드에서 업로드 (boto3 multipart, 파일에서 조각 단위로 읽어 전송)
+    - hot tier가 HOT_TIER_BUDGET_BYTES를 넘으면 업로드가 끝난 파일부터 LRU 순으로 로컬에서 삭제
+    - 로컬에 없는 파일은 S3_DOWNLOAD_MODE에 따라 서명된 URL로 redirect하거나
+      hot tier로 가져오면서 전달 (같은 파일을 동시에 요청해도 한 번만 가져옴)
+    - hot tier 목록은 프로세스마다 관리하고 시작 시 DOWNLOAD_DIR을 읽어 복구 (업로드되지 않은 파일은 다시 업로드)
+      같은 DOWNLOAD_DIR을 쓰는 프로세스 중 잠금 파일을 먼저 잡은 하나만 복구하며, 잠금은 종료할 때까지 유지
+    """
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX, download_mode: str = S3_DOWNLOAD_MODE,
+                 hot_budget: int = HOT_TIER_BUDGET_BYTES):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.exceptions import BotoCoreError, ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.download_mode = download_mode
+        self.hot_budget = hot_budget
+        self._local = LocalStorage()
+        self._client = boto3.client(
+            "s3", endpoint_url=S3_ENDPOINT_URL or None, region_name=S3_REGION or None
+        )
+        self._transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=S3_MULTIPART_CHUNK_SIZE,
+            max_concurrency=S3_UPLOAD_PART_CONCURRENCY
+        )
+        # 저장소 응답 오류(ClientError)와 연결/인증 오류(BotoCoreError)
+        self._client_errors = (ClientError, BotoCoreError)
+        self._hot: OrderedDict[str, HotFile] = OrderedDict()
+        self._uploads: asyncio.Queue[str] = asyncio.Queue()
+        self._queued: set[str] = set()  # 업로드 대기/진행 중 (삭제되면 빠짐)
+        self._fetches = ProgressiveOutputs(enabled=True)
+        self._tasks: list[asyncio.Task] = []
+        self._background: set[asyncio.Task] = set()
+        self._recover_lock: Optional[int] = None
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._run_uploader()) for _ in range(S3_UPLOAD_CONCURRENCY)]
+        self._tasks.append(asyncio.create_task(self._recover()))
+
+    async def stop(self):
+        # 남은 업로드는 다음 시작 시 DOWNLOAD_DIR을 읽어 다시 진행
+        tasks = [*self._tasks, *self._background]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self._recover_lock is not None:
+            os.close(self._recover_lock)
+            self._recover_lock = None
+
+    async def store(self, filename: str, size: int):
+        self._hot[filename] = HotFile(size=size, uploaded=False)
+        self._enqueue(filename)
+        await self._trim()
+
+    async def open(self, filename: str, range: Optional[str] = None) -> Optional[StoredArtifact]:
+        artifact = await self._local.open(filename)
+        if artifact:
+            HOT_TIER_REQUESTS.labels("hit").inc()
+            self._use(filename, artifact.stat_result.st_size)
+            return artifact
+
+        size = await self._remote_size(filename)
+        if size is None:
+            return None
+        HOT_TIER_REQUESTS.labels("miss").inc()
+
+        if self.download_mode != "proxy":
+            try:
+                url = await asyncio.to_thread(
+                    self._client.generate_presigned_url, "get_object",
+                    Params={"Bucket": self.bucket, "Key": self._key(filename),
+                            "ResponseContentDisposition": content_disposition(filename)},
+                    ExpiresIn=S3_PRESIGN_EXPIRES
+                )
+            except self._client_errors:
+                logger.warning("Failed to presign %s", filename, exc_info=True)
+                return None
+            return StoredArtifact(url=url)
+
+        if range:
+            # Range 요청은 가져오기를 기다리지 않고 요청한 범위만 저장소에서 바로 전달
+            artifact = await self._open_range(filename, range)
+            if artifact:
+                return artifact
+        fetch = self._fetch(filename)
+        return StoredArtifact(stream=self._fetches.read(fetch), size=size)
+
+    def open_file(self, filename: str) -> tuple[BinaryIO, float]:
+        # 로컬 파일은 연 뒤에 hot tier에서 지워져도 끝까지 읽을 수 있음
+        try:
+            return self._local.open_file(filename)
+        except FileNotFoundError:
+            pass
+        # hot tier로 가져오지 않고 저장소에서 바로 읽음 (묶음이 커도 hot tier의 다른 파일을 밀어내지 않음)
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self._key(filename))
+        except self._client_errors as e:
+            if _error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(filename) from e
+            raise OSError(f"Failed to read {filename} from storage") from e
+        return response["Body"], response["LastModified"].timestamp()
+
+    async def exists(self, filename: str) -> bool:
+        return await self._local.exists(filename) or await self._remote_size(filename) is not None
+
+    async def delete(self, filename: str) -> bool:
+        self._queued.discard(filename)
+        self._hot.pop(filename, None)
+        deleted = await self._local.delete(filename)
+        await self._delete_object(filename)
+        return deleted
+
+    def _key(self, filename: str) -> str:
+        return self.prefix + filename
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _delete_object(self, filename: str):
+        try:
+            await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=self._key(filename))
+        except self._client_errors:
+            # 남은 객체는 참조하는 작업이 없으므로 다운로드되지 않음
+            logger.warning("Failed to delete %s from storage", filename, exc_info=True)
+
+    def _use(self, filename: str, size: Optional[int] = None):
+        # 다른 프로세스가 만든 파일은 업로드 여부를 모르므로 이 프로세스에서는 지우지 않음
+        hot = self._hot.get(filename)
+        if hot:
+            self._hot.move_to_end(filename)
+        elif size is not None:
+            self._hot[filename] = HotFile(size=size, uploaded=False)
+
+    async def _remote_size(self, filename: str) -> Optional[int]:
+        """
+        저장소에 있는 파일의 크기 (없거나 저장소에 접근할 수 없으면 None)
+        """
+        try:
+            response = await asyncio.to_thread(
+                self._client.head_object, Bucket=self.bucket, Key=self._key(filename)
+            )
+        except self._client_errors as e:
+            if _error_code(e) not in ("404", "NoSuchKey", "NotFound"):
+                logger.warning("Failed to look up %s in storage", filename, exc_info=True)
+            return None
+        return response["ContentLength"]
+
+    async def _open_range(self, filename: str, range: str) -> Optional[StoredArtifact]:
+        """
+        Range 헤더를 그대로 넘겨 저장소에서 요청한 범위만 받아 전달
+        범위가 잘못되었거나 저장소 오류면 None (호출한 쪽은 Range를 무시하고 전체를 전달)
+        """
+        try:
+            response = await asyncio.to_thread(
+                self._client.get_object, Bucket=self.bucket, Key=self._key(filename), Range=range
+            )
+        except self._client_errors as e:
+            if _error_code(e) != "InvalidRange":
+                logger.warning("Failed to read %s from storage", filename, exc_info=True)
+            return None
+        return StoredArtifact(stream=_read_body(response["Body"]), size=response["ContentLength"],
+                              content_range=response.get("ContentRange"))
+
+    def _enqueue(self, filename: str):
+        self._queued.add(filename)
+        self._uploads.put_nowait(filename)
+
+    async def _run_uploader(self):
+        while True:
+            filename = await self._uploads.get()
+            if filename not in self._queued:
+                continue  # 업로드 전에 삭제됨
+            path = DOWNLOAD_DIR / filename
+            try:
+                await asyncio.to_thread(
+                    self._client.upload_file, str(path), self.bucket, self._key(filename),
+                    ExtraArgs={"ContentType": mimetypes.guess_type(filename)[0] or "application/octet-stream"},
+                    Config=self._transfer_config
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Failed to upload %s", filename, exc_info=True)
+                STORAGE_UPLOADS.labels("failed").inc()
+                if filename in self._queued and await asyncio.to_thread(path.is_file):
+                    self._spawn(self._retry_upload(filename))
+                else:
+                    self._queued.discard(filename)
+                continue
+
+            if filename not in self._queued:
+                # 업로드 중에 삭제됨 - 올라간 객체도 삭제
+                await self._delete_object(filename)
+                continue
+            self._queued.discard(filename)
+            STORAGE_UPLOADS.labels("uploaded").inc()
+            hot = self._hot.get(filename)
+            if hot:
+                hot.uploaded = True
+            await self._trim()
+
+    async def _retry_upload(self, filename: str):
+        await asyncio.sleep(S3_UPLOAD_RETRY_DELAY)
+        if filename in self._queued:
+            self._uploads.put_nowait(filename)
+
+    async def _recover(self):
+        """
+        이전 실행에서 남은 파일로 hot tier 목록을 만들고, 저장소에 없는 파일은 업로드
+        저장소의 파일 크기는 HEAD를 파일마다 보내지 않고 목록 조회(list_objects_v2) 한 번으로 확인
+        """
+        self._recover_lock = await asyncio.to_thread(_try_lock, DOWNLOAD_DIR / RECOVER_LOCK_FILE)
+        if self._recover_lock is None:
+            return  # 다른 프로세스가 복구 중 (이 프로세스는 직접 만들거나 받은 파일만 관리)
+
+        entries = await asyncio.to_thread(_scan_download_dir)
+        try:
+            remote = await asyncio.to_thread(self._list_objects)
+        except self._client_errors:
+            # 확인할 수 없는 파일은 업로드되지 않은 것으로 보고 다시 올림 (올라가기 전에는 로컬에서 지우지 않음)
+            logger.warning("Failed to list storage objects, re-uploading local files", exc_info=True)
+            remote = {}
+
+        stale = time.time() - FETCH_STALE_SECONDS
+        # 오래 쓰지 않은 파일이 먼저 지워지도록 수정 시각 순으로 등록
+        for name, size, mtime in sorted(entries, key=lambda entry: entry[2]):
+            if name.startswith(FETCH_PREFIX):
+                if mtime < stale:
+                    # 가져오다 중단된 파일
+                    await asyncio.to_thread((DOWNLOAD_DIR / name).unlink, missing_ok=True)
+                continue
+            if name.startswith(".") or name in self._hot:
+                continue
+            uploaded = remote.get(name) == size
+            self._hot[name] = HotFile(size=size, uploaded=uploaded)
+            self._hot.move_to_end(name, last=False)
+            if not uploaded:
+                self._enqueue(name)
+        await self._trim()
+
+    def _list_objects(self) -> dict[str, int]:
+        """
+        S3_PREFIX 아래의 모든 객체 (파일 이름 -> 크기)
+        """
+        sizes = {}
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                sizes[item["Key"][len(self.prefix):]] = item["Size"]
+        return sizes
+
+    def _fetch(self, filename: str) -> ProgressiveOutput:
+        """
+        저장소의 파일을 hot tier로 가져오기 시작 (이미 가져오는 중이면 그 진행을 함께 사용)
+        """
+        fetch = self._fetches.get(filename)
+        if fetch:
+            return fetch
+        fetch = self._fetches.begin(filename, DOWNLOAD_DIR / f"{FETCH_PREFIX}{filename}", lambda: [])
+        fetch.restart()
+        fetch.streaming = True
+        self._spawn(self._run_fetch(filename, fetch))
+        return fetch
+
+    async def _run_fetch(self, filename: str, fetch: ProgressiveOutput):
+        path = DOWNLOAD_DIR / filename
+        completed = False
+        try:
+            size = await asyncio.to_thread(self._download_object, filename, fetch.path)
+            os.replace(fetch.path, path)
+            completed = True
+            self._hot[filename] = HotFile(size=size, uploaded=True)
+        except Exception:
+            # 읽던 요청은 중단되고 다음 요청이 다시 가져옴
+            logger.warning("Failed to fetch %s from storage", filename, exc_info=True)
+        finally:
+            if not completed:
+                await asyncio.to_thread(fetch.path.unlink, missing_ok=True)
+            self._fetches.end(fetch, path if completed else None)
+        if completed:
+            await self._trim()
+
+    def _download_object(self, filename: str, path: Path) -> int:
+        # 받는 순서대로 기록해야 가져오는 중에도 앞부분부터 읽을 수 있음 (병렬 Range 다운로드는 사용하지 않음)
+        response = self._client.get_object(Bucket=self.bucket, Key=self._key(filename))
+        size = 0
+        with open(path, "wb") as file:
+            for chunk in response["Body"].iter_chunks(FETCH_CHUNK_SIZE):
+                file.write(chunk)
+                file.flush()
+                size += len(chunk)
+        return size
+
+    async def _trim(self):
+        """
+        hot tier가 예산을 넘으면 업로드된 파일부터 가장 오래 쓰지 않은 순으로 로컬 파일 삭제
+        """
+        if not self.hot_budget:
+            return
+        total = sum(hot.size for hot in self._hot.values())
+        for filename, hot in list(self._hot.items()):
+            if total <= self.hot_budget:
+                break
+            if not hot.uploaded:
+                continue
+            del self._hot[filename]
+            total -= hot.size
+            await asyncio.to_thread((DOWNLOAD_DIR / filename).unlink, missing_ok=True)
+
+
+def _scan_download_dir() -> list[tuple[str, int, float]]:
+    """
+    DOWNLOAD_DIR의 일반 파일 목록 (이름, 크기, 수정 시각)
+    """
+    entries = []
+    with os.scandir(DOWNLOAD_DIR) as iterator:
+        for entry in iterator:
+            if entry.is_file(follow_symlinks=False):
+                stat_result = entry.stat()
+                entries.append((entry.name, stat_result.st_size, stat_result.st_mtime))
+    return entries
+
+
+def _try_lock(path: Path) -> Optional[int]:
+    """
+    잠금 파일을 배타적으로 잠그고 파일 디스크립터를 반환 (다른 프로세스가 잡고 있으면 None)
+    프로세스가 종료되면 잠금은 자동으로 풀림
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    # ClientError만 응답 코드가 있음 (BotoCoreError는 연결/인증 오류)
+    return getattr(error, "response", {}).get("Error", {}).get("Code")
+
+
+async def _read_body(body) -> AsyncIterator[bytes]:
+    """
+    get_object 응답 본문을 이벤트 루프를 막지 않도록 스레드에서 읽어 전달
+    """
+    try:
+        while chunk := await asyncio.to_thread(body.read, FETCH_CHUNK_SIZE):
+            yield chunk
+    finally:
+        body.close()
+
+
+def create_storage() -> ArtifactStorage:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage()
+    return LocalStorage()
+
+
+artifact_storage = create_storage()
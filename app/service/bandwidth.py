@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+from service.metrics import DOWNLOAD_BYTES
+
+# 이 프로세스에서 실행 중인 모든 다운로드가 나눠 쓰는 대역폭 (bytes/s, 0이면 제한 없음)
+# 설정하면 yt-dlp가 앱 내부의 로컬 프록시를 거쳐 받으며, 프록시가 작업별/전체 전송 속도를 조절
+DOWNLOAD_BANDWIDTH_LIMIT = int(os.getenv("DOWNLOAD_BANDWIDTH_LIMIT", "0"))
+
+# 작업 하나의 속도 상한 = 전체 대역폭 / 다운로드 중인 작업 수 x 이 배수
+# 1보다 크면 몫을 다 쓰지 못하는 작업(느린 원본 서버 등)이 남긴 대역폭을 다른 작업이 가져감 (전체 상한은 그대로)
+DOWNLOAD_SHARE_OVERCOMMIT = float(os.getenv("DOWNLOAD_SHARE_OVERCOMMIT", "1.5"))
+
+# 동시에 받는 조각(fragment) 수 - 이 프로세스 전체 예산 / 작업당 최대 (HLS/DASH 조각 다운로드에 적용)
+DOWNLOAD_FRAGMENT_BUDGET = int(os.getenv("DOWNLOAD_FRAGMENT_BUDGET", "8"))
+DOWNLOAD_MAX_FRAGMENTS_PER_JOB = int(os.getenv("DOWNLOAD_MAX_FRAGMENTS_PER_JOB", "4"))
+
+# 토큰 버킷 크기 (이 시간 동안 보낼 수 있는 양까지 몰아서 전송 허용, 초)
+BANDWIDTH_BURST_SECONDS = 0.25
+
+# 프록시가 한 번에 읽어 전달하는 크기
+RELAY_CHUNK_SIZE = 64 * 1024
+
+# 프록시 요청 헤더 최대 크기
+MAX_HEADER_SIZE = 64 * 1024
+
+# 프록시가 다음 hop으로 전달하지 않는 헤더
+_HOP_HEADERS = {"proxy-authorization", "proxy-connection", "connection", "keep-alive"}
+
+
+class RateBucket:
+    """
+    전송 속도 제한용 토큰 버킷 (bytes/s)
+    - 먼저 토큰을 빼고 부족한 만큼 기다리는 방식이라 대기 중인 전송은 도착 순서대로 처리됨
+    - set_rate()로 실행 중에 속도를 바꿀 수 있음
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate * BANDWIDTH_BURST_SECONDS
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float):
+        self._refill()
+        self.rate = rate
+        self.capacity = rate * BANDWIDTH_BURST_SECONDS
+        self.tokens = min(self.tokens, self.capacity)
+
+    async def take(self, amount: int):
+        self._refill()
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+@dataclass
+class DownloadSlot:
+    """
+    다운로드 중인 작업 하나의 자원 할당
+    token: 프록시 인증에 쓰는 작업 식별자 (yt-dlp가 Proxy-Authorization으로 보냄)
+    """
+    job_id: str
+    token: str
+    fragments: int
+    bucket: Optional[RateBucket] = None
+    options: list[str] = field(default_factory=list)  # yt-dlp 명령에 덧붙일 옵션
+
+
+class BandwidthManager:
+    """
+    yt-dlp 다운로드의 네트워크 자원 관리
+    - 작업마다 동시 조각 수(--concurrent-fragments)를 DOWNLOAD_FRAGMENT_BUDGET 안에서 나눠 줌
+    - DOWNLOAD_BANDWIDTH_LIMIT가 있으면 127.0.0.1의 HTTP 프록시(CONNECT/평문 HTTP)를 띄우고
+      모든 다운로드를 이 프록시로 받게 하여 전체 전송량을 상한 이하로 유지
+      작업별 상한은 다운로드 중인 작업 수가 바뀔 때마다 다시 나눠 실행 중인 작업에도 바로 적용 (--limit-rate와 다른 점)
+    """
+
+    def __init__(self, limit: int = DOWNLOAD_BANDWIDTH_LIMIT, overcommit: float = DOWNLOAD_SHARE_OVERCOMMIT,
+                 fragment_budget: int = DOWNLOAD_FRAGMENT_BUDGET,
+                 max_fragments: int = DOWNLOAD_MAX_FRAGMENTS_PER_JOB):
+        self.limit = limit
+        self.overcommit = overcommit
+        self.fragment_budget = fragment_budget
+        self.max_fragments = max_fragments
+        self._slots: dict[str, DownloadSlot] = {}
+        self._bucket = RateBucket(limit) if limit else None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port: Optional[int] = None
+
+    async def start(self):
+        if not self.limit:
+            return
+        self._server = await asyncio.start_server(self._handle_client, "127.0.0.1", 0, limit=MAX_HEADER_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self.port = None
+
+    @asynccontextmanager
+    async def reserve(self, job_id: str):
+        """
+        다운로드하는 동안 작업에 조각 수/대역폭 몫을 할당
+        """
+        slot = self._acquire(job_id)
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    def _acquire(self, job_id: str) -> DownloadSlot:
+        # 조각 수는 시작 시점의 다운로드 수로 나눔 (실행 중인 yt-dlp에는 바꿀 수 없음)
+        fragments = max(1, min(self.max_fragments, self.fragment_budget // (len(self._slots) + 1)))
+        slot = DownloadSlot(job_id=job_id, token=secrets.token_hex(16), fragments=fragments)
+        slot.options = ["--concurrent-fragments", str(fragments)]
+        if self.port:
+            slot.bucket = RateBucket(self.limit)
+            slot.options += ["--proxy", f"http://{slot.token}:x@127.0.0.1:{self.port}"]
+        self._slots[slot.token] = slot
+        self._rebalance()
+        return slot
+
+    def _release(self, slot: DownloadSlot):
+        self._slots.pop(slot.token, None)
+        self._rebalance()
+
+    def _rebalance(self):
+        if not self.limit or not self._slots:
+            return
+        share = min(self.limit, self.limit / len(self._slots) * self.overcommit)
+        for slot in self._slots.values():
+            if slot.bucket:
+                slot.bucket.set_rate(share)
+
+    def _slot_for(self, authorization: Optional[str]) -> Optional[DownloadSlot]:
+        # Proxy-Authorization: Basic base64("<token>:x")
+        if not authorization or not authorization.lower().startswith("basic "):
+            return None
+        try:
+            credentials = base64.b64decode(authorization[6:].strip()).decode()
+        except ValueError:
+            return None
+        return self._slots.get(credentials.split(":", 1)[0])
+
+    async def _throttle(self, slot: DownloadSlot, size: int):
+        await slot.bucket.take(size)
+        await self._bucket.take(size)
+        DOWNLOAD_BYTES.inc(size)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        upstream_writer = None
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                return
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ", 2)
+            headers = [line.split(":", 1) for line in header_lines if ":" in line]
+
+            slot = self._slot_for(next(
+                (value.strip() for name, value in headers if name.strip().lower() == "proxy-authorization"), None
+            ))
+            if not slot:
+                await self._reply(writer, "407 Proxy Authentication Required", 'Proxy-Authenticate: Basic realm="ytc"\r\n')
+                return
+
+            if method == "CONNECT":
+                # HTTPS: 암호화된 바이트를 그대로 중계
+                host, _, port = target.rpartition(":")
+                try:
+                    upstream_reader, upstream_writer = await asyncio.open_connection(host.strip("[]"), int(port))
+                except (OSError, ValueError):
+                    await self._reply(writer, "502 Bad Gateway")
+                    return
+                writer.write(b"HTTP/1.1 200 Connection Established\r\n\r\n")
+                await writer.drain()
+            else:
+                # 평문 HTTP: 요청 한 건만 전달하고 연결을 닫음 (연결 재사용 시 다른 호스트로 가는 요청이 섞이지 않도록)
+                url = urlsplit(target)
+                if url.scheme != "http" or not url.hostname:
+                    await self._reply(writer, "400 Bad Request")
+                    return
+                try:
+                    upstream_reader, upstream_writer = await asyncio.open_connection(url.hostname, url.port or 80)
+                except OSError:
+                    await self._reply(writer, "502 Bad Gateway")
+                    return
+                path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+                forwarded = "".join(
+                    f"{name}:{value}\r\n" for name, value in headers if name.strip().lower() not in _HOP_HEADERS
+                )
+                upstream_writer.write(f"{method} {path} {version}\r\n{forwarded}Connection: close\r\n\r\n".encode("latin-1"))
+                await upstream_writer.drain()
+
+            # 받는 방향(원본 서버 -> yt-dlp)만 속도 제한
+            await asyncio.gather(
+                self._pipe(reader, upstream_writer),
+                self._pipe(upstream_reader, writer, slot),
+                return_exceptions=True
+            )
+        except (OSError, ValueError):
+            pass
+        finally:
+            for stream in (upstream_writer, writer):
+                if stream:
+                    stream.close()
+
+    async def _pipe(self, source: asyncio.StreamReader, destination: asyncio.StreamWriter,
+                    slot: Optional[DownloadSlot] = None):
+        try:
+            while True:
+                data = await source.read(RELAY_CHUNK_SIZE)
+                if not data:
+                    break
+                if slot:
+                    await self._throttle(slot, len(data))
+                destination.write(data)
+                await destination.drain()
+            if destination.can_write_eof():
+                destination.write_eof()
+        except OSError:
+            destination.close()
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, status: str, headers: str = ""):
+        writer.write(f"HTTP/1.1 {status}\r\n{headers}Content-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+
+
+bandwidth_manager = BandwidthManager()
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Iterable, Optional
+
+# 구독자별로 쌓아둘 수 있는 최대 이벤트 수 (넘치면 오래된 이벤트부터 버림)
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """
+    JobEventBus 구독 핸들
+    async with 블록을 벗어나면 자동으로 구독 해제됨
+    """
+
+    def __init__(self, bus: "JobEventBus", job_ids: Optional[set[str]]):
+        self._bus = bus
+        self.job_ids = job_ids
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, event: dict):
+        # 느린 구독자 때문에 발행자가 막히지 않도록 가장 오래된 이벤트를 버림
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc):
+        self._bus.unsubscribe(self)
+
+
+class JobEventBus:
+    """
+    프로세스 내 작업 상태 pub/sub
+    - JobService가 상태/진행률이 바뀔 때마다 publish
+    - SSE/WebSocket 연결은 관심 있는 job_id만 구독하므로 DB 조회 없이 상태를 전달받음
+    """
+
+    def __init__(self):
+        self._by_job: dict[str, set[Subscription]] = {}
+        self._all: set[Subscription] = set()
+
+    def subscribe(self, job_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """
+        job_ids가 없으면 모든 작업의 이벤트를 구독
+        """
+        subscription = Subscription(self, set(job_ids) if job_ids else None)
+        if subscription.job_ids is None:
+            self._all.add(subscription)
+        else:
+            for job_id in subscription.job_ids:
+                self._by_job.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.job_ids is None:
+            self._all.discard(subscription)
+            return
+        for job_id in subscription.job_ids:
+            subscribers = self._by_job.get(job_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._by_job[job_id]
+
+    def publish(self, job_id: str, **fields):
+        """
+        변경된 필드만 담아 이벤트 발행 (예: publish(job_id, status="completed", filename=...))
+        """
+        event = {"job_id": job_id, **fields}
+        for subscription in self._by_job.get(job_id, ()):
+            subscription.put(event)
+        for subscription in self._all:
+            subscription.put(event)
+
+
+job_events = JobEventBus()
@@ -0,0 +1,270 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.orm import aliased
+from models.job import ConversionJob, JobStatus
+from database import async_session
+from service.job_events import job_events
+from service.job_store import job_store
+from service.scheduler import Candidate, SchedulingPolicy, scheduling_policy, SCHEDULER_CANDIDATES_PER_SUBMITTER
+from service.process_registry import process_registry, CANCELLED
+
+# 이 프로세스에서 동시에 실행할 수 있는 변환 작업(yt-dlp/ffmpeg 프로세스) 수
+# 0이면 작업을 가져가지 않음 (HTTP 요청만 처리하는 인스턴스)
+MAX_WORKERS = max(0, int(os.getenv("MAX_WORKERS", "2")))
+
+# 작업 점유(lease) 유효 시간 / 갱신 간격 (초)
+# 갱신이 끊긴 작업(프로세스 종료 등)은 유효 시간이 지나면 다른 워커가 가져감
+JOB_LEASE_DURATION = float(os.getenv("JOB_LEASE_DURATION", "60"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+
+# 다른 프로세스에서 등록된 작업을 확인하는 간격 (초)
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "1"))
+
+# 작업을 점유한 프로세스 식별자
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    """
+    conversion_jobs 테이블을 기반으로 하는 작업 큐
+    - 작업의 실제 상태는 DB 레코드가 기준이며, 여러 프로세스/컨테이너가 같은 테이블에서 작업을 가져감
+    - 작업은 UPDATE ... WHERE 조건으로 원자적으로 점유하고(claimed_by, lease_expires_at), 점유 중에는 주기적으로 갱신
+    - 갱신이 끊겨 lease가 만료된 PROCESSING 작업은 다른 워커가 다시 가져감
+    - 고정된 수의 워커만 동시에 작업을 실행하므로 요청이 몰려도 변환 프로세스 수가 제한됨
+    - 다음에 실행할 작업은 policy(요청자별 공정 분배, 우선순위, aging, SJF)가 결정
+    """
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]], worker_count: int = MAX_WORKERS,
+                 worker_id: str = WORKER_ID, policy: SchedulingPolicy = scheduling_policy):
+        self._handler = handler
+        self._worker_count = worker_count
+        self.worker_id = worker_id
+        self.policy = policy
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._active = 0
+
+    async def depth(self) -> int:
+        """대기 중인 작업 수 (모든 프로세스 기준)"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(func.count())
+                .select_from(ConversionJob)
+                .where(ConversionJob.status == JobStatus.PENDING)
+            )
+            return result.scalar_one()
+
+    @property
+    def active(self) -> int:
+        """이 프로세스에서 실행 중인 작업 수"""
+        return self._active
+
+    @property
+    def worker_count(self) -> int:
+        return self._worker_count
+
+    def enqueue(self, job_id: str):
+        """
+        새 작업이 등록되었음을 알림 (작업 자체는 DB에 있으므로 대기 중인 워커만 깨움)
+        """
+        self._wakeup.set()
+
+    async def start(self):
+        if not self._worker_count:
+            return
+        for index in range(self._worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        self._workers.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        await self._release()
+
+    def _claimable(self, now: datetime):
+        """
+        가져갈 수 있는 작업: PENDING 또는 lease가 만료된 PROCESSING
+        """
+        return or_(
+            ConversionJob.status == JobStatus.PENDING,
+            and_(
+                ConversionJob.status == JobStatus.PROCESSING,
+                or_(ConversionJob.lease_expires_at.is_(None), ConversionJob.lease_expires_at < now)
+            )
+        )
+
+    def owned(self):
+        """
+        이 프로세스가 점유하고 lease가 아직 유효한 작업 - 작업 결과를 기록할 때의 조건
+        lease가 만료되어 다른 워커가 다시 가져간 작업에 늦게 끝난 결과를 덮어쓰지 않음
+        """
+        return and_(
+            ConversionJob.claimed_by == self.worker_id,
+            ConversionJob.lease_expires_at >= datetime.now(timezone.utc)
+        )
+
+    async def _candidates(self, session, now: datetime) -> list[Candidate]:
+        """
+        요청자마다 우선순위/생성 순 상위 SCHEDULER_CANDIDATES_PER_SUBMITTER개씩 후보로 읽음
+        - 대기 작업은 요청자별로 ix_conversion_jobs_status_submitter_priority를 순서대로 읽다가 LIMIT에서 멈춤
+          (전체 대기 작업을 정렬하지 않으므로 읽는 행 수는 요청자 수 x 후보 수에 비례)
+        - lease가 만료된 PROCESSING 작업(전체 워커 수 이하)은 따로 읽어 함께 후보로 올림
+        """
+        submitters = (
+            select(ConversionJob.submitter)
+            .where(ConversionJob.status == JobStatus.PENDING)
+            .distinct()
+            .subquery("submitters")
+        )
+        queued = aliased(ConversionJob)
+        top = (
+            select(queued.id)
+            .where(queued.status == JobStatus.PENDING)
+            .where(queued.submitter.is_not_distinct_from(submitters.c.submitter))
+            .order_by(queued.priority.desc(), queued.created_at, queued.id)
+            .limit(SCHEDULER_CANDIDATES_PER_SUBMITTER)
+            .correlate(submitters)
+        )
+        columns = (ConversionJob.id, ConversionJob.submitter, ConversionJob.priority,
+                   ConversionJob.duration, ConversionJob.created_at)
+        pending = await session.execute(
+            select(*columns)
+            .select_from(submitters)
+            .join(ConversionJob, ConversionJob.id.in_(top))
+        )
+        expired = await session.execute(
+            select(*columns)
+            .where(ConversionJob.status == JobStatus.PROCESSING)
+            .where(or_(ConversionJob.lease_expires_at.is_(None), ConversionJob.lease_expires_at < now))
+        )
+        return [Candidate(*row) for row in [*pending.all(), *expired.all()]]
+
+    async def _running_by_submitter(self, session) -> dict[Optional[str], int]:
+        """
+        요청자별 실행 중인 작업 수 (모든 프로세스 기준, PROCESSING 작업은 전체 워커 수 정도로 적음)
+        """
+        result = await session.execute(
+            select(ConversionJob.submitter, func.count())
+            .where(ConversionJob.status == JobStatus.PROCESSING)
+            .group_by(ConversionJob.submitter)
+        )
+        return dict(result.all())
+
+    async def _claim(self) -> Optional[ConversionJob]:
+        """
+        policy가 정한 순서대로 작업 하나를 PROCESSING으로 변경하며 점유
+        같은 행을 다른 워커가 먼저 가져가면 WHERE 조건이 맞지 않아 0행이 변경되므로 다음 후보로 넘어감
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            job = None
+            async with async_session() as session:
+                candidates = await self._candidates(session, now)
+                if not candidates:
+                    return None
+                running = {}
+                if self.policy.fair_share:
+                    running = await self._running_by_submitter(session)
+
+                for candidate in self.policy.rank(candidates, running, now):
+                    result = await session.execute(
+                        update(ConversionJob)
+                        .where(ConversionJob.id == candidate.id)
+                        .where(self._claimable(now))
+                        .values(
+                            status=JobStatus.PROCESSING,
+                            progress=0,
+                            claimed_by=self.worker_id,
+                            lease_expires_at=now + timedelta(seconds=JOB_LEASE_DURATION)
+                        )
+                        .returning(ConversionJob)
+                        .execution_options(populate_existing=True)
+                    )
+                    job = result.scalar_one_or_none()
+                    if job:
+                        break
+                await session.commit()
+
+            if job:
+                job_events.publish(job.job_id, status=JobStatus.PROCESSING.value, progress=0)
+                return job
+
+    async def _heartbeat(self):
+        """
+        이 프로세스가 점유한 PROCESSING 작업의 lease를 주기적으로 연장
+        (진행 중인 변환에 합류해 대기 중인 작업 포함)
+        다른 프로세스에서 취소(CANCELLED)된 작업이 이 프로세스에서 실행 중이면 종료
+        """
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                async with async_session() as session:
+                    await session.execute(
+                        update(ConversionJob)
+                        .where(ConversionJob.claimed_by == self.worker_id)
+                        .where(ConversionJob.status == JobStatus.PROCESSING)
+                        # lease 연장은 상태 변경이 아니므로 버전/변경 시각은 그대로 둠
+                        .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_DURATION),
+                                version=ConversionJob.version, updated_at=ConversionJob.updated_at)
+                    )
+                    cancelled = await session.execute(
+                        select(ConversionJob.job_id)
+                        .where(ConversionJob.job_id.in_(process_registry.job_ids))
+                        .where(ConversionJob.status == JobStatus.CANCELLED)
+                    )
+                    await session.commit()
+                for job_id in cancelled.scalars().all():
+                    await process_registry.cancel(job_id, CANCELLED)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # 다음 주기에 다시 시도 (lease 만료 전까지 여유가 있음)
+
+    async def _release(self):
+        """
+        종료 시 끝내지 못한 작업을 PENDING으로 되돌려 다른 워커가 바로 가져갈 수 있게 함
+        """
+        try:
+            async with async_session() as session:
+                await session.execute(
+                    update(ConversionJob)
+                    .where(ConversionJob.claimed_by == self.worker_id)
+                    .where(ConversionJob.status == JobStatus.PROCESSING)
+                    .values(status=JobStatus.PENDING, progress=0, claimed_by=None, lease_expires_at=None)
+                )
+                await session.commit()
+        except Exception:
+            pass  # lease가 만료되면 다른 워커가 가져감
+
+    async def _wait_for_work(self):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=QUEUE_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await self._claim()
+                if not job:
+                    await self._wait_for_work()
+                    continue
+                job_store.add(job)
+                self._active += 1
+                try:
+                    await self._handler(job.job_id)
+                finally:
+                    self._active -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 작업 오류는 handler에서 FAILED로 기록됨 (DB 오류 등은 잠시 후 다시 시도)
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
@@ -6,14 +6,38 @@ import json
 from pathlib import Path
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from models.job import ConversionJob, JobStatus
+from sqlalchemy import select, update, insert, func, or_, and_
+from sqlalchemy.orm import aliased
+from models.job import ConversionJob, ConversionBatch, JobStatus
 from database import async_session
+from service.job_queue import JobQueue
+from service.job_events import job_events
+from service.artifact_cache import artifact_cache
+from service.job_store import job_store, TERMINAL_STATUSES
+from service.storage_manager import storage_manager
+from service.artifact_storage import artifact_storage
+from service.metrics import StageTimer, JOBS_FINISHED, BYTES_PRODUCED
+from utils.url_helper import extract_video_id, extract_playlist_id, canonical_url
+from utils.datetime_helper import format_datetime_utc, as_utc
+from service.ytdlp_runner import ProgressReporter, YtdlpResult, run_ytdlp, run_pipeline, extract_playlist_entries
+from service.metadata_cache import metadata_cache, VideoMetadata
+from service.source_cache import source_cache
+from service.bandwidth import bandwidth_manager
+from service.transcoder import build_ffmpeg_command, build_stream_ffmpeg_command, run_ffmpeg
+from service.progressive import progressive_outputs, ProgressiveOutput
+from utils.progress_parser import ProgressUpdate
+from service.scheduler import clamp_priority
+from service.process_registry import process_registry, ConversionHandle, CANCELLED, DELETED
+from typing import Optional, Sequence
+from dataclasses import dataclass
 import os
 
 DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
 DOWNLOAD_DIR.mkdir(exist_ok=True)
 
+# 일괄 요청 하나로 만들 수 있는 최대 작업 수
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
 def sanitize_filename(title: str, max_length: int = 100) -> str:
     """
     YouTube 제목을 파일명으로 사용할 수 있도록 변환
@@ -41,189 +65,676 @@ def sanitize_filename(title: str, max_length: int = 100) -> str:
 
     return sanitized
 
-async def get_video_title(url: str) -> str:
+def _remove_partial_files(job_db_id: int):
+    """
+    작업의 임시 파일(.<id>.<ext>, .part, .ytdl, 분리 다운로드된 스트림)을 삭제
     """
-    yt-dlp를 사용하여 YouTube 영상의 제목을 가져옴
+    for path in DOWNLOAD_DIR.glob(f".{job_db_id}.*"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+def build_ytdlp_command(format: str, quality: str, output_path: Path, url: str,
+                        info_json_path: Optional[Path] = None, options: Sequence[str] = ()) -> list[str]:
     """
-    try:
-        # yt-dlp로 메타데이터만 가져오기 (다운로드 하지 않음)
-        process = await asyncio.create_subprocess_exec(
-            "yt-dlp",
-            "--dump-json",
-            "--no-playlist",
-            url,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-
-        if process.returncode == 0 and stdout:
-            metadata = json.loads(stdout.decode())
-            return metadata.get('title', 'Untitled Video')
+    yt-dlp 명령어 구성
+    - 메타데이터(JSON)와 다운로드를 한 번의 실행으로 처리 (--dump-json --no-simulate)
+    - info_json_path가 있으면 캐시된 메타데이터를 사용하여 추출 단계를 건너뜀
+    - options: 다운로드 자원 할당(동시 조각 수, 대역폭 관리 프록시) 옵션
+    """
+    # 진행률을 줄 단위로 출력, --dump-json이 켜는 quiet 모드는 다시 해제
+    command = ["yt-dlp", "--newline", "--no-playlist", "--dump-json", "--no-simulate", "--no-quiet"]
+
+    if format == "mp3":
+        command += ["--extract-audio", "--audio-format", "mp3"]
+        command += ["--audio-quality", quality + "K"]
+        command += ["-f", "bestaudio/best"]
+    else:  # mp4
+        if quality == "1080":
+            command += ["-f", "best[height<=1080]"]
+        elif quality == "720":
+            command += ["-f", "best[height<=720]"]
+        elif quality == "480":
+            command += ["-f", "best[height<=480]"]
+        elif quality == "360":
+            command += ["-f", "best[height<=360]"]
         else:
-            # 제목을 가져오지 못한 경우 기본값 반환
-            return 'Untitled Video'
-    except Exception as e:
-        # 오류 발생 시 기본값 반환
-        return 'Untitled Video'
+            command += ["-f", "best"]
+        command += ["--merge-output-format", "mp4"]
+
+    command += ["-o", str(output_path), *options]
+    if info_json_path:
+        command += ["--load-info-json", str(info_json_path)]
+    else:
+        command += [url]
+    return command
+
+def build_source_command(format: str, directory: Path, url: str,
+                         info_json_path: Optional[Path] = None, options: Sequence[str] = ()) -> list[str]:
+    """
+    원본 캐시에 넣을 스트림을 내려받는 yt-dlp 명령어 구성 (변환 없이 원본 그대로)
+    - MP3용: 최고 음질 오디오 -> audio.<확장자>
+    - MP4용: SOURCE_MAX_HEIGHT 이하 최고 화질 영상+오디오, MP4로 remux 가능한 H.264/AAC 우선
+             코덱과 관계없이 담을 수 있도록 MKV로 병합 -> av.mkv
+    """
+    command = ["yt-dlp", "--newline", "--no-playlist", "--dump-json", "--no-simulate", "--no-quiet"]
+
+    if format == "mp3":
+        command += ["-f", "bestaudio/best", "-o", str(directory / "audio.%(ext)s")]
+    else:  # mp4
+        height = source_cache.max_height
+        command += ["-f", f"bv*[height<={height}][vcodec^=avc1]+ba[acodec^=mp4a]"
+                          f"/bv*[height<={height}]+ba/b[height<={height}]/b"]
+        command += ["--merge-output-format", "mkv", "-o", str(directory / "av.%(ext)s")]
+
+    command += options
+    if info_json_path:
+        command += ["--load-info-json", str(info_json_path)]
+    else:
+        command += [url]
+    return command
+
+def build_stream_command(url: str, info_print_path: Path, info_json_path: Optional[Path] = None,
+                         options: Sequence[str] = ()) -> list[str]:
+    """
+    최고 음질 오디오를 stdout으로 내보내는 yt-dlp 명령어 구성 (ffmpeg 파이프 변환용)
+    - stdout은 미디어 데이터로 쓰므로 메타데이터(JSON)는 --print-to-file로 info_print_path에 기록
+    """
+    command = ["yt-dlp", "--newline", "--no-playlist", "--no-simulate", "-f", "bestaudio/best", "-o", "-",
+               "--print-to-file", "%()j", str(info_print_path), *options]
+    if info_json_path:
+        command += ["--load-info-json", str(info_json_path)]
+    else:
+        command += [url]
+    return command
+
+@dataclass
+class JobPage:
+    """
+    키셋 페이지네이션 결과
+    next_cursor/prev_cursor는 다음(더 오래된)/이전(더 최근) 페이지 기준이 되는 작업 id
+    """
+    total_count: int
+    jobs: list
+    next_cursor: Optional[int] = None
+    prev_cursor: Optional[int] = None
 
 class JobService:
     @staticmethod
-    async def create_job(url: str, format: str, quality: str) -> str:
+    async def create_job(url: str, format: str, quality: str, submitter: Optional[str] = None,
+                         priority: int = 0) -> str:
         job_id = str(uuid.uuid4())
-        
+        video_id = extract_video_id(url)
+
+        # 최근에 추출한 메타데이터가 있으면 영상 길이를 스케줄링(SJF)에 사용
+        metadata = metadata_cache.get(canonical_url(video_id) if video_id else url)
+
         async with async_session() as session:
             job = ConversionJob(
                 job_id=job_id,
                 url=url,
+                video_id=video_id,
                 format=format,
                 quality=quality,
+                submitter=submitter,
+                priority=clamp_priority(priority),
+                duration=metadata.duration if metadata else None,
                 status=JobStatus.PENDING
             )
             session.add(job)
             await session.commit()
             
-        # 백그라운드 작업 시작
-        asyncio.create_task(JobService.process_job(job_id))
+        # 작업 큐에 등록 (워커 수만큼만 동시에 실행됨)
+        job_queue.enqueue(job_id)
         
         return job_id
     
     @staticmethod
-    async def process_job(job_id: str):
-        try:
-            # 작업 상태를 PROCESSING으로 변경
-            async with async_session() as session:
-                result = await session.execute(
-                    select(ConversionJob).where(ConversionJob.job_id == job_id)
-                )
-                job = result.scalar_one_or_none()
+    async def expand_urls(urls: list[str]) -> tuple[list[str], Optional[str], dict[str, int]]:
+        """
+        입력 URL 목록을 작업 단위 URL 목록으로 변환
+        - 재생목록 URL은 평면 추출 한 번으로 영상 URL 목록으로 펼침 (MAX_BATCH_SIZE를 넘는 만큼은 추출하지 않음)
+        - 빈 줄과 중복 URL은 제거
 
-                if not job:
-                    return
+        Returns:
+            (영상 URL 목록, 재생목록 URL - 재생목록이 하나만 입력된 경우, 재생목록 항목에서 얻은 URL별 영상 길이)
 
-                job_url = job.url
-                job.status = JobStatus.PROCESSING
-                job.progress = 10
-                await session.commit()
+        Raises:
+            ValueError: 펼친 URL이 MAX_BATCH_SIZE를 넘는 경우
+            RuntimeError: 재생목록 추출 실패
+        """
+        expanded = []
+        playlist_urls = []
+        durations = {}
+        for url in (url.strip() for url in urls):
+            if not url:
+                continue
+            if extract_playlist_id(url):
+                playlist_urls.append(url)
+                # 한도를 넘는지 알 수 있도록 하나 더 추출
+                for entry in await extract_playlist_entries(url, limit=MAX_BATCH_SIZE + 1):
+                    video_id = entry.get("id") if entry.get("ie_key", "Youtube") == "Youtube" else None
+                    entry_url = canonical_url(video_id) if video_id else entry.get("url")
+                    expanded.append(entry_url)
+                    if entry_url and entry.get("duration"):
+                        durations[entry_url] = int(entry["duration"])
+            else:
+                expanded.append(url)
 
-            # YouTube 제목 추출
-            video_title = await get_video_title(job_url)
+        source_url = playlist_urls[0] if len(playlist_urls) == 1 and len(urls) == 1 else None
+        expanded = list(dict.fromkeys(url for url in expanded if url))
+        if len(expanded) > MAX_BATCH_SIZE:
+            raise ValueError(f"Too many URLs (more than {MAX_BATCH_SIZE})")
+        return expanded, source_url, durations
 
-            # 제목을 DB에 저장
-            async with async_session() as session:
-                result = await session.execute(
-                    select(ConversionJob).where(ConversionJob.job_id == job_id)
-                )
-                job = result.scalar_one_or_none()
+    @staticmethod
+    async def create_batch(urls: list[str], format: str, quality: str, source_url: Optional[str] = None,
+                           submitter: Optional[str] = None, priority: int = 0,
+                           durations: Optional[dict[str, int]] = None) -> tuple[str, list[str]]:
+        """
+        여러 작업을 한 트랜잭션으로 생성 (한 번의 다중 행 INSERT)
 
-                if job:
-                    job.title = video_title
-                    job.progress = 20
-                    await session.commit()
+        Returns:
+            (batch_id, 생성된 job_id 목록)
 
-            # 작업 정보 다시 조회 (비동기 작업을 위해)
-            async with async_session() as session:
-                result = await session.execute(
-                    select(ConversionJob).where(ConversionJob.job_id == job_id)
-                )
-                job = result.scalar_one_or_none()
+        Raises:
+            ValueError: URL이 없거나 MAX_BATCH_SIZE를 넘는 경우
+        """
+        if not urls:
+            raise ValueError("No URLs to convert")
+        if len(urls) > MAX_BATCH_SIZE:
+            raise ValueError(f"Too many URLs ({len(urls)} > {MAX_BATCH_SIZE})")
 
-                if not job:
+        batch_id = str(uuid.uuid4())
+        priority = clamp_priority(priority)
+        durations = durations or {}
+        rows = [{
+            "job_id": str(uuid.uuid4()),
+            "url": url,
+            "video_id": extract_video_id(url),
+            "batch_id": batch_id,
+            "format": format,
+            "quality": quality,
+            "submitter": submitter,
+            "priority": priority,
+            "duration": durations.get(url),
+            "status": JobStatus.PENDING
+        } for url in urls]
+
+        async with async_session() as session:
+            session.add(ConversionBatch(
+                batch_id=batch_id,
+                source_url=source_url,
+                format=format,
+                quality=quality,
+                total=len(rows)
+            ))
+            await session.execute(insert(ConversionJob), rows)
+            await session.commit()
+
+        # 워커를 한 번만 깨우면 비어 있는 워커들이 차례로 가져감
+        job_queue.enqueue(batch_id)
+
+        return batch_id, [row["job_id"] for row in rows]
+
+    @staticmethod
+    async def get_batch(batch_id: str) -> Optional[dict]:
+        """
+        일괄 요청의 집계 진행 상태 (상태별 작업 수, 전체 진행률)
+        """
+        async with async_session() as session:
+            result = await session.execute(
+                select(ConversionBatch).where(ConversionBatch.batch_id == batch_id)
+            )
+            batch = result.scalar_one_or_none()
+            if not batch:
+                return None
+
+            result = await session.execute(
+                select(ConversionJob.status, func.count(), func.sum(ConversionJob.progress))
+                .where(ConversionJob.batch_id == batch_id)
+                .group_by(ConversionJob.status)
+            )
+            rows = result.all()
+
+        counts = {status.value: 0 for status in JobStatus}
+        progress_sum = 0
+        for status, count, status_progress in rows:
+            counts[status] = count
+            if status == JobStatus.PROCESSING:
+                progress_sum += status_progress or 0
+            elif status in TERMINAL_STATUSES:
+                # 끝난 작업은 실패/취소도 100%로 계산 (더 진행되지 않음)
+                progress_sum += count * 100
+
+        # 삭제된 작업은 제외하고 남아 있는 작업 기준으로 계산
+        job_count = sum(counts.values())
+        return {
+            "batch_id": batch.batch_id,
+            "source_url": batch.source_url,
+            "format": batch.format,
+            "quality": batch.quality,
+            "total": batch.total,
+            "counts": counts,
+            "progress": progress_sum // job_count if job_count else 100,
+            "done": counts[JobStatus.PENDING.value] == 0 and counts[JobStatus.PROCESSING.value] == 0,
+            "created_at": format_datetime_utc(batch.created_at) or None
+        }
+
+    @staticmethod
+    async def process_job(job_id: str):
+        try:
+            # 큐가 작업을 점유하며 PROCESSING으로 변경하고 상태 저장소에 올려 둠
+            job = await job_store.load(job_id)
+            if not job:
+                return
+
+            job_url = canonical_url(job.video_id) if job.video_id else job.url
+            cache_key = (job.video_id, job.format, job.quality) if job.video_id else None
+
+            # 단계별 소요 시간 측정 (작업 레코드의 stage_timings에 저장)
+            timer = StageTimer()
+            timer.observe_queue_wait(job.created_at)
+
+            inflight = None
+            if cache_key:
+                # 이미 변환된 파일이 있으면 yt-dlp 실행 없이 바로 완료
+                artifact = await artifact_cache.acquire(cache_key)
+                if artifact:
+                    finished = await JobService._finish_jobs([job_id], {
+                        "status": JobStatus.COMPLETED,
+                        "progress": 100,
+                        "title": artifact.title,
+                        "filename": artifact.filename,
+                        "completed_at": datetime.now(timezone.utc)
+                    }, timer=timer)
+                    if not finished:
+                        # lease를 잃어 반영하지 못했으므로 늘린 참조 수를 되돌림
+                        async with async_session() as session:
+                            await artifact_cache.release(session, artifact.filename)
+                            await session.commit()
                     return
 
-                # 파일명 생성 - 제목 기반으로 변경
-                sanitized_title = sanitize_filename(job.title or "untitled")
-                filename = f"{sanitized_title}_{job.id}.{job.format}"
-                filepath = DOWNLOAD_DIR / filename
-                
-                # yt-dlp 명령어 구성
-                command = ["yt-dlp"]
-                
-                if job.format == "mp3":
-                    command += ["--extract-audio", "--audio-format", "mp3"]
-                    command += ["--audio-quality", job.quality + "K"]
-                    command += ["-f", "bestaudio/best"]
-                else:  # mp4
-                    if job.quality == "1080":
-                        command += ["-f", "best[height<=1080]"]
-                    elif job.quality == "720":
-                        command += ["-f", "best[height<=720]"]
-                    elif job.quality == "480":
-                        command += ["-f", "best[height<=480]"]
-                    elif job.quality == "360":
-                        command += ["-f", "best[height<=360]"]
-                    else:
-                        command += ["-f", "best"]
-                    command += ["--merge-output-format", "mp4"]
-                
-                command += ["-o", str(filepath), job.url]
+                # 같은 변환이 진행 중이면 합류하고 워커를 바로 반납
+                if artifact_cache.attach(cache_key, job_id):
+                    return
+
+                inflight = artifact_cache.begin(cache_key, job_id)
 
-                # 진행률 업데이트
-                job.progress = 60
-                await session.commit()
-                
-            # 변환 실행 (비동기) - 세션 외부에서 실행
             try:
-                process = await asyncio.create_subprocess_exec(
-                    *command,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, stderr = await process.communicate()
-                result_code = process.returncode
-                
-                # 결과 업데이트
-                async with async_session() as session:
-                    result = await session.execute(
-                        select(ConversionJob).where(ConversionJob.job_id == job_id)
-                    )
-                    job = result.scalar_one_or_none()
-                    
-                    if job:
-                        if result_code == 0:
-                            # 성공
-                            job.status = JobStatus.COMPLETED
-                            job.progress = 100
-                            job.filename = filename
-                            job.completed_at = datetime.now(timezone.utc)
-                        else:
-                            # 실패
-                            job.status = JobStatus.FAILED
-                            job.error_message = stderr.decode() if stderr else stdout.decode()
-
-                        await session.commit()
-                
-            except Exception as e:
-                # 변환 실행 중 오류
-                async with async_session() as session:
-                    result = await session.execute(
-                        select(ConversionJob).where(ConversionJob.job_id == job_id)
-                    )
-                    job = result.scalar_one_or_none()
-                    
-                    if job:
-                        job.status = JobStatus.FAILED
-                        job.error_message = str(e)
-                        await session.commit()
-                        
+                await JobService._convert(job_id, job_url, cache_key, inflight, timer)
+            finally:
+                if inflight:
+                    artifact_cache.end(cache_key, inflight)
+
         except Exception as e:
             # 전체 프로세스 오류
             try:
-                async with async_session() as session:
-                    result = await session.execute(
-                        select(ConversionJob).where(ConversionJob.job_id == job_id)
-                    )
-                    job = result.scalar_one_or_none()
-                    
-                    if job:
-                        job.status = JobStatus.FAILED
-                        job.error_message = f"Process error: {str(e)}"
-                        await session.commit()
+                await JobService._finish_jobs([job_id], {
+                    "status": JobStatus.FAILED,
+                    "error_message": f"Process error: {str(e)}"
+                })
             except:
                 pass  # 로깅 시스템이 있다면 여기서 로그
+
+    @staticmethod
+    async def _convert(job_id: str, job_url: str, cache_key, inflight, timer: StageTimer):
+        """
+        yt-dlp로 실제 변환을 수행하고, 결과를 합류한 작업들에도 함께 반영
+        """
+        job_ids = inflight.job_ids if inflight else [job_id]
+
+        job = job_store.get(job_id)
+        if not job:
+            return
+
+        job_db_id = job.id
+        job_format = job.format
+        job_quality = job.quality
+
+        # 제목은 실행 중에 알게 되므로 임시 파일명으로 받은 뒤 완료 시 제목 기반 이름으로 변경
+        temp_path = DOWNLOAD_DIR / f".{job_db_id}.{job_format}"
+
+        # 취소/실행 시간 제한/진행 없음 감지를 위해 실행 중인 프로세스를 등록
+        handle = process_registry.begin(job_id)
+        completed = False
+        output: Optional[ProgressiveOutput] = None
+
+        # 변환 실행 (비동기) - 세션 외부에서 실행
+        try:
+            # 새 파일을 만들기 전에 용량 예산을 넘은 오래된 파일 정리
+            await storage_manager.ensure_capacity()
+
+            # 출력을 줄 단위로 읽으며 진행률/속도/ETA를 주기적으로 DB에 반영
+            reporter = ProgressReporter(job_id, followers=inflight.followers if inflight else None, timer=timer)
+
+            # MP3는 변환 중에도 /api/job/{job_id}/stream으로 받을 수 있도록 결과 파일을 등록
+            if job_format == "mp3":
+                output = progressive_outputs.begin(job_id, temp_path, lambda: reporter.job_ids)
+
+            video_id = cache_key[0] if cache_key else None
+            if video_id and source_cache.should_use(video_id, job_format, job_quality):
+                # 같은 영상의 원본 스트림을 받아 두고 형식/품질별 파일은 로컬 ffmpeg로 만듦
+                # (원본이 없으면 원본과 같은 스트림을 받는 요청만 새로 받음 - 낮은 화질 MP4는 직접 변환)
+                result, video_title = await JobService._convert_from_source(
+                    video_id, job_url, job_format, job_quality, temp_path, reporter, handle, timer, output
+                )
+            elif video_id and output and progressive_outputs.supports(job_format):
+                result, metadata = await JobService._convert_progressive(
+                    job_url, job_quality, temp_path, output, reporter, handle, timer
+                )
+                video_title = metadata.title if metadata else "Untitled Video"
+            else:
+                result, metadata = await JobService._download(
+                    lambda info_json_path, options: build_ytdlp_command(
+                        job_format, job_quality, temp_path, job_url, info_json_path, options
+                    ),
+                    job_url, reporter, handle, timer
+                )
+                video_title = metadata.title if metadata else "Untitled Video"
+
+            timer.stop()
+
+            if handle.cancel_reason in (CANCELLED, DELETED):
+                # 취소된 작업만 종료하고, 이 변환에 합류해 있던 작업은 다시 대기열로
+                if inflight:
+                    job_ids = inflight.job_ids
+                    artifact_cache.end(cache_key, inflight)
+                await JobService._requeue_jobs([queued for queued in job_ids if queued != job_id])
+                if handle.cancel_reason == CANCELLED:
+                    await JobService._finish_jobs([job_id], {
+                        "status": JobStatus.CANCELLED,
+                        "error_message": handle.error_message
+                    }, timer=timer)
+                return
+
+            # 결과를 반영하기 전에 합류 목록을 확정 (이후 작업은 캐시 조회로 처리)
+            if inflight:
+                job_ids = inflight.job_ids
+                artifact_cache.end(cache_key, inflight)
+
+            if result.return_code == 0:
+                # 성공 - 제목 기반 파일명으로 변경
+                filename = f"{sanitize_filename(video_title)}_{job_db_id}.{job_format}"
+                os.replace(temp_path, DOWNLOAD_DIR / filename)
+                completed = True
+                file_size = await asyncio.to_thread(os.path.getsize, DOWNLOAD_DIR / filename)
+                BYTES_PRODUCED.labels(job_format).inc(file_size)
+                # 원격 저장소를 쓰면 백그라운드에서 업로드 (완료 전까지는 로컬 hot tier에서 제공)
+                await artifact_storage.store(filename, file_size)
+
+                finished = await JobService._finish_jobs(job_ids, {
+                    "status": JobStatus.COMPLETED,
+                    "progress": 100,
+                    "title": video_title,
+                    "filename": filename,
+                    "file_size": file_size,
+                    "completed_at": datetime.now(timezone.utc)
+                }, cache_key=cache_key, timer=timer)
+                if finished:
+                    storage_manager.record_added(file_size)
+                else:
+                    # 모든 작업의 lease를 잃음 - 다른 워커가 다시 변환하므로 이 결과는 버림
+                    await artifact_storage.delete(filename)
+            else:
+                # 실패
+                await JobService._finish_jobs(job_ids, {
+                    "status": JobStatus.FAILED,
+                    "error_message": result.output_tail
+                }, timer=timer)
+            
+        except Exception as e:
+            # 변환 실행 중 오류
+            if inflight:
+                job_ids = inflight.job_ids
+            await JobService._finish_jobs(job_ids, {
+                "status": JobStatus.FAILED,
+                "error_message": str(e)
+            }, timer=timer)
+        finally:
+            process_registry.end(job_id, handle)
+            if output:
+                progressive_outputs.end(output, DOWNLOAD_DIR / filename if completed else None)
+            if not completed:
+                # 중단/실패한 변환이 남긴 임시 파일(.part, 분리된 영상/음성 스트림 등) 정리
+                await asyncio.to_thread(_remove_partial_files, job_db_id)
+
+    @staticmethod
+    async def _download(build_command, job_url: str, reporter: ProgressReporter, handle: ConversionHandle,
+                        timer: StageTimer, run=None) -> tuple[YtdlpResult, Optional[VideoMetadata]]:
+        """
+        yt-dlp 실행 - 최근에 추출한 메타데이터가 있으면 재사용 (추출 단계 없이 바로 다운로드)
+        build_command(info_json_path, options)는 실행할 명령어를 반환
+        다운로드하는 동안 동시 조각 수와 대역폭 몫을 할당받아 options로 전달
+        run(command)을 주면 run_ytdlp 대신 사용 (ffmpeg 파이프 변환 등)
+        """
+        if run is None:
+            run = lambda command: run_ytdlp(command, reporter, handle)
+        metadata = metadata_cache.get(job_url)
+        if metadata:
+            reporter.set_title(metadata.title)
+            timer.start("download")
+        else:
+            timer.start("metadata")
+
+        async with bandwidth_manager.reserve(handle.job_id) as slot:
+            result = await run(build_command(metadata.info_path if metadata else None, slot.options))
+            if result.return_code != 0 and metadata and not handle.cancel_reason:
+                # 캐시된 스트림 URL이 만료되었을 수 있으므로 메타데이터를 새로 추출하여 한 번 더 시도
+                metadata_cache.invalidate(job_url)
+                metadata = None
+                timer.start("metadata")
+                result = await run(build_command(None, slot.options))
+
+        if not metadata and result.info:
+            metadata = await metadata_cache.put(job_url, result.info, result.info_json)
+        if metadata and metadata.duration:
+            reporter.set_duration(metadata.duration)
+        return result, metadata
+
+    @staticmethod
+    async def _convert_from_source(video_id: str, job_url: str, job_format: str, job_quality: str,
+                                   output_path: Path, reporter: ProgressReporter, handle: ConversionHandle,
+                                   timer: StageTimer, output: Optional[ProgressiveOutput] = None
+                                   ) -> tuple[YtdlpResult, str]:
+        """
+        캐시된 원본으로 변환 - 원본이 없으면 먼저 내려받아 캐시에 등록
+        다른 형식/품질로 이미 받은 원본이 있으면 네트워크 없이 ffmpeg 변환/remux만 수행
+        output이 있으면(MP3) 변환 중인 결과 파일을 스트리밍할 수 있게 표시
+        """
+        # 같은 영상의 원본을 동시에 두 번 받지 않도록 영상 단위로 잠금
+        async with source_cache.lock(video_id):
+            source = source_cache.find(video_id, job_format, job_quality)
+            if not source:
+                directory = source_cache.prepare(video_id, job_format)
+                try:
+                    if output and progressive_outputs.supports(job_format):
+                        # 원본을 받으면서 바로 MP3로 변환하고, 받은 음성 스트림은 원본 캐시용으로 함께 기록
+                        result, metadata = await JobService._convert_progressive(
+                            job_url, job_quality, output_path, output, reporter, handle, timer,
+                            source_path=directory / "audio.mka"
+                        )
+                        if result.return_code == 0:
+                            source = source_cache.add(video_id, job_format, result.info or {})
+                        return result, metadata.title if metadata else "Untitled Video"
+
+                    result, metadata = await JobService._download(
+                        lambda info_json_path, options: build_source_command(
+                            job_format, directory, job_url, info_json_path, options
+                        ),
+                        job_url, reporter, handle, timer
+                    )
+                    if result.return_code == 0:
+                        source = source_cache.add(video_id, job_format, result.info or {})
+                        if not source:
+                            result.return_code = -1
+                            result.output_tail = "Downloaded source file not found"
+                finally:
+                    if not source:
+                        source_cache.discard(video_id, job_format)
+                if not source:
+                    return result, metadata.title if metadata else "Untitled Video"
+            source_cache.retain(source)
+
+        try:
+            reporter.set_title(source.title)
+            if source.duration:
+                reporter.set_duration(source.duration)
+            await reporter.update(ProgressUpdate(postprocessing=True))
+            if output:
+                output.restart()
+                output.streaming = True
+            result = await run_ffmpeg(
+                build_ffmpeg_command(source, job_format, job_quality, output_path), handle
+            )
+            return result, source.title
+        finally:
+            source_cache.release(source)
+
+    @staticmethod
+    async def _convert_progressive(job_url: str, job_quality: str, output_path: Path, output: ProgressiveOutput,
+                                   reporter: ProgressReporter, handle: ConversionHandle, timer: StageTimer,
+                                   source_path: Optional[Path] = None
+                                   ) -> tuple[YtdlpResult, Optional[VideoMetadata]]:
+        """
+        MP3를 다운로드와 동시에 변환 (yt-dlp -o - | ffmpeg)
+        결과 파일이 받는 만큼 커지므로 완료 전에도 스트리밍 가능 (첫 바이트까지 수 초)
+        source_path가 있으면 받은 음성 스트림을 그대로 복사해 원본 캐시용 파일도 함께 기록
+        """
+        info_path = output_path.with_suffix(".info.json")
+        ffmpeg_command = build_stream_ffmpeg_command(job_quality, output_path, source_path)
+
+        async def run(command: list[str]) -> YtdlpResult:
+            # 메타데이터 재추출로 다시 실행하면 이전 시도의 결과를 읽던 요청은 중단
+            output.restart()
+            return await run_pipeline(command, ffmpeg_command, info_path, reporter, handle)
+
+        output.streaming = True
+        try:
+            return await JobService._download(
+                lambda info_json_path, options: build_stream_command(job_url, info_path, info_json_path, options),
+                job_url, reporter, handle, timer, run=run
+            )
+        finally:
+            info_path.unlink(missing_ok=True)
+
+    @staticmethod
+    async def _requeue_jobs(job_ids: list[str]):
+        """
+        진행 중인 변환에 합류해 있던 작업을 PENDING으로 되돌려 다시 실행되게 함
+        (lease를 잃어 이미 다른 워커가 가져간 작업은 건드리지 않음)
+        """
+        if not job_ids:
+            return
+        async with async_session() as session:
+            await job_store.write_dirty(session, job_ids)
+            result = await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.job_id.in_(job_ids))
+                .where(ConversionJob.status == JobStatus.PROCESSING)
+                .where(job_queue.owned())
+                .values(status=JobStatus.PENDING, progress=0, speed=None, eta=None,
+                        claimed_by=None, lease_expires_at=None)
+                .returning(ConversionJob.job_id)
+            )
+            requeued = result.scalars().all()
+            await session.commit()
+        job_store.evict(job_ids)
+        for queued_job_id in requeued:
+            job_events.publish(queued_job_id, status=JobStatus.PENDING.value, progress=0)
+        if requeued:
+            job_queue.enqueue(requeued[0])
+
+    @staticmethod
+    async def cancel_job(job_id: str) -> bool:
+        """
+        대기 중이거나 실행 중인 작업을 취소
+        - 이 프로세스에서 실행 중이면 yt-dlp/ffmpeg 프로세스를 바로 종료
+        - 진행 중인 변환에 합류해 대기 중이면 대기 목록에서만 제거
+        - 다른 프로세스가 실행 중이면 DB에 CANCELLED로 기록하고, 그 프로세스가 lease 갱신 때 확인하여 종료
+
+        Returns:
+            취소되었는지 여부 (이미 끝난 작업이면 False)
+        """
+        if await process_registry.cancel(job_id, CANCELLED):
+            return True
+
+        if artifact_cache.detach(job_id):
+            await JobService._finish_jobs([job_id], {
+                "status": JobStatus.CANCELLED,
+                "error_message": "Conversion cancelled"
+            })
+            return True
+
+        async with async_session() as session:
+            result = await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.job_id == job_id)
+                .where(ConversionJob.status.in_([JobStatus.PENDING, JobStatus.PROCESSING]))
+                .values(status=JobStatus.CANCELLED, error_message="Conversion cancelled",
+                        speed=None, eta=None)
+            )
+            await session.commit()
+        if not result.rowcount:
+            return False
+        job_events.publish(job_id, status=JobStatus.CANCELLED.value, error_message="Conversion cancelled",
+                           speed=None, eta=None)
+        return True
+
+    @staticmethod
+    async def _finish_jobs(job_ids: list[str], values: dict, cache_key=None,
+                           timer: Optional[StageTimer] = None) -> list[str]:
+        """
+        작업들을 완료/실패 상태로 변경하고 이벤트 발행
+        - 아직 반영되지 않은 진행 상태와 최종 상태를 한 트랜잭션으로 기록한 뒤 메모리에서 제거
+        - 이 프로세스가 lease를 가진 작업만 변경 (lease를 잃어 다른 워커가 가져간 작업의 결과는 버림)
+        - cache_key가 있으면 결과 파일을 캐시에 등록 (참조 수 = 실제로 갱신된 작업 수)
+        - timer가 있으면 단계별 소요 시간을 함께 기록
+
+        Returns:
+            실제로 변경된 작업 ID 목록
+        """
+        values = {"speed": None, "eta": None, **values}
+        if timer:
+            values["stage_timings"] = json.dumps(timer.finish())
+        if values.get("filename") and "file_size" not in values:
+            # 용량 관리를 위해 결과 파일 크기 기록
+            values["file_size"] = await asyncio.to_thread(os.path.getsize, DOWNLOAD_DIR / values["filename"])
+        async with async_session() as session:
+            await job_store.write_dirty(session, job_ids)
+            result = await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.job_id.in_(job_ids))
+                .where(job_queue.owned())
+                .values(**values)
+                .returning(ConversionJob.job_id)
+            )
+            finished = result.scalars().all()
+            if not finished:
+                # 진행 상태도 새 점유자의 값을 덮어쓰지 않도록 함께 버림
+                await session.rollback()
+            else:
+                if cache_key:
+                    artifact_cache.store(session, cache_key, values["filename"], values.get("title"), len(finished))
+                await session.commit()
+        job_store.evict(job_ids)
+        JOBS_FINISHED.labels(values["status"].value).inc(len(finished))
+
+        event = {key: value for key, value in values.items() if key not in ("completed_at", "stage_timings")}
+        event["status"] = values["status"].value
+        if values.get("completed_at"):
+            event["completed_at"] = format_datetime_utc(values["completed_at"])
+        for finished_job_id in finished:
+            job_events.publish(finished_job_id, **event)
+        return finished
     
     @staticmethod
     async def get_job(job_id: str) -> ConversionJob:
+        # 이 프로세스에서 실행 중인 작업은 메모리에서 응답
+        state = job_store.get(job_id)
+        if state:
+            return state
         async with async_session() as session:
             result = await session.execute(
                 select(ConversionJob).where(ConversionJob.job_id == job_id)
@@ -231,15 +742,70 @@ class JobService:
             return result.scalar_one_or_none()
     
     @staticmethod
-    async def get_jobs(job_ids: list[str]) -> list[ConversionJob]:
+    async def get_job_versions(job_ids: list[str]) -> dict[str, int]:
+        """
+        작업별 버전 (조건부 요청 확인용 - 레코드 전체를 읽지 않음)
+        없는 작업은 결과에서 빠짐
+        """
+        versions = {}
+        for job_id in job_ids:
+            state = job_store.get(job_id)
+            if state:
+                versions[job_id] = state.version
+        remaining = set(job_ids) - set(versions)
+        if remaining:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(ConversionJob.job_id, ConversionJob.version)
+                    .where(ConversionJob.job_id.in_(remaining))
+                )
+                versions.update({job_id: version for job_id, version in result.all()})
+        return versions
+
+    @staticmethod
+    async def get_jobs(job_ids: list[str], since: Optional[datetime] = None) -> list[ConversionJob]:
+        """
+        이 프로세스에서 실행 중인 작업은 메모리에서, 나머지만 DB에서 조회
+        since가 있으면 그 이후에 변경된 작업만
+        """
+        jobs = [job_store.get(job_id) for job_id in job_ids]
+        jobs = [job for job in jobs if job]
+        remaining = set(job_ids) - {job.job_id for job in jobs}
+        if since:
+            jobs = [job for job in jobs if job.updated_at and as_utc(job.updated_at) > since]
+        if remaining:
+            query = select(ConversionJob).where(ConversionJob.job_id.in_(remaining))
+            if since:
+                query = query.where(ConversionJob.updated_at > since)
+            async with async_session() as session:
+                result = await session.execute(query)
+                jobs += result.scalars().all()
+        return sorted(jobs, key=lambda job: (job.created_at is not None, job.created_at, job.id), reverse=True)
+    
+    @staticmethod
+    async def get_completed_filenames(job_ids: list[str], batch_id: Optional[str] = None) -> list[str]:
+        """
+        완료된 작업들의 결과 파일명 (같은 파일을 공유하는 작업은 한 번만)
+        batch_id가 있으면 해당 일괄 작업의 완료된 작업도 포함
+        """
+        conditions = []
+        if job_ids:
+            conditions.append(ConversionJob.job_id.in_(job_ids))
+        if batch_id:
+            conditions.append(ConversionJob.batch_id == batch_id)
+        if not conditions:
+            return []
+
         async with async_session() as session:
             result = await session.execute(
-                select(ConversionJob)
-                .where(ConversionJob.job_id.in_(job_ids))
-                .order_by(ConversionJob.created_at.desc())
+                select(ConversionJob.filename)
+                .where(or_(*conditions))
+                .where(ConversionJob.status == JobStatus.COMPLETED)
+                .where(ConversionJob.filename.isnot(None))
+                .order_by(ConversionJob.created_at, ConversionJob.id)
             )
-            return result.scalars().all()
-    
+            return list(dict.fromkeys(result.scalars().all()))
+
     @staticmethod
     async def get_all_jobs(limit: int = 50) -> list[ConversionJob]:
         async with async_session() as session:
@@ -251,28 +817,76 @@ class JobService:
             return result.scalars().all()
 
     @staticmethod
-    async def get_paginated_jobs(page: int, per_page: int) -> tuple[int, list[ConversionJob]]:
+    async def count_jobs(status: Optional[JobStatus] = None) -> int:
         """
-        페이지네이션된 작업 목록과 전체 작업 수를 반환
+        전체(또는 상태별) 작업 수 - 행을 읽지 않고 인덱스로 COUNT
         """
         async with async_session() as session:
-            # 전체 작업 수 조회
-            count_result = await session.execute(
-                select(ConversionJob)
-            )
-            total_count = len(count_result.scalars().all())
+            query = select(func.count()).select_from(ConversionJob)
+            if status:
+                query = query.where(ConversionJob.status == status)
+            result = await session.execute(query)
+            return result.scalar_one()
 
-            # 페이지네이션된 작업 목록 조회
-            offset = (page - 1) * per_page
-            result = await session.execute(
-                select(ConversionJob)
-                .order_by(ConversionJob.created_at.desc())
-                .limit(per_page)
-                .offset(offset)
+    @staticmethod
+    async def get_jobs_page(per_page: int, after: Optional[int] = None, before: Optional[int] = None,
+                            last: bool = False, status: Optional[JobStatus] = None) -> JobPage:
+        """
+        최신순 작업 목록을 (created_at, id) 키셋 기준으로 조회 (OFFSET 없이 인덱스 범위 검색)
+
+        Args:
+            per_page: 페이지당 작업 수
+            after: 이 작업보다 오래된 작업부터 (다음 페이지)
+            before: 이 작업보다 최근 작업까지 (이전 페이지)
+            last: 가장 오래된 페이지
+            status: 상태 필터 ((status, created_at, id) 인덱스 사용)
+        """
+        query = select(ConversionJob)
+        if status:
+            query = query.where(ConversionJob.status == status)
+
+        cursor_id = after if after is not None else before
+        if cursor_id is not None:
+            # 커서 작업의 created_at은 DB에 저장된 값 그대로 비교 (파이썬 datetime 직렬화 형식 차이 방지)
+            cursor_job = aliased(ConversionJob)
+            cursor_created_at = (
+                select(cursor_job.created_at).where(cursor_job.id == cursor_id).scalar_subquery()
             )
-            jobs = result.scalars().all()
+            if after is not None:
+                query = query.where(or_(
+                    ConversionJob.created_at < cursor_created_at,
+                    and_(ConversionJob.created_at == cursor_created_at, ConversionJob.id < cursor_id)
+                ))
+            else:
+                query = query.where(or_(
+                    ConversionJob.created_at > cursor_created_at,
+                    and_(ConversionJob.created_at == cursor_created_at, ConversionJob.id > cursor_id)
+                ))
+
+        # 이전/마지막 페이지는 오래된 순으로 읽은 뒤 뒤집음
+        ascending = before is not None or (last and after is None)
+        if ascending:
+            query = query.order_by(ConversionJob.created_at.asc(), ConversionJob.id.asc())
+        else:
+            query = query.order_by(ConversionJob.created_at.desc(), ConversionJob.id.desc())
 
-            return total_count, jobs
+        async with async_session() as session:
+            # 한 건 더 읽어 다음 페이지가 있는지 확인
+            result = await session.execute(query.limit(per_page + 1))
+            jobs = list(result.scalars().all())
+
+        has_more = len(jobs) > per_page
+        jobs = jobs[:per_page]
+        if ascending:
+            jobs.reverse()
+
+        page = JobPage(total_count=await JobService.count_jobs(status), jobs=jobs)
+        if jobs:
+            has_older = has_more if not ascending else before is not None
+            has_newer = has_more if ascending else after is not None
+            page.next_cursor = jobs[-1].id if has_older else None
+            page.prev_cursor = jobs[0].id if has_newer else None
+        return page
     
     @staticmethod
     async def get_jobs_by_status(status: JobStatus, limit: int = 50) -> list[ConversionJob]:
@@ -301,13 +915,20 @@ class JobService:
                 file_deleted = False
                 file_error = None
 
+                # 실행 중이면 프로세스를 먼저 종료 (종료 후 파일이 다시 만들어지지 않도록)
+                # 진행 중인 변환을 기다리던 작업이면 대기 목록에서 제거
+                await process_registry.cancel(job_id, DELETED)
+                artifact_cache.detach(job_id)
+                job_store.discard(job_id)
+
                 # 1. filename 속성이 있으면 해당 파일 삭제
+                #    (다른 작업과 공유하는 캐시 파일이면 마지막 참조가 삭제될 때만 삭제)
                 if job.filename:
-                    filepath = DOWNLOAD_DIR / job.filename
                     try:
-                        if filepath.exists():
-                            filepath.unlink()
-                            file_deleted = True
+                        if await artifact_cache.release(session, job.filename):
+                            file_deleted = await artifact_storage.delete(job.filename)
+                            if file_deleted and job.file_size:
+                                storage_manager.record_removed(job.file_size)
                     except Exception as e:
                         file_error = e
 
@@ -315,11 +936,8 @@ class JobService:
                 elif job.title and job.format:
                     sanitized_title = sanitize_filename(job.title)
                     filename = f"{sanitized_title}_{job.id}.{job.format}"
-                    filepath = DOWNLOAD_DIR / filename
                     try:
-                        if filepath.exists():
-                            filepath.unlink()
-                            file_deleted = True
+                        file_deleted = await artifact_storage.delete(filename)
                     except Exception as e:
                         file_error = e
 
@@ -332,13 +950,14 @@ class JobService:
 
                 await session.delete(job)
                 await session.commit()
+                job_events.publish(job_id, deleted=True)
                 return True
 
         except Exception as e:
             return False
     
     @staticmethod
-    async def retry_job(job_id: str) -> str:
+    async def retry_job(job_id: str, submitter: Optional[str] = None) -> str:
         try:
             async with async_session() as session:
                 result = await session.execute(
@@ -354,17 +973,24 @@ class JobService:
                 new_job = ConversionJob(
                     job_id=new_job_id,
                     url=old_job.url,
+                    video_id=extract_video_id(old_job.url),
                     format=old_job.format,
                     quality=old_job.quality,
+                    submitter=submitter or old_job.submitter,
+                    priority=old_job.priority,
+                    duration=old_job.duration,
                     status=JobStatus.PENDING
                 )
                 session.add(new_job)
                 await session.commit()
                 
-                # 백그라운드 작업 시작
-                asyncio.create_task(JobService.process_job(new_job_id))
+                # 작업 큐에 등록
+                job_queue.enqueue(new_job_id)
                 
                 return new_job_id
                 
         except Exception as e:
-            return None
\ No newline at end of file
+            return None
+
+
+job_queue = JobQueue(JobService.process_job)
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.job import ConversionJob, JobStatus
+from database import async_session
+
+# 진행 중인 작업의 변경 사항을 DB에 모아서 반영하는 간격 (초)
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2"))
+
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.EXPIRED, JobStatus.CANCELLED}
+
+
+@dataclass(slots=True)
+class JobState:
+    """
+    진행 중인 작업의 메모리 레코드 (ConversionJob과 같은 속성 이름을 사용하므로 API/템플릿에서 그대로 사용 가능)
+    """
+    id: int
+    job_id: str
+    url: str
+    video_id: Optional[str]
+    format: str
+    quality: str
+    batch_id: Optional[str] = None
+    submitter: Optional[str] = None
+    priority: int = 0
+    duration: Optional[int] = None
+    title: Optional[str] = None
+    filename: Optional[str] = None
+    status: str = JobStatus.PENDING
+    progress: int = 0
+    speed: Optional[int] = None
+    eta: Optional[int] = None
+    error_message: Optional[str] = None
+    version: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    @classmethod
+    def from_model(cls, job: ConversionJob) -> "JobState":
+        return cls(**{field.name: getattr(job, field.name) for field in fields(cls)})
+
+
+class JobStore:
+    """
+    이 프로세스가 점유한 진행 중인 작업 상태를 메모리에 보관하는 write-behind 저장소
+    - 상태/진행률 변경은 메모리에만 반영하고, 변경된 필드를 PROGRESS_FLUSH_INTERVAL마다 한 트랜잭션으로 DB에 기록
+    - 완료/실패 시점에는 남은 변경 사항과 최종 상태를 즉시 기록하고 메모리에서 제거
+    - /api/job, /api/jobs 및 상태 스트림 스냅샷은 진행 중인 작업을 DB 조회 없이 메모리에서 응답
+    """
+
+    def __init__(self, flush_interval: float = PROGRESS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._live: dict[str, JobState] = {}
+        self._dirty: dict[str, dict] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def add(self, job: ConversionJob) -> JobState:
+        state = JobState.from_model(job)
+        self._live[state.job_id] = state
+        return state
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        return self._live.get(job_id)
+
+    async def load(self, job_id: str) -> Optional[JobState]:
+        """
+        메모리에 없으면 DB에서 읽어 보관
+        """
+        state = self._live.get(job_id)
+        if state:
+            return state
+        async with async_session() as session:
+            result = await session.execute(
+                select(ConversionJob).where(ConversionJob.job_id == job_id)
+            )
+            job = result.scalar_one_or_none()
+        if not job or job.status in TERMINAL_STATUSES:
+            return None
+        return self._live.setdefault(job_id, JobState.from_model(job))
+
+    def update(self, job_id: str, **values):
+        """
+        메모리 레코드를 갱신하고 다음 반영 때 DB에 쓸 필드로 표시
+        버전/변경 시각도 메모리에서 올리고 DB에는 그 값을 그대로 기록 (상태 API의 ETag/변경 커서 기준)
+        """
+        state = self._live.get(job_id)
+        if state:
+            for key, value in values.items():
+                setattr(state, key, value)
+            state.version += 1
+            state.updated_at = datetime.now(timezone.utc)
+            values = {**values, "version": state.version, "updated_at": state.updated_at}
+        self._dirty.setdefault(job_id, {}).update(values)
+
+    def discard(self, job_id: str):
+        """
+        삭제된 작업을 메모리와 반영 대기 목록에서 제거
+        """
+        self._live.pop(job_id, None)
+        self._dirty.pop(job_id, None)
+
+    def evict(self, job_ids: Iterable[str]):
+        for job_id in job_ids:
+            self._live.pop(job_id, None)
+
+    async def write_dirty(self, session: AsyncSession, job_ids: Optional[Iterable[str]] = None):
+        """
+        반영 대기 중인 변경 사항을 session에 기록 (커밋은 호출한 쪽에서)
+        job_ids가 없으면 전체
+        """
+        if job_ids is None:
+            pending, self._dirty = self._dirty, {}
+        else:
+            pending = {job_id: self._dirty.pop(job_id) for job_id in job_ids if job_id in self._dirty}
+        for job_id, values in pending.items():
+            await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.job_id == job_id)
+                .values(**values)
+            )
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        pending = dict(self._dirty)
+        try:
+            async with async_session() as session:
+                await self.write_dirty(session)
+                await session.commit()
+        except Exception:
+            # 실패한 변경 사항은 그 사이 들어온 새 값을 덮어쓰지 않도록 되돌려 다음 주기에 다시 시도
+            for job_id, values in pending.items():
+                self._dirty[job_id] = {**values, **self._dirty.get(job_id, {})}
+            raise
+
+    async def start(self):
+        self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    async def _run_flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # 다음 주기에 다시 시도
+
+
+job_store = JobStore()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+
+# 캐시할 최대 영상 수 / 유효 시간(초)
+# YouTube 스트림 URL은 몇 시간 뒤 만료되므로 TTL은 그보다 짧게 유지
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "256"))
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "1800"))
+
+# yt-dlp --load-info-json 으로 재사용할 info JSON 저장 경로
+METADATA_CACHE_DIR = Path(os.getenv("METADATA_CACHE_DIR", str(DOWNLOAD_DIR / ".metadata")))
+
+
+@dataclass
+class VideoMetadata:
+    title: str
+    duration: Optional[int]
+    formats: list[dict] = field(default_factory=list)
+    info_path: Optional[Path] = None  # 전체 info JSON 파일 (yt-dlp에 다시 전달)
+    expires_at: float = 0.0
+
+
+def summarize_formats(info: dict) -> list[dict]:
+    """
+    info JSON의 formats 목록에서 화질/코덱 선택에 필요한 필드만 추림
+    """
+    keys = ("format_id", "ext", "height", "abr", "vcodec", "acodec", "filesize")
+    return [{key: fmt.get(key) for key in keys} for fmt in info.get("formats") or []]
+
+
+class MetadataCache:
+    """
+    표준 URL 기준 영상 메타데이터 캐시 (TTL + LRU)
+    - 제목/길이/포맷 목록은 메모리에, 전체 info JSON은 파일로 보관
+    - 캐시 적중 시 yt-dlp에 --load-info-json으로 전달하여 추출 단계를 건너뜀
+    """
+
+    def __init__(self, max_entries: int = METADATA_CACHE_SIZE, ttl: float = METADATA_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, VideoMetadata] = OrderedDict()
+
+    def get(self, url: str) -> Optional[VideoMetadata]:
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic() or (entry.info_path and not entry.info_path.exists()):
+            self.invalidate(url)
+            return None
+        self._entries.move_to_end(url)
+        return entry
+
+    async def put(self, url: str, info: dict, raw: Optional[str] = None) -> VideoMetadata:
+        """
+        yt-dlp info JSON을 캐시에 저장
+
+        Args:
+            url: 표준 URL
+            info: 파싱된 info JSON
+            raw: 원본 JSON 문자열 (있으면 다시 직렬화하지 않고 그대로 저장)
+        """
+        info_path = METADATA_CACHE_DIR / f"{uuid.uuid4().hex}.info.json"
+        await asyncio.to_thread(self._write, info_path, raw if raw is not None else json.dumps(info))
+
+        self.invalidate(url)
+        entry = VideoMetadata(
+            title=info.get("title") or "Untitled Video",
+            duration=int(info["duration"]) if info.get("duration") else None,
+            formats=summarize_formats(info),
+            info_path=info_path,
+            expires_at=time.monotonic() + self.ttl
+        )
+        self._entries[url] = entry
+
+        while len(self._entries) > self.max_entries:
+            oldest_url = next(iter(self._entries))
+            self.invalidate(oldest_url)
+        return entry
+
+    def invalidate(self, url: str):
+        entry = self._entries.pop(url, None)
+        if entry and entry.info_path:
+            entry.info_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write(path: Path, content: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# 변환 단계별 소요 시간 구간 (초) - 짧은 메타데이터 추출부터 긴 영상 다운로드까지
+_STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+QUEUE_DEPTH = Gauge("ytc_queue_depth", "대기 중인 작업 수 (PENDING)")
+ACTIVE_WORKERS = Gauge("ytc_active_workers", "이 프로세스에서 작업을 실행 중인 워커 수")
+STAGE_SECONDS = Histogram(
+    "ytc_job_stage_seconds", "변환 단계별 소요 시간", ["stage"], buckets=_STAGE_BUCKETS
+)
+JOBS_FINISHED = Counter("ytc_jobs_finished_total", "완료/실패한 작업 수", ["status"])
+YTDLP_EXIT_CODES = Counter("ytc_ytdlp_exit_total", "yt-dlp 종료 코드별 실행 횟수", ["engine", "code"])
+BYTES_PRODUCED = Counter("ytc_bytes_produced_total", "새로 변환된 파일 크기 합계", ["format"])
+DOWNLOAD_BYTES = Counter("ytc_download_bytes_total", "대역폭 관리 프록시를 거쳐 받은 바이트 수")
+STREAM_READERS = Gauge("ytc_stream_readers", "만들어지는 중인 파일(변환 중인 MP3, 원격 저장소에서 가져오는 파일)을 스트리밍으로 받고 있는 요청 수")
+STORAGE_UPLOADS = Counter("ytc_storage_uploads_total", "원격 저장소 업로드 결과별 횟수", ["result"])
+HOT_TIER_REQUESTS = Counter("ytc_hot_tier_requests_total", "다운로드 요청의 로컬 hot tier 적중/미적중 수", ["result"])
+ADMISSION_REJECTED = Counter(
+    "ytc_admission_rejected_total", "수락 제어로 거절한 작업 생성 요청 수", ["reason"]
+)
+DB_QUERY_SECONDS = Histogram("ytc_db_query_seconds", "SQL 문 실행 시간", buckets=_DB_BUCKETS)
+DB_TRANSACTION_SECONDS = Histogram(
+    "ytc_db_transaction_seconds", "DB 트랜잭션(세션) 시작부터 커밋/롤백까지 시간", ["outcome"], buckets=_DB_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "ytc_http_request_seconds", "HTTP 요청 처리 시간 (응답 헤더까지)", ["method", "route", "status"]
+)
+
+
+class StageTimer:
+    """
+    작업 하나의 단계별 소요 시간 측정
+    - start(stage)는 진행 중인 단계를 끝내고 새 단계를 시작
+    - 측정값은 히스토그램에 반영되고, timings는 작업 레코드(stage_timings)에 저장됨
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self.stage: Optional[str] = None
+        self._started = 0.0
+        self._created = time.monotonic()
+
+    def start(self, stage: str):
+        if stage == self.stage:
+            return
+        self.stop()
+        self.stage = stage
+        self._started = time.monotonic()
+
+    def stop(self):
+        if self.stage is None:
+            return
+        self.observe(self.stage, time.monotonic() - self._started)
+        self.stage = None
+
+    def observe(self, stage: str, seconds: float):
+        seconds = max(0.0, seconds)
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds, 3)
+        STAGE_SECONDS.labels(stage).observe(seconds)
+
+    def observe_queue_wait(self, created_at: Optional[datetime]):
+        """
+        작업 생성부터 워커가 가져갈 때까지의 대기 시간
+        """
+        if not created_at:
+            return
+        if not created_at.tzinfo:
+            # SQLite는 timezone 정보를 저장하지 않으므로 UTC로 간주
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        self.observe("queue_wait", (datetime.now(timezone.utc) - created_at).total_seconds())
+
+    def finish(self) -> dict[str, float]:
+        """
+        진행 중인 단계를 끝내고 워커에서 처리한 전체 시간을 포함한 결과 반환
+        """
+        self.stop()
+        self.observe("total", time.monotonic() - self._created)
+        return self.timings
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    SQL 문 실행 시간과 트랜잭션 시간을 히스토그램에 기록
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin(conn):
+        conn.info["transaction_started"] = time.perf_counter()
+
+    def _end(outcome: str):
+        def listener(conn):
+            started = conn.info.pop("transaction_started", None)
+            if started is not None:
+                DB_TRANSACTION_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+        return listener
+
+    event.listen(sync_engine, "commit", _end("commit"))
+    event.listen(sync_engine, "rollback", _end("rollback"))
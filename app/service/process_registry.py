@@ -0,0 +1,162 @@
+import asyncio
+import os
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+# 작업 하나의 최대 실행 시간 (초, 0이면 제한 없음) - 메타데이터 재추출 재시도 포함
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "3600"))
+
+# yt-dlp 출력/진행률이 이 시간 동안 없으면 멈춘 것으로 보고 중단 (초, 0이면 사용 안 함)
+JOB_STALL_TIMEOUT = float(os.getenv("JOB_STALL_TIMEOUT", "300"))
+
+# 종료 요청(SIGTERM) 후 강제 종료(SIGKILL)까지 기다리는 시간 (초)
+CANCEL_GRACE_PERIOD = float(os.getenv("CANCEL_GRACE_PERIOD", "5"))
+
+# 실행 시간 제한/진행 없음 확인 간격 (초)
+WATCHDOG_INTERVAL = 1
+
+# 중단 사유
+CANCELLED = "cancelled"  # 사용자가 취소
+DELETED = "deleted"      # 작업 삭제
+TIMEOUT = "timeout"      # JOB_TIMEOUT 초과
+STALLED = "stalled"      # JOB_STALL_TIMEOUT 동안 진행 없음
+
+
+class ConversionHandle:
+    """
+    실행 중인 변환 하나의 제어 정보
+    - 엔진(subprocess/pool)이 실행 중인 프로세스를 종료하는 함수를 등록(attach)
+    - 출력이나 진행률이 들어올 때마다 touch()로 마지막 활동 시각을 갱신
+    - cancel()은 사유를 기록하고 프로세스를 종료 (실행 전이면 사유만 기록하고 실행하지 않음)
+    """
+
+    def __init__(self, job_id: str, timeout: float = JOB_TIMEOUT, stall_timeout: float = JOB_STALL_TIMEOUT):
+        self.job_id = job_id
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.started = time.monotonic()
+        self.last_activity = self.started
+        self.cancel_reason: Optional[str] = None
+        self._kill: Optional[Callable[[], Awaitable[None]]] = None
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def attach(self, kill: Callable[[], Awaitable[None]]):
+        self._kill = kill
+        self.touch()
+
+    def detach(self):
+        self._kill = None
+
+    def check_deadlines(self) -> Optional[str]:
+        """
+        실행 시간 제한을 넘었거나 멈춘 경우 그 사유를 반환
+        """
+        now = time.monotonic()
+        if self.timeout and now - self.started > self.timeout:
+            return TIMEOUT
+        if self.stall_timeout and self._kill and now - self.last_activity > self.stall_timeout:
+            return STALLED
+        return None
+
+    async def cancel(self, reason: str):
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+        if self._kill:
+            await self._kill()
+
+    @property
+    def error_message(self) -> str:
+        if self.cancel_reason == TIMEOUT:
+            return f"Conversion timed out after {int(self.timeout)}s"
+        if self.cancel_reason == STALLED:
+            return f"Conversion stalled (no progress for {int(self.stall_timeout)}s)"
+        return "Conversion cancelled"
+
+
+class ProcessRegistry:
+    """
+    이 프로세스에서 실행 중인 변환(작업 ID 기준) 목록
+    취소/삭제 요청 시 실행 중인 yt-dlp/ffmpeg 프로세스를 바로 종료하는 데 사용
+    """
+
+    def __init__(self):
+        self._handles: dict[str, ConversionHandle] = {}
+
+    def begin(self, job_id: str) -> ConversionHandle:
+        handle = ConversionHandle(job_id)
+        self._handles[job_id] = handle
+        return handle
+
+    def end(self, job_id: str, handle: ConversionHandle):
+        if self._handles.get(job_id) is handle:
+            del self._handles[job_id]
+
+    def get(self, job_id: str) -> Optional[ConversionHandle]:
+        return self._handles.get(job_id)
+
+    @property
+    def job_ids(self) -> list[str]:
+        return list(self._handles)
+
+    async def cancel(self, job_id: str, reason: str = CANCELLED) -> bool:
+        """
+        실행 중인 변환을 중단하고 프로세스가 종료될 때까지 대기
+
+        Returns:
+            이 프로세스에서 실행 중인 변환이었는지 여부
+        """
+        handle = self._handles.get(job_id)
+        if not handle:
+            return False
+        await handle.cancel(reason)
+        return True
+
+
+@asynccontextmanager
+async def supervise(handle: Optional[ConversionHandle]):
+    """
+    블록 안에서 실행되는 프로세스의 실행 시간 제한/진행 없음을 감시하고, 끝나면 종료 함수 등록을 해제
+    """
+    watchdog = asyncio.create_task(_watch(handle)) if handle else None
+    try:
+        yield
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        if handle:
+            handle.detach()
+
+
+async def _watch(handle: ConversionHandle):
+    while True:
+        await asyncio.sleep(WATCHDOG_INTERVAL)
+        reason = handle.check_deadlines()
+        if reason:
+            await handle.cancel(reason)
+            return
+
+
+async def terminate_process_group(process: asyncio.subprocess.Process, grace_period: float = CANCEL_GRACE_PERIOD):
+    """
+    start_new_session=True로 실행한 프로세스와 그 자식(ffmpeg 등)을 모두 종료
+    SIGTERM 후 grace_period 안에 끝나지 않으면 SIGKILL
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(process.wait(), timeout=grace_period)
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+process_registry = ProcessRegistry()
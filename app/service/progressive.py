@@ -0,0 +1,136 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+from service.ytdlp_runner import YTDLP_ENGINE
+from service.metrics import STREAM_READERS
+
+# MP3 작업을 yt-dlp -> ffmpeg 파이프로 다운로드와 동시에 변환하여 완료 전에도 스트리밍 (YTDLP_ENGINE=subprocess에서만)
+# false면 기존처럼 다운로드가 끝난 뒤 변환 (원본 캐시에서 만드는 MP3는 그대로 스트리밍 가능)
+PROGRESSIVE_MP3 = os.getenv("PROGRESSIVE_MP3", "true").lower() == "true"
+
+# 스트리밍 응답이 파일 끝에서 새 데이터를 기다리는 최대 간격 (초)
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "0.5"))
+
+# 한 번에 읽어 보내는 크기
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StreamAborted(Exception):
+    """
+    변환이 실패/취소되었거나 다시 시작되어 스트림을 끝까지 보낼 수 없음
+    """
+
+
+@dataclass
+class ProgressiveOutput:
+    """
+    변환 중인 MP3 결과 파일 하나 - 변환 작업 하나가 쓰고 여러 스트리밍 요청이 함께 읽음
+    job_ids: 이 결과를 받는 작업들 (같은 변환에 합류한 작업 포함)
+    """
+    job_id: str
+    path: Path
+    job_ids: Callable[[], list[str]]
+    streaming: bool = False  # 결과 파일이 변환 진행에 맞춰 커지는 방식으로 만드는 중
+    attempt: int = 0         # 변환을 다시 시작할 때마다 증가 (이전 시도의 파일을 읽던 요청은 중단)
+    final_path: Optional[Path] = None
+    failed: bool = False
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def restart(self):
+        """
+        변환을 (다시) 시작하기 전에 이전 시도가 남긴 파일을 버림
+        """
+        self.attempt += 1
+        self.path.unlink(missing_ok=True)
+
+
+class ProgressiveOutputs:
+    """
+    이 프로세스에서 변환 중인 MP3 결과 파일 목록
+    - 스트리밍 요청은 결과 파일의 끝을 따라가며(tail-follow) 만들어지는 대로 전송하고, 변환이 끝나면 종료
+    - 같은 작업(합류한 작업 포함)을 여러 요청이 봐도 변환은 한 번이고 각 요청은 같은 파일을 읽기만 함
+    - 완료 시 임시 파일이 제목 기반 이름으로 바뀌어도 이미 연 파일은 그대로 이어서 읽음
+    """
+
+    def __init__(self, enabled: bool = PROGRESSIVE_MP3):
+        self.enabled = enabled
+        self._outputs: dict[str, ProgressiveOutput] = {}
+
+    def supports(self, format: str) -> bool:
+        """
+        다운로드와 동시에 변환(파이프)할 수 있는 요청인지
+        """
+        return self.enabled and format == "mp3" and YTDLP_ENGINE == "subprocess"
+
+    def begin(self, job_id: str, path: Path, job_ids: Callable[[], list[str]]) -> ProgressiveOutput:
+        output = ProgressiveOutput(job_id=job_id, path=path, job_ids=job_ids)
+        self._outputs[job_id] = output
+        return output
+
+    def end(self, output: ProgressiveOutput, final_path: Optional[Path]):
+        """
+        변환 종료 - final_path가 없으면 실패/취소 (읽던 요청은 중단)
+        """
+        output.final_path = final_path
+        output.failed = final_path is None
+        output.finished.set()
+        self._outputs.pop(output.job_id, None)
+
+    def get(self, job_id: str) -> Optional[ProgressiveOutput]:
+        output = self._outputs.get(job_id)
+        if output:
+            return output
+        # 합류한 작업은 변환을 실행하는 작업의 결과를 함께 읽음
+        return next((output for output in self._outputs.values() if job_id in output.job_ids()), None)
+
+    async def read(self, output: ProgressiveOutput) -> AsyncIterator[bytes]:
+        """
+        결과 파일을 처음부터 읽어 전달하고, 끝에 닿으면 새 데이터나 변환 종료를 기다림
+
+        Raises:
+            StreamAborted: 변환 실패/취소 또는 다시 시작
+        """
+        STREAM_READERS.inc()
+        file = None
+        try:
+            # 첫 데이터가 기록되기 전이면 파일이 생길 때까지 대기
+            while file is None:
+                if output.failed:
+                    raise StreamAborted()
+                attempt = output.attempt
+                path = output.final_path if output.finished.is_set() else output.path
+                try:
+                    file = await asyncio.to_thread(open, path, "rb")
+                except FileNotFoundError:
+                    if output.finished.is_set():
+                        raise StreamAborted()
+                    await self._wait(output)
+
+            while True:
+                # 읽기 전에 종료 여부를 확인해야 종료 직전에 기록된 데이터를 놓치지 않음
+                finished = output.finished.is_set()
+                if output.failed or output.attempt != attempt:
+                    raise StreamAborted()
+                chunk = await asyncio.to_thread(file.read, STREAM_CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                elif finished:
+                    return
+                else:
+                    await self._wait(output)
+        finally:
+            STREAM_READERS.dec()
+            if file:
+                file.close()
+
+    @staticmethod
+    async def _wait(output: ProgressiveOutput):
+        try:
+            await asyncio.wait_for(output.finished.wait(), timeout=STREAM_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+progressive_outputs = ProgressiveOutputs()
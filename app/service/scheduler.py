@@ -0,0 +1,95 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+# 요청자별 실행 중인 작업 수가 적은 쪽을 먼저 (한 요청자가 대량 제출해도 다른 요청자의 작업이 바로 실행됨)
+SCHEDULER_FAIR_SHARE = os.getenv("SCHEDULER_FAIR_SHARE", "true").lower() in ("1", "true", "yes")
+
+# 예상 처리 시간(영상 길이)이 짧은 작업을 먼저 (shortest-job-first)
+SCHEDULER_SJF = os.getenv("SCHEDULER_SJF", "false").lower() in ("1", "true", "yes")
+
+# 대기 시간이 이만큼 지날 때마다 우선순위 1 상승 (초, 0이면 사용 안 함)
+# 우선순위가 낮거나 긴 작업도 언젠가는 실행되도록 보장
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "300"))
+
+# 길이를 모르는 영상의 예상 길이 (초, SJF용)
+SCHEDULER_DEFAULT_DURATION = int(os.getenv("SCHEDULER_DEFAULT_DURATION", "600"))
+
+# 작업을 고를 때 요청자마다 살펴보는 대기 작업 수 (우선순위/생성 순 상위)
+SCHEDULER_CANDIDATES_PER_SUBMITTER = int(os.getenv("SCHEDULER_CANDIDATES_PER_SUBMITTER", "20"))
+
+# 요청 시 지정할 수 있는 우선순위 범위 (-MAX_JOB_PRIORITY ~ MAX_JOB_PRIORITY, 클수록 먼저)
+MAX_JOB_PRIORITY = int(os.getenv("MAX_JOB_PRIORITY", "10"))
+
+
+@dataclass
+class Candidate:
+    """
+    대기 중인 작업 중 스케줄링에 필요한 속성만 읽은 레코드
+    """
+    id: int
+    submitter: Optional[str]
+    priority: int
+    duration: Optional[int]
+    created_at: Optional[datetime]
+
+
+def clamp_priority(priority: Optional[int]) -> int:
+    if priority is None:
+        return 0
+    return max(-MAX_JOB_PRIORITY, min(MAX_JOB_PRIORITY, priority))
+
+
+class SchedulingPolicy:
+    """
+    대기 중인 작업의 실행 순서 결정
+    1. 공정 분배: 실행 중인 작업이 적은 요청자 먼저 (fair_share)
+    2. 유효 우선순위: 지정한 우선순위 + 대기 시간에 따른 가산(aging) - 높은 순
+    3. 예상 처리 시간: 영상 길이가 짧은 순 (sjf)
+    4. 생성 순
+    """
+
+    def __init__(self, fair_share: bool = SCHEDULER_FAIR_SHARE, sjf: bool = SCHEDULER_SJF,
+                 aging_seconds: float = SCHEDULER_AGING_SECONDS,
+                 default_duration: int = SCHEDULER_DEFAULT_DURATION):
+        self.fair_share = fair_share
+        self.sjf = sjf
+        self.aging_seconds = aging_seconds
+        self.default_duration = default_duration
+
+    def effective_priority(self, candidate: Candidate, now: datetime) -> int:
+        priority = candidate.priority or 0
+        if self.aging_seconds and candidate.created_at:
+            waited = (now - _as_utc(candidate.created_at)).total_seconds()
+            priority += max(0, int(waited // self.aging_seconds))
+        return priority
+
+    def rank(self, candidates: list[Candidate], running: dict[Optional[str], int],
+             now: Optional[datetime] = None) -> list[Candidate]:
+        """
+        후보를 실행할 순서로 정렬
+
+        Args:
+            running: 요청자별 실행 중인 작업 수
+        """
+        now = now or datetime.now(timezone.utc)
+
+        def key(candidate: Candidate):
+            return (
+                running.get(candidate.submitter, 0) if self.fair_share else 0,
+                -self.effective_priority(candidate, now),
+                (candidate.duration or self.default_duration) if self.sjf else 0,
+                _as_utc(candidate.created_at) if candidate.created_at else now,
+                candidate.id,
+            )
+
+        return sorted(candidates, key=key)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite는 timezone 정보를 저장하지 않으므로 UTC로 간주
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+scheduling_policy = SchedulingPolicy()
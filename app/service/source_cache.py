@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+
+# 내려받은 원본 스트림을 보관하는 시간 (초, 0이면 원본을 보관하지 않고 작업마다 yt-dlp로 바로 변환)
+SOURCE_CACHE_TTL = float(os.getenv("SOURCE_CACHE_TTL", "3600"))
+
+# 원본으로 내려받는 영상의 최대 높이 - 이 이하의 MP4 요청은 모두 같은 원본에서 만듦
+SOURCE_MAX_HEIGHT = int(os.getenv("SOURCE_MAX_HEIGHT", "1080"))
+
+# 원본 스트림 저장 경로 (영상 ID별 하위 디렉터리)
+SOURCE_CACHE_DIR = Path(os.getenv("SOURCE_CACHE_DIR", str(DOWNLOAD_DIR / ".sources")))
+
+# 원본 종류: 오디오만 / 영상+오디오
+AUDIO = "audio"
+AV = "av"
+
+
+@dataclass
+class SourceMedia:
+    """
+    캐시된 원본 스트림 파일 하나
+    """
+    kind: str
+    path: Path
+    title: str
+    duration: Optional[int]
+    height: Optional[int]
+    vcodec: Optional[str]
+    acodec: Optional[str]
+    max_height: int  # 내려받을 때 지정한 최대 높이 (이보다 낮은 원본은 더 높은 화질이 없다는 뜻)
+    size: int
+    expires_at: float
+    users: int = 0  # 이 파일로 변환 중인 작업 수 (사용 중에는 만료되어도 삭제하지 않음)
+
+    def covers(self, format: str, quality: str) -> bool:
+        """
+        이 원본으로 요청한 형식/품질을 만들 수 있는지 여부
+        """
+        if format == "mp3":
+            return True
+        if self.kind != AV or not quality.isdigit():
+            return False
+        requested = int(quality)
+        return (self.height or 0) >= requested or self.max_height >= requested
+
+
+def source_kind(format: str) -> str:
+    return AUDIO if format == "mp3" else AV
+
+
+class SourceCache:
+    """
+    영상 ID별 원본 스트림(최고 음질 오디오 / SOURCE_MAX_HEIGHT 이하 최고 화질 영상+오디오) 캐시
+    - 같은 영상의 다른 형식/품질 요청은 네트워크 없이 로컬 ffmpeg 변환(가능하면 remux)으로 처리
+    - 같은 영상의 원본을 동시에 두 번 내려받지 않도록 영상 ID별 잠금 제공
+    - SOURCE_CACHE_TTL이 지난 원본은 사용 중이 아닐 때 삭제
+    - 원본 크기는 STORAGE_BUDGET_BYTES에 포함되며, 예산을 넘으면 변환 결과보다 먼저 삭제
+    """
+
+    def __init__(self, ttl: float = SOURCE_CACHE_TTL, max_height: int = SOURCE_MAX_HEIGHT,
+                 directory: Path = SOURCE_CACHE_DIR):
+        self.ttl = ttl
+        self.max_height = max_height
+        self.directory = directory
+        self._entries: dict[str, list[SourceMedia]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._fetching: dict[str, str] = {}  # 영상 ID -> 내려받는 중인 원본 종류
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def supports(self, format: str, quality: str) -> bool:
+        """
+        원본 캐시로 처리할 수 있는 요청인지 (SOURCE_MAX_HEIGHT보다 높은 화질/최고 화질은 직접 변환)
+        """
+        if not self.enabled:
+            return False
+        return format == "mp3" or (quality.isdigit() and int(quality) <= self.max_height)
+
+    def should_use(self, video_id: str, format: str, quality: str) -> bool:
+        """
+        이 요청을 원본 캐시로 처리할지 여부
+        - 요청을 만들 수 있는 원본이 이미 있거나 다른 작업이 내려받는 중이면 사용
+        - 원본을 새로 받아야 하면 직접 변환과 같은 스트림을 받는 요청(MP3, SOURCE_MAX_HEIGHT 화질)만 사용
+          (낮은 화질 MP4 하나를 위해 SOURCE_MAX_HEIGHT 원본을 받아 다시 인코딩하지 않음)
+        """
+        if not self.supports(format, quality):
+            return False
+        if format == "mp3" or int(quality) >= self.max_height:
+            return True
+        return self.find(video_id, format, quality) is not None or self._fetching.get(video_id) == AV
+
+    async def start(self):
+        # 이전 실행에서 남은 원본은 인덱스가 없으므로 삭제
+        # (SOURCE_CACHE_DIR은 설정으로 바꿀 수 있으므로 이 캐시가 만든 파일만 지움)
+        if self.enabled:
+            await asyncio.to_thread(self._clear)
+
+    def lock(self, video_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(video_id, asyncio.Lock())
+
+    def find(self, video_id: str, format: str, quality: str) -> Optional[SourceMedia]:
+        """
+        요청을 만들 수 있는 원본 (MP3는 크기가 작은 오디오 원본 우선)
+        """
+        self.prune()
+        candidates = [source for source in self._entries.get(video_id, []) if source.covers(format, quality)]
+        candidates.sort(key=lambda source: source.kind != AUDIO)
+        return candidates[0] if candidates else None
+
+    def prepare(self, video_id: str, format: str) -> Path:
+        """
+        원본을 내려받을 디렉터리를 비워서 반환 (파일 이름은 <종류>.<확장자>)
+        """
+        kind = source_kind(format)
+        directory = self.directory / video_id
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in directory.glob(f"{kind}.*"):
+            path.unlink(missing_ok=True)
+        self._fetching[video_id] = kind
+        return directory
+
+    def add(self, video_id: str, format: str, info: dict) -> Optional[SourceMedia]:
+        """
+        내려받은 원본을 등록 (yt-dlp info JSON의 선택된 포맷 정보 사용)
+        """
+        kind = source_kind(format)
+        self._fetching.pop(video_id, None)
+        directory = self.directory / video_id
+        files = [path for path in directory.glob(f"{kind}.*") if not path.name.endswith((".part", ".ytdl"))]
+        if not files:
+            return None
+
+        source = SourceMedia(
+            kind=kind,
+            path=files[0],
+            title=info.get("title") or "Untitled Video",
+            duration=int(info["duration"]) if info.get("duration") else None,
+            height=info.get("height") if kind == AV else None,
+            vcodec=info.get("vcodec") if kind == AV else None,
+            acodec=info.get("acodec"),
+            max_height=self.max_height if kind == AV else 0,
+            size=files[0].stat().st_size,
+            expires_at=time.monotonic() + self.ttl
+        )
+        entries = [entry for entry in self._entries.get(video_id, []) if entry.kind != kind]
+        self._entries[video_id] = [*entries, source]
+        return source
+
+    def discard(self, video_id: str, format: str):
+        """
+        내려받기에 실패/중단된 원본의 남은 파일 삭제
+        """
+        kind = source_kind(format)
+        self._fetching.pop(video_id, None)
+        for path in (self.directory / video_id).glob(f"{kind}.*"):
+            path.unlink(missing_ok=True)
+
+    def retain(self, source: SourceMedia):
+        # 변환하는 동안 원본이 삭제되지 않도록 표시
+        source.users += 1
+
+    def release(self, source: SourceMedia):
+        source.users -= 1
+
+    def total_bytes(self) -> int:
+        """
+        보관 중인 원본 파일의 전체 크기
+        """
+        self.prune()
+        return sum(source.size for sources in self._entries.values() for source in sources)
+
+    def prune(self):
+        """
+        만료되었고 사용 중이 아닌 원본 삭제
+        """
+        now = time.monotonic()
+        for video_id in list(self._entries):
+            if self.lock(video_id).locked():
+                continue
+            self._remove(video_id, [source for source in self._entries[video_id]
+                                    if source.expires_at < now and not source.users])
+
+    def evict(self, needed: int) -> int:
+        """
+        사용 중이 아닌 원본을 만료가 가까운 순으로 needed 바이트 이상 삭제하고 삭제한 바이트 수를 반환
+        """
+        candidates = sorted(
+            ((video_id, source) for video_id, sources in self._entries.items()
+             if not self.lock(video_id).locked()
+             for source in sources if not source.users),
+            key=lambda candidate: candidate[1].expires_at
+        )
+        evicted = 0
+        for video_id, source in candidates:
+            if evicted >= needed:
+                break
+            self._remove(video_id, [source])
+            evicted += source.size
+        return evicted
+
+    def _remove(self, video_id: str, removed: list[SourceMedia]):
+        for source in removed:
+            source.path.unlink(missing_ok=True)
+        kept = [source for source in self._entries[video_id] if source not in removed]
+        if kept:
+            self._entries[video_id] = kept
+        else:
+            del self._entries[video_id]
+            self._locks.pop(video_id, None)
+            _remove_sources(self.directory / video_id)
+
+    def _clear(self):
+        if not self.directory.is_dir():
+            return
+        for directory in self.directory.iterdir():
+            if directory.is_dir() and not directory.is_symlink():
+                _remove_sources(directory)
+
+
+def _remove_sources(directory: Path):
+    """
+    영상 디렉터리에서 원본 파일(<종류>.<확장자>, 내려받는 중 남은 .part/분리 스트림 포함)을 지우고
+    비었으면 디렉터리도 삭제 (다른 파일이 있으면 그대로 둠)
+    """
+    for kind in (AUDIO, AV):
+        for path in directory.glob(f"{kind}.*"):
+            if path.is_file():
+                path.unlink(missing_ok=True)
+    try:
+        directory.rmdir()
+    except OSError:
+        pass
+
+
+source_cache = SourceCache()
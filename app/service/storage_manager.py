@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import select, update, delete, func
+from models.job import ConversionJob, ConversionArtifact, JobStatus
+from database import async_session
+from service.job_events import job_events
+from service.artifact_storage import artifact_storage
+from service.source_cache import source_cache
+
+DOWNLOAD_DIR = Path(os.getenv("DOWNLOAD_DIR", "downloads"))
+
+# 변환 결과 파일과 원본 캐시가 함께 차지할 수 있는 최대 용량 (바이트, 0이면 제한 없음)
+STORAGE_BUDGET_BYTES = int(os.getenv("STORAGE_BUDGET_BYTES", "0"))
+
+# 마지막 다운로드(없으면 완료) 후 파일을 보관하는 최대 시간 (초, 0이면 제한 없음)
+STORAGE_MAX_AGE = float(os.getenv("STORAGE_MAX_AGE", "0"))
+
+# 백그라운드 정리 주기 (초) - 사용량 집계도 이때 DB 기준으로 다시 맞춤
+STORAGE_SWEEP_INTERVAL = float(os.getenv("STORAGE_SWEEP_INTERVAL", "300"))
+
+# 같은 파일의 마지막 다운로드 시각을 DB에 다시 기록하기까지의 최소 간격 (초)
+# Range 요청으로 한 번의 다운로드가 여러 요청이 되어도 UPDATE는 한 번만 실행됨
+TOUCH_INTERVAL = 60
+
+
+class StorageManager:
+    """
+    DOWNLOAD_DIR 용량 관리
+    - 완료된 작업마다 파일 크기(file_size)와 마지막 다운로드 시각(last_downloaded_at)을 기록
+    - 용량 예산(STORAGE_BUDGET_BYTES)을 넘으면 원본 캐시를 먼저 비우고, 그래도 넘으면 가장 오래 다운로드되지 않은 파일부터 삭제
+    - 보관 기간(STORAGE_MAX_AGE)이 지난 파일도 삭제
+    - 삭제된 파일을 참조하던 작업은 EXPIRED 상태가 되어 다시 변환할 수 있음
+    - 변환 결과 사용량은 생성/삭제 시 증감하여 보관하고, 전체 집계는 정리할 때만 실행
+      (다른 프로세스가 만든 파일은 다음 주기 정리에서 반영됨)
+    """
+
+    def __init__(self, budget: int = STORAGE_BUDGET_BYTES, max_age: float = STORAGE_MAX_AGE,
+                 sweep_interval: float = STORAGE_SWEEP_INTERVAL):
+        self.budget = budget
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._touched: dict[str, float] = {}
+        self._used_bytes: Optional[int] = None  # 변환 결과 파일 전체 크기 (첫 정리 전에는 모름)
+        self._lock = asyncio.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.budget or self.max_age:
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def touch(self, filename: str):
+        """
+        파일이 다운로드되었음을 기록 (TOUCH_INTERVAL 안의 반복 요청은 무시)
+        """
+        now = time.monotonic()
+        if now - self._touched.get(filename, float("-inf")) < TOUCH_INTERVAL:
+            return
+        self._touched[filename] = now
+        async with async_session() as session:
+            await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.filename == filename)
+                # 다운로드 기록은 상태 API에 보이지 않으므로 버전/변경 시각은 그대로 둠
+                .values(last_downloaded_at=datetime.now(timezone.utc),
+                        version=ConversionJob.version, updated_at=ConversionJob.updated_at)
+            )
+            await session.commit()
+
+    def record_added(self, size: int):
+        """
+        새 변환 결과 파일을 사용량에 반영
+        """
+        if self._used_bytes is not None:
+            self._used_bytes += size
+
+    def record_removed(self, size: int):
+        """
+        삭제된 변환 결과 파일을 사용량에서 제외
+        """
+        if self._used_bytes is not None:
+            self._used_bytes = max(self._used_bytes - size, 0)
+
+    async def ensure_capacity(self):
+        """
+        새 변환을 시작하기 전 예산을 넘은 만큼 오래된 파일을 정리
+        보관 중인 사용량이 예산 안이면 DB를 조회하지 않음
+        """
+        if not self.budget:
+            return
+        if self._used_bytes is not None and self._used_bytes + source_cache.total_bytes() <= self.budget:
+            return
+        await self.sweep()
+
+    async def sweep(self) -> int:
+        """
+        보관 기간이 지난 파일과 예산을 넘는 파일을 삭제하고 삭제한 바이트 수를 반환
+        전체 파일 크기를 DB에서 다시 집계하여 보관 중인 사용량을 맞춤
+        """
+        async with self._lock:
+            files = await self._stored_files()
+            now = datetime.now(timezone.utc)
+            cutoff = now - timedelta(seconds=self.max_age) if self.max_age else None
+
+            stored = sum(size for _, size, _ in files)
+            total = stored + source_cache.total_bytes()
+            evicted = 0
+            if self.budget and total > self.budget:
+                # 원본은 다시 받을 수 있으므로 사용자가 받아 갈 변환 결과보다 먼저 삭제
+                freed = source_cache.evict(total - self.budget)
+                total -= freed
+                evicted += freed
+            # 가장 오래 사용되지 않은 파일부터
+            for filename, size, last_used in files:
+                expired = cutoff is not None and last_used is not None and _as_utc(last_used) < cutoff
+                over_budget = self.budget and total > self.budget
+                if not expired and not over_budget:
+                    continue
+                await self._evict(filename)
+                stored -= size
+                total -= size
+                evicted += size
+            self._used_bytes = stored
+            return evicted
+
+    async def _stored_files(self) -> list[tuple[str, int, Optional[datetime]]]:
+        """
+        완료된 작업이 참조하는 파일 목록 (파일명, 크기, 마지막 사용 시각), 오래 사용되지 않은 순
+        크기가 기록되지 않은 파일(이전 버전에서 생성)은 파일 크기를 읽어 채움
+        """
+        last_used = func.max(func.coalesce(ConversionJob.last_downloaded_at, ConversionJob.completed_at))
+        async with async_session() as session:
+            result = await session.execute(
+                select(ConversionJob.filename, func.max(ConversionJob.file_size), last_used)
+                .where(ConversionJob.status == JobStatus.COMPLETED)
+                .where(ConversionJob.filename.isnot(None))
+                .group_by(ConversionJob.filename)
+                .order_by(last_used)
+            )
+            rows = result.all()
+
+            files = []
+            for filename, size, used_at in rows:
+                if size is None:
+                    size = await asyncio.to_thread(_file_size, DOWNLOAD_DIR / filename)
+                    await session.execute(
+                        update(ConversionJob)
+                        .where(ConversionJob.filename == filename)
+                        .values(file_size=size)
+                    )
+                files.append((filename, size, used_at))
+            await session.commit()
+        return files
+
+    async def _evict(self, filename: str):
+        """
+        파일을 삭제하고 참조하던 작업을 EXPIRED로 변경
+        """
+        async with async_session() as session:
+            result = await session.execute(
+                update(ConversionJob)
+                .where(ConversionJob.filename == filename)
+                .where(ConversionJob.status == JobStatus.COMPLETED)
+                .values(status=JobStatus.EXPIRED, filename=None)
+                .returning(ConversionJob.job_id)
+            )
+            job_ids = result.scalars().all()
+            await session.execute(
+                delete(ConversionArtifact).where(ConversionArtifact.filename == filename)
+            )
+            await session.commit()
+
+        await artifact_storage.delete(filename)
+        self._touched.pop(filename, None)
+        for job_id in job_ids:
+            job_events.publish(job_id, status=JobStatus.EXPIRED.value, filename=None)
+
+    async def _run_sweeper(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # 다음 주기에 다시 시도
+            await asyncio.sleep(self.sweep_interval)
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite는 timezone 정보를 저장하지 않으므로 UTC로 간주
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+storage_manager = StorageManager()
@@ -0,0 +1,111 @@
+import os
+from collections import deque
+from pathlib import Path
+from typing import Optional
+from service.source_cache import SourceMedia
+from service.ytdlp_runner import YtdlpResult, OUTPUT_TAIL_LINES, run_subprocess
+from service.process_registry import ConversionHandle, supervise
+
+# 영상을 다시 인코딩해야 할 때(해상도 축소, H.264가 아닌 원본) 사용하는 x264 설정
+TRANSCODE_PRESET = os.getenv("TRANSCODE_PRESET", "veryfast")
+TRANSCODE_CRF = os.getenv("TRANSCODE_CRF", "20")
+
+# MP4 음성을 다시 인코딩할 때의 AAC 비트레이트
+TRANSCODE_AUDIO_BITRATE = os.getenv("TRANSCODE_AUDIO_BITRATE", "192k")
+
+# MP4 컨테이너에 그대로 복사(remux)할 수 있는 코덱 (yt-dlp 코덱 표기 기준)
+_MP4_VIDEO_CODECS = ("avc1", "h264")
+_MP4_AUDIO_CODECS = ("mp4a", "aac")
+
+
+# 진행 정보를 stdout으로 출력 (출력이 이어지는 동안 진행 없음(stall)으로 판단하지 않음)
+_FFMPEG_OPTIONS = ("-hide_banner", "-loglevel", "error", "-progress", "pipe:1", "-nostats")
+
+
+def _mp3_options(quality: str) -> list[str]:
+    return ["-vn", "-c:a", "libmp3lame", "-b:a", quality + "k", "-f", "mp3"]
+
+
+def _codec_in(codec: Optional[str], allowed: tuple[str, ...]) -> bool:
+    return bool(codec) and codec.lower().startswith(allowed)
+
+
+def build_ffmpeg_command(source: SourceMedia, format: str, quality: str, output_path: Path) -> list[str]:
+    """
+    캐시된 원본에서 요청한 형식/품질의 파일을 만드는 ffmpeg 명령어 구성
+    - MP3: 원본 음성을 요청한 비트레이트로 인코딩
+    - MP4: 해상도를 줄일 필요가 없고 코덱이 MP4에 맞으면 재인코딩 없이 스트림 복사(remux)
+           음성만 맞지 않으면 음성만, 해상도를 줄여야 하면 영상만 다시 인코딩
+    """
+    command = ["ffmpeg", "-y", "-nostdin", *_FFMPEG_OPTIONS, "-i", str(source.path)]
+
+    if format == "mp3":
+        command += _mp3_options(quality)
+    else:  # mp4
+        target_height = int(quality) if quality.isdigit() else None
+        downscale = bool(target_height and source.height and source.height > target_height)
+
+        if downscale:
+            command += ["-vf", f"scale=-2:{target_height}"]
+        if downscale or not _codec_in(source.vcodec, _MP4_VIDEO_CODECS):
+            command += ["-c:v", "libx264", "-preset", TRANSCODE_PRESET, "-crf", TRANSCODE_CRF,
+                        "-pix_fmt", "yuv420p"]
+        else:
+            command += ["-c:v", "copy"]
+
+        if _codec_in(source.acodec, _MP4_AUDIO_CODECS):
+            command += ["-c:a", "copy"]
+        else:
+            command += ["-c:a", "aac", "-b:a", TRANSCODE_AUDIO_BITRATE]
+
+        command += ["-map", "0:v:0", "-map", "0:a:0?", "-movflags", "+faststart", "-f", "mp4"]
+
+    command += [str(output_path)]
+    return command
+
+
+def build_stream_ffmpeg_command(quality: str, output_path: Path, source_path: Optional[Path] = None) -> list[str]:
+    """
+    yt-dlp가 stdout으로 내보내는 원본을 받으며 MP3로 인코딩하는 ffmpeg 명령어 구성 (run_pipeline용)
+    - 인코딩된 데이터를 바로바로 파일에 기록하여 변환 중에도 스트리밍할 수 있게 함
+    - source_path가 있으면 받은 음성 스트림을 재인코딩 없이 그대로 기록 (원본 캐시용, MKA)
+    """
+    command = ["ffmpeg", "-y", *_FFMPEG_OPTIONS, "-i", "pipe:0",
+               "-map", "0:a:0", *_mp3_options(quality), "-flush_packets", "1", str(output_path)]
+    if source_path:
+        command += ["-map", "0:a:0", "-c", "copy", "-f", "matroska", str(source_path)]
+    return command
+
+
+async def run_ffmpeg(command: list[str], handle: Optional[ConversionHandle] = None) -> YtdlpResult:
+    """
+    ffmpeg를 실행하고 종료 코드와 오류 출력 마지막 OUTPUT_TAIL_LINES 줄을 반환
+    handle이 있으면 취소 요청, 실행 시간 제한, 진행 없음(stall) 시 프로세스를 종료
+    """
+    stderr_tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    result = YtdlpResult(return_code=-1, output_tail="")
+    if handle and handle.cancel_reason:
+        result.output_tail = handle.error_message
+        return result
+
+    async def on_stdout(line: str):
+        # -progress 출력 (out_time=..., progress=continue/end)
+        if handle:
+            handle.touch()
+
+    async def on_stderr(line: str):
+        if handle:
+            handle.touch()
+        if line:
+            stderr_tail.append(line)
+
+    async with supervise(handle):
+        result.return_code = await run_subprocess(command, on_stdout, on_stderr, handle)
+
+    if handle and handle.cancel_reason:
+        stderr_tail.append(handle.error_message)
+
+    result.output_tail = "\n".join(stderr_tail)
+    if result.return_code != 0 and not result.output_tail:
+        result.output_tail = f"ffmpeg exited with code {result.return_code}"
+    return result
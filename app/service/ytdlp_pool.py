@@ -0,0 +1,290 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Optional
+from utils.progress_parser import ProgressUpdate, parse_postprocessor_hook, parse_progress_hook
+from service.process_registry import CANCEL_GRACE_PERIOD
+
+# 풀 프로세스 수 (기본값: 동시에 실행할 변환 작업 수와 동일)
+YTDLP_POOL_SIZE = max(1, int(os.getenv("YTDLP_POOL_SIZE", os.getenv("MAX_WORKERS", "2"))))
+
+# 워커가 진행률 이벤트를 보내는 최소 간격 (초) - progress_hooks는 청크마다 호출됨
+POOL_PROGRESS_INTERVAL = 0.5
+
+
+# ---------------------------------------------------------------------------
+# 풀 프로세스에서 실행되는 코드
+# ---------------------------------------------------------------------------
+
+# 부모 프로세스로 (token, 종류, 값) 이벤트를 보내는 큐
+_events = None
+
+# 취소 요청 표시 파일 경로 (파일 이름 = token) / 이 프로세스에서 실행 중인 작업 token
+_cancel_dir = None
+_current_token = None
+
+
+class _Cancelled(BaseException):
+    """
+    취소 신호를 받았을 때 실행 중인 다운로드를 중단 (yt-dlp 내부의 except Exception에 잡히지 않도록 BaseException)
+    """
+
+
+def _on_cancel_signal(signum, frame):
+    # 신호가 늦게 도착해 다음 작업이 실행 중일 수 있으므로 표시 파일로 대상 작업인지 확인
+    if _current_token and os.path.exists(os.path.join(_cancel_dir, _current_token)):
+        raise _Cancelled()
+
+
+def _init_worker(events, cancel_dir):
+    """
+    풀 프로세스 초기화 - yt_dlp(추출기 목록 포함)를 한 번만 import
+    """
+    global _events, _cancel_dir
+    _events = events
+    _cancel_dir = cancel_dir
+    signal.signal(signal.SIGUSR1, _on_cancel_signal)
+    import yt_dlp  # noqa: F401
+
+
+def _warm():
+    return os.getpid()
+
+
+class _QueueLogger:
+    """
+    yt-dlp 로그를 부모 프로세스로 전달 (debug/info는 stdout, warning/error는 stderr로 취급)
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def debug(self, message: str):
+        _events.put((self.token, "stdout", message))
+
+    def info(self, message: str):
+        _events.put((self.token, "stdout", message))
+
+    def warning(self, message: str):
+        _events.put((self.token, "stderr", message))
+
+    def error(self, message: str):
+        _events.put((self.token, "stderr", message))
+
+
+def _run(token: str, args: list[str]) -> int:
+    """
+    CLI 인자를 그대로 해석하여 YoutubeDL을 실행하고 종료 코드를 반환
+    - --dump-json 출력 대신 다운로드 직전에 info JSON을 한 줄로 전달
+    - 진행 정보는 텍스트 대신 progress_hooks 값을 그대로 전달
+    - 시작할 때 start 이벤트(pid)를, 마지막에 항상 exit 이벤트를 보냄
+    - SIGUSR1로 취소하면 진행 중인 다운로드/후처리(ffmpeg 포함)를 중단
+    """
+    global _current_token
+    import yt_dlp
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    class InfoJsonSender(PostProcessor):
+        def run(self, info):
+            _events.put((token, "stdout", json.dumps(self._downloader.sanitize_info(info))))
+            return [], info
+
+    last_progress = 0.0
+
+    def progress_hook(status: dict):
+        nonlocal last_progress
+        update = parse_progress_hook(status)
+        if not update:
+            return
+        now = time.monotonic()
+        if update.percent < 100 and now - last_progress < POOL_PROGRESS_INTERVAL:
+            return
+        last_progress = now
+        _events.put((token, "progress", update))
+
+    def postprocessor_hook(status: dict):
+        update = parse_postprocessor_hook(status)
+        if update:
+            _events.put((token, "progress", update))
+
+    return_code = 1
+    _current_token = token
+    _events.put((token, "start", os.getpid()))
+    try:
+        parsed = yt_dlp.parse_options(args)
+        options = {
+            **parsed.ydl_opts,
+            "logger": _QueueLogger(token),
+            "forcejson": False,
+            "noprogress": True,
+            "progress_hooks": [progress_hook],
+            "postprocessor_hooks": [postprocessor_hook],
+        }
+        with yt_dlp.YoutubeDL(options) as ydl:
+            ydl.add_post_processor(InfoJsonSender(ydl), when="before_dl")
+            if parsed.options.load_info_filename:
+                return_code = ydl.download_with_info_file(parsed.options.load_info_filename)
+            else:
+                return_code = ydl.download(parsed.urls)
+    except _Cancelled:
+        _events.put((token, "stderr", "ERROR: cancelled"))
+    except (Exception, SystemExit) as error:
+        _events.put((token, "stderr", f"ERROR: {error}"))
+    finally:
+        _current_token = None
+        _events.put((token, "exit", return_code))
+    return return_code
+
+
+# ---------------------------------------------------------------------------
+# 부모 프로세스
+# ---------------------------------------------------------------------------
+
+class YtdlpPool:
+    """
+    yt_dlp를 미리 import한 상주 프로세스 풀
+    - 작업마다 인터프리터 기동과 yt_dlp import 비용을 치르지 않음
+    - 워커의 로그/진행률은 하나의 multiprocessing 큐로 모아 작업별 asyncio 큐로 분배
+    """
+
+    def __init__(self, size: int = YTDLP_POOL_SIZE):
+        self.size = size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._events = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: dict[str, asyncio.Queue] = {}
+        self._finished: dict[str, asyncio.Event] = {}
+        self._cancel_dir: Optional[str] = None
+
+    async def start(self):
+        # asyncio 루프/스레드를 가진 프로세스를 fork하지 않도록 spawn 사용
+        context = multiprocessing.get_context("spawn")
+        self._loop = asyncio.get_running_loop()
+        self._events = context.Queue()
+        self._cancel_dir = tempfile.mkdtemp(prefix="ytdlp-pool-cancel-")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._events, self._cancel_dir)
+        )
+        self._reader = threading.Thread(target=self._read_events, name="ytdlp-pool-events", daemon=True)
+        self._reader.start()
+
+        # 첫 작업이 프로세스 기동을 기다리지 않도록 미리 모든 프로세스를 띄움
+        await asyncio.gather(*(
+            self._loop.run_in_executor(self._executor, _warm) for _ in range(self.size)
+        ))
+
+    async def stop(self):
+        if not self._executor:
+            return
+        # 실행 중인 다운로드는 기다리지 않음 (subprocess 엔진과 동일)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._events.put(None)
+        await asyncio.to_thread(self._reader.join)
+        self._executor = None
+        shutil.rmtree(self._cancel_dir, ignore_errors=True)
+
+    def _read_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: tuple):
+        token, kind, value = event
+        queue = self._tasks.get(token)
+        if queue is not None:
+            queue.put_nowait((kind, value))
+
+    async def run(self, args: list[str],
+                  on_stdout: Callable[[str], Awaitable[None]],
+                  on_stderr: Callable[[str], Awaitable[None]],
+                  on_progress: Callable[[ProgressUpdate], Awaitable[None]],
+                  on_start: Optional[Callable[[Callable[[], Awaitable[None]]], None]] = None) -> int:
+        """
+        풀 프로세스에서 yt-dlp를 실행하고 종료 코드를 반환
+
+        Args:
+            args: yt-dlp CLI 인자 (실행 파일 이름 제외)
+            on_start: 실행이 시작되면 이 작업을 취소하는 함수를 전달받는 콜백
+        """
+        token = uuid.uuid4().hex
+        events: asyncio.Queue = asyncio.Queue()
+        self._tasks[token] = events
+        self._finished[token] = asyncio.Event()
+        try:
+            future = asyncio.wrap_future(self._executor.submit(_run, token, args))
+            while True:
+                kind, value = await self._next_event(events, future)
+                if kind == "exit":
+                    return value
+                if kind == "start":
+                    if on_start:
+                        on_start(lambda pid=value: self._cancel(token, pid))
+                elif kind == "progress":
+                    await on_progress(value)
+                elif kind == "stdout":
+                    await on_stdout(value)
+                else:
+                    await on_stderr(value)
+        finally:
+            del self._tasks[token]
+            self._finished.pop(token).set()
+            try:
+                os.unlink(os.path.join(self._cancel_dir, token))
+            except OSError:
+                pass
+
+    async def _cancel(self, token: str, pid: int, grace_period: float = CANCEL_GRACE_PERIOD):
+        """
+        실행 중인 작업을 중단하고 종료될 때까지 최대 grace_period 대기
+        (풀 프로세스는 다른 작업도 실행하므로 강제 종료하지 않음)
+        """
+        finished = self._finished.get(token)
+        if not finished:
+            return
+        with open(os.path.join(self._cancel_dir, token), "w"):
+            pass
+        try:
+            os.kill(pid, signal.SIGUSR1)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(finished.wait(), timeout=grace_period)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    async def _next_event(events: asyncio.Queue, future: asyncio.Future) -> tuple:
+        """
+        작업 이벤트를 하나 꺼냄
+        풀 프로세스가 비정상 종료되어 exit 이벤트가 오지 않으면 그 예외를 발생
+        """
+        getter = asyncio.ensure_future(events.get())
+        try:
+            while not getter.done():
+                if not future.done():
+                    await asyncio.wait({getter, future}, return_when=asyncio.FIRST_COMPLETED)
+                elif future.exception():
+                    raise future.exception()
+                else:
+                    # 정상 종료 - 결과보다 늦게 도착하는 이벤트를 마저 받음
+                    await getter
+            return getter.result()
+        finally:
+            getter.cancel()
+
+
+ytdlp_pool = YtdlpPool()
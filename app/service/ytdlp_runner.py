@@ -0,0 +1,363 @@
+import asyncio
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from service.job_events import job_events
+from service.job_store import job_store
+from service.ytdlp_pool import ytdlp_pool
+from service.metrics import StageTimer, YTDLP_EXIT_CODES
+from service.process_registry import ConversionHandle, supervise, terminate_process_group
+from utils.progress_parser import ProgressUpdate, parse_progress_line
+
+# yt-dlp 실행 방식
+#   subprocess: 작업마다 yt-dlp 프로세스를 새로 실행
+#   pool: yt_dlp를 미리 import한 상주 프로세스 풀에서 실행 (작업당 고정 비용 감소)
+YTDLP_ENGINE = os.getenv("YTDLP_ENGINE", "subprocess")
+
+# error_message로 보관할 출력 마지막 줄 수
+OUTPUT_TAIL_LINES = int(os.getenv("OUTPUT_TAIL_LINES", "50"))
+
+# 진행률 구간: 다운로드 0-90%, 후처리(ffmpeg) 95%, 완료 100%
+DOWNLOAD_PROGRESS_WEIGHT = 90
+POSTPROCESS_PROGRESS = 95
+
+# --dump-json 출력 한 줄의 최대 크기 (info JSON은 수 MB가 될 수 있음)
+STREAM_LINE_LIMIT = 32 * 1024 * 1024
+
+# 재생목록 평면 추출의 최대 시간 (초) - 요청 처리 중에 실행되므로 짧게 제한
+PLAYLIST_EXTRACT_TIMEOUT = float(os.getenv("PLAYLIST_EXTRACT_TIMEOUT", "120"))
+
+
+@dataclass
+class YtdlpResult:
+    return_code: int
+    output_tail: str                 # 오류 메시지로 사용할 출력 끝부분
+    info: Optional[dict] = None      # --dump-json으로 받은 메타데이터
+    info_json: Optional[str] = None  # 메타데이터 원본 JSON 문자열
+
+
+class ProgressReporter:
+    """
+    yt-dlp 진행 정보를 작업 상태 저장소에 반영
+    - DB 기록은 job_store가 PROGRESS_FLUSH_INTERVAL마다 모아서 처리
+    - followers: 같은 변환 결과를 기다리는 작업들 (진행률을 함께 반영)
+    - timer: 메타데이터 추출/다운로드/후처리 단계 전환 시점을 기록
+    """
+
+    def __init__(self, job_id: str, followers: Optional[list[str]] = None,
+                 timer: Optional[StageTimer] = None):
+        self.job_id = job_id
+        self.followers = followers if followers is not None else []
+        self.timer = timer
+        self.progress = 0
+        self.title: Optional[str] = None
+        self.speed: Optional[int] = None
+        self.eta: Optional[int] = None
+
+    async def update(self, progress_update: ProgressUpdate):
+        if progress_update.postprocessing:
+            if self.timer:
+                self.timer.start("postprocess")
+            progress = POSTPROCESS_PROGRESS
+            self.speed = None
+            self.eta = None
+        elif progress_update.percent is not None:
+            progress = int(progress_update.percent * DOWNLOAD_PROGRESS_WEIGHT / 100)
+            self.speed = progress_update.speed
+            self.eta = progress_update.eta
+        else:
+            return
+
+        # 진행률은 뒤로 가지 않음 (영상/음성 스트림을 따로 받는 경우 등)
+        self.progress = max(self.progress, progress)
+
+        for job_id in self.job_ids:
+            job_store.update(job_id, progress=self.progress, speed=self.speed, eta=self.eta)
+            job_events.publish(job_id, progress=self.progress, speed=self.speed, eta=self.eta)
+
+    def set_title(self, title: str):
+        """
+        메타데이터에서 얻은 제목을 반영
+        """
+        self.title = title
+        for job_id in self.job_ids:
+            job_store.update(job_id, title=title)
+            job_events.publish(job_id, title=title)
+
+    def set_duration(self, duration: int):
+        """
+        메타데이터에서 얻은 영상 길이를 기록 (재시도 시 스케줄링(SJF)에 사용)
+        """
+        for job_id in self.job_ids:
+            job_store.update(job_id, duration=duration)
+
+    @property
+    def job_ids(self) -> list[str]:
+        return [self.job_id, *self.followers]
+
+
+async def start_engine():
+    if YTDLP_ENGINE == "pool":
+        await ytdlp_pool.start()
+
+
+async def stop_engine():
+    if YTDLP_ENGINE == "pool":
+        await ytdlp_pool.stop()
+
+
+async def _read_lines(stream: asyncio.StreamReader, on_line: Callable[[str], Awaitable[None]]):
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        await on_line(line.decode(errors='replace').rstrip())
+
+
+async def run_subprocess(command: list[str],
+                         on_stdout: Callable[[str], Awaitable[None]],
+                         on_stderr: Callable[[str], Awaitable[None]],
+                         handle: Optional[ConversionHandle] = None) -> int:
+    """
+    명령을 실행하며 stdout/stderr를 한 줄씩 전달하고 종료 코드를 반환
+    별도 프로세스 그룹으로 실행하여 취소 시 ffmpeg 등 자식 프로세스까지 함께 종료
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LINE_LIMIT,
+        start_new_session=True
+    )
+    if handle:
+        handle.attach(lambda: terminate_process_group(process))
+    try:
+        await asyncio.gather(
+            _read_lines(process.stdout, on_stdout),
+            _read_lines(process.stderr, on_stderr)
+        )
+        return await process.wait()
+    except BaseException:
+        # 워커 종료 등으로 실행이 중단되면 프로세스를 남겨 두지 않음
+        await asyncio.shield(terminate_process_group(process))
+        raise
+
+
+async def run_ytdlp(command: list[str], reporter: ProgressReporter,
+                    handle: Optional[ConversionHandle] = None) -> YtdlpResult:
+    """
+    yt-dlp를 실행하며 stdout/stderr를 한 줄씩 읽어 진행률을 갱신
+    출력 전체를 메모리에 쌓지 않고 마지막 OUTPUT_TAIL_LINES 줄만 보관
+    --dump-json --no-simulate로 실행하면 다운로드 전에 출력되는 메타데이터도 함께 수집
+    YTDLP_ENGINE=pool이면 같은 인자로 상주 프로세스 풀에서 실행
+    handle이 있으면 취소 요청, 실행 시간 제한, 진행 없음(stall) 시 프로세스를 종료
+    """
+    stdout_tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    stderr_tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    result = YtdlpResult(return_code=-1, output_tail="")
+    if handle and handle.cancel_reason:
+        result.output_tail = handle.error_message
+        return result
+
+    async def on_progress(progress_update: ProgressUpdate):
+        if handle:
+            handle.touch()
+        await reporter.update(progress_update)
+
+    def collect(tail: deque):
+        async def on_line(line: str):
+            if handle:
+                handle.touch()
+            if line.startswith("{") and result.info is None:
+                try:
+                    result.info = json.loads(line)
+                    result.info_json = line
+                    reporter.set_title(result.info.get("title") or "Untitled Video")
+                    # 메타데이터는 다운로드 시작 직전에 출력됨
+                    if reporter.timer:
+                        reporter.timer.start("download")
+                    return
+                except ValueError:
+                    pass
+            progress = parse_progress_line(line)
+            if progress:
+                await on_progress(progress)
+            elif line:
+                tail.append(line)
+        return on_line
+
+    async with supervise(handle):
+        if YTDLP_ENGINE == "pool":
+            result.return_code = await ytdlp_pool.run(
+                command[1:], collect(stdout_tail), collect(stderr_tail), on_progress,
+                on_start=handle.attach if handle else None
+            )
+        else:
+            result.return_code = await run_subprocess(
+                command, collect(stdout_tail), collect(stderr_tail), handle
+            )
+
+    if handle and handle.cancel_reason:
+        stderr_tail.append(handle.error_message)
+
+    YTDLP_EXIT_CODES.labels(YTDLP_ENGINE, str(result.return_code)).inc()
+
+    tail = stderr_tail if stderr_tail else stdout_tail
+    result.output_tail = "\n".join(tail)
+    return result
+
+
+def _read_info(path: Path) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return file.readline().strip() or None
+    except OSError:
+        return None
+
+
+async def run_pipeline(ytdlp_command: list[str], ffmpeg_command: list[str], info_path: Path,
+                       reporter: ProgressReporter, handle: Optional[ConversionHandle] = None) -> YtdlpResult:
+    """
+    yt-dlp가 받는 바이트를 그대로 ffmpeg에 넘겨 다운로드와 변환을 동시에 수행 (yt-dlp -o - | ffmpeg -i pipe:0)
+    - ffmpeg 출력 파일이 다운로드 진행에 맞춰 커지므로 완료 전에도 읽을 수 있음
+    - stdout은 미디어 데이터이므로 진행률은 yt-dlp stderr에서, 메타데이터는 --print-to-file로 info_path에 기록된 JSON에서 읽음
+    - 종료 코드는 yt-dlp가 실패했으면 yt-dlp의 것, 아니면 ffmpeg의 것
+    handle이 있으면 취소 요청, 실행 시간 제한, 진행 없음(stall) 시 두 프로세스를 모두 종료
+    """
+    output_tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
+    result = YtdlpResult(return_code=-1, output_tail="")
+    if handle and handle.cancel_reason:
+        result.output_tail = handle.error_message
+        return result
+
+    # --print-to-file은 파일 끝에 덧붙이므로 이전 시도의 내용을 지움
+    info_path.unlink(missing_ok=True)
+
+    async def load_info():
+        if result.info is not None:
+            return
+        line = await asyncio.to_thread(_read_info, info_path)
+        if not line:
+            return
+        try:
+            result.info = json.loads(line)
+        except ValueError:
+            return
+        result.info_json = line
+        reporter.set_title(result.info.get("title") or "Untitled Video")
+        if reporter.timer:
+            reporter.timer.start("download")
+
+    async def on_ytdlp_line(line: str):
+        if handle:
+            handle.touch()
+        progress = parse_progress_line(line)
+        if progress:
+            # 메타데이터는 다운로드 시작 직전에 기록됨
+            await load_info()
+            await reporter.update(progress)
+        elif line:
+            output_tail.append(line)
+
+    async def on_ffmpeg_progress(line: str):
+        if handle:
+            handle.touch()
+
+    async def on_ffmpeg_error(line: str):
+        if handle:
+            handle.touch()
+        if line:
+            output_tail.append(line)
+
+    processes: list[asyncio.subprocess.Process] = []
+
+    async def terminate():
+        await asyncio.gather(*(terminate_process_group(process) for process in processes))
+
+    async with supervise(handle):
+        read_fd, write_fd = os.pipe()
+        try:
+            processes.append(await asyncio.create_subprocess_exec(
+                *ytdlp_command,
+                stdout=write_fd,
+                stderr=asyncio.subprocess.PIPE,
+                limit=STREAM_LINE_LIMIT,
+                start_new_session=True
+            ))
+            processes.append(await asyncio.create_subprocess_exec(
+                *ffmpeg_command,
+                stdin=read_fd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            ))
+        except BaseException:
+            await asyncio.shield(terminate())
+            raise
+        finally:
+            # 파이프 끝은 두 프로세스만 갖도록 닫음 (yt-dlp가 끝나면 ffmpeg가 EOF를 받음)
+            os.close(read_fd)
+            os.close(write_fd)
+
+        ytdlp, ffmpeg = processes
+        if handle:
+            handle.attach(terminate)
+        try:
+            await asyncio.gather(
+                _read_lines(ytdlp.stderr, on_ytdlp_line),
+                _read_lines(ffmpeg.stdout, on_ffmpeg_progress),
+                _read_lines(ffmpeg.stderr, on_ffmpeg_error)
+            )
+            ytdlp_code, ffmpeg_code = await ytdlp.wait(), await ffmpeg.wait()
+        except BaseException:
+            # 워커 종료 등으로 실행이 중단되면 프로세스를 남겨 두지 않음
+            await asyncio.shield(terminate())
+            raise
+        result.return_code = ytdlp_code or ffmpeg_code
+
+    await load_info()
+    if handle and handle.cancel_reason:
+        output_tail.append(handle.error_message)
+
+    YTDLP_EXIT_CODES.labels(YTDLP_ENGINE, str(ytdlp_code)).inc()
+
+    result.output_tail = "\n".join(output_tail)
+    if result.return_code != 0 and not result.output_tail:
+        result.output_tail = f"yt-dlp/ffmpeg exited with code {result.return_code}"
+    return result
+
+
+async def extract_playlist_entries(url: str, limit: Optional[int] = None) -> list[dict]:
+    """
+    재생목록을 한 번의 평면 추출(--flat-playlist)로 펼쳐 항목 목록을 반환
+    각 영상의 메타데이터는 추출하지 않으므로 항목 수와 관계없이 요청 한 번으로 끝남
+    limit: 앞에서부터 추출할 최대 항목 수 (매우 긴 재생목록을 끝까지 읽지 않음)
+
+    Raises:
+        RuntimeError: yt-dlp 실행 실패 또는 PLAYLIST_EXTRACT_TIMEOUT 초과
+    """
+    limit_options = ["--playlist-end", str(limit)] if limit else []
+    process = await asyncio.create_subprocess_exec(
+        "yt-dlp", "--flat-playlist", "--dump-single-json", "--no-warnings", *limit_options, url,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_LINE_LIMIT,
+        start_new_session=True
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=PLAYLIST_EXTRACT_TIMEOUT)
+    except asyncio.TimeoutError:
+        await terminate_process_group(process)
+        raise RuntimeError(f"playlist extraction timed out after {int(PLAYLIST_EXTRACT_TIMEOUT)}s")
+    except BaseException:
+        # 요청이 중단되면 프로세스를 남겨 두지 않음
+        await asyncio.shield(terminate_process_group(process))
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode(errors='replace').strip() or "playlist extraction failed")
+
+    info = json.loads(stdout.decode())
+    return [entry for entry in info.get("entries") or [] if entry]
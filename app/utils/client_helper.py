@@ -0,0 +1,51 @@
+import hashlib
+import ipaddress
+import os
+from typing import Optional
+from starlette.requests import HTTPConnection
+
+# 요청자 식별에 인정하는 API 키 목록 (쉼표로 구분, 비우면 X-API-Key 헤더를 무시하고 IP로 식별)
+# 검증하지 않은 키를 식별자로 쓰면 요청마다 새 키를 보내 속도 제한/공정 분배를 피할 수 있음
+API_KEYS = frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip())
+
+# X-Forwarded-For를 믿을 리버스 프록시 주소 (쉼표로 구분, CIDR 가능, 비우면 X-Forwarded-For를 무시)
+# 프록시를 거치지 않은 요청의 X-Forwarded-For는 클라이언트가 마음대로 바꿀 수 있으므로 식별에 쓰지 않음
+TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+)
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def submitter_id(request: HTTPConnection) -> Optional[str]:
+    """
+    작업 요청자 식별자 (스케줄러 공정 분배, 작업 생성 속도 제한 기준)
+    - X-API-Key 헤더가 API_KEYS에 등록된 키이면 키의 해시 (키 원문은 저장하지 않음)
+    - 아니면 클라이언트 IP
+      연결한 주소가 TRUSTED_PROXIES이면 X-Forwarded-For를 뒤에서부터 읽어 신뢰하는 프록시가 아닌 첫 주소
+
+    Returns:
+        "key:<해시>" / "ip:<주소>" 형식의 문자열, 알 수 없으면 None
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    if not request.client:
+        return None
+    address = request.client.host
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and _is_trusted_proxy(address):
+        # 신뢰하는 프록시가 덧붙인 값만 믿음 (그보다 앞의 값은 클라이언트가 보낸 것일 수 있음)
+        for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            address = hop
+            if not _is_trusted_proxy(hop):
+                break
+    return "ip:" + address[:60]
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 def format_datetime_utc(dt: datetime) -> str:
@@ -23,3 +23,10 @@ def format_datetime_utc(dt: datetime) -> str:
         iso_str += '+00:00'
 
     return iso_str
+
+
+def as_utc(dt: datetime) -> datetime:
+    """
+    timezone 정보가 없는 datetime(SQLite)을 UTC로 간주하여 비교 가능한 값으로 변환
+    """
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+# 파일 전송 시 한 번에 읽는 크기 (Starlette 기본값 64KB보다 크게 하여 대용량 MP4 전송 시 루프 횟수 감소)
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# 파일 전송을 앞단 서버에 넘기는 방식
+#   (빈 값): 앱에서 직접 전송
+#   x-accel-redirect: nginx internal location으로 넘김 (DOWNLOAD_ACCEL_PREFIX + 파일명)
+#   x-sendfile: Apache/lighttpd 등에 절대 경로를 넘김
+DOWNLOAD_OFFLOAD = os.getenv("DOWNLOAD_OFFLOAD", "").lower()
+DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "/protected-downloads/")
+
+mimetypes.add_type("audio/mpeg", ".mp3")
+mimetypes.add_type("video/mp4", ".mp4")
+
+
+class DownloadFileResponse(FileResponse):
+    chunk_size = DOWNLOAD_CHUNK_SIZE
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """
+    파일 크기와 수정 시각(ns)으로 strong ETag 생성
+    변환 결과 파일은 완료 후 내용이 바뀌지 않으므로 크기/시각이 같으면 같은 내용으로 봄
+    """
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def content_disposition(filename: str) -> str:
+    """
+    다운로드 파일명 헤더 (한글 등 비 ASCII 제목은 RFC 5987 형식으로 인코딩)
+    """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def etag_matches(request: Request, etag: str) -> Optional[bool]:
+    """
+    If-None-Match 헤더가 etag와 일치하는지 (약한 비교, 헤더가 없으면 None)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def is_not_modified(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    """
+    If-None-Match / If-Modified-Since 조건부 요청 처리 (If-None-Match가 있으면 우선)
+    """
+    matched = etag_matches(request, etag)
+    if matched is not None:
+        return matched
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(stat_result.st_mtime) <= since
+    return False
+
+
+def build_file_response(request: Request, path: Path, filename: str,
+                        stat_result: os.stat_result, offload: Optional[str] = None) -> Response:
+    """
+    다운로드 응답 생성
+    - ETag/Last-Modified를 붙이고 조건부 요청에는 304 반환
+    - Range/다중 Range(multipart/byteranges)/If-Range는 FileResponse가 처리
+    - offload가 설정되면 본문 없이 X-Accel-Redirect/X-Sendfile 헤더만 보내 앞단 서버가 전송
+
+    Args:
+        stat_result: 이벤트 루프를 막지 않도록 호출한 쪽에서 스레드로 미리 조회한 파일 정보
+        offload: 전송 위임 방식 (기본값: DOWNLOAD_OFFLOAD)
+    """
+    offload = DOWNLOAD_OFFLOAD if offload is None else offload
+    etag = make_etag(stat_result)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "cache-control": "private, max-age=0, must-revalidate",
+    }
+
+    if is_not_modified(request, etag, stat_result):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    if offload in ("x-accel-redirect", "x-sendfile"):
+        headers["content-disposition"] = content_disposition(filename)
+        if offload == "x-accel-redirect":
+            headers["x-accel-redirect"] = DOWNLOAD_ACCEL_PREFIX + quote(filename)
+        else:
+            headers["x-sendfile"] = str(path.resolve())
+        # 앞단 서버가 Content-Length/Range를 다시 계산하므로 본문 없이 반환
+        return Response(media_type=media_type, headers=headers)
+
+    return DownloadFileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result
+    )
@@ -0,0 +1,112 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# yt-dlp 진행률 출력 예시
+#   [download]  45.3% of ~  10.00MiB at    2.00MiB/s ETA 00:05 (frag 3/10)
+#   [download] 100% of   10.00MiB in 00:00:05 at 2.00MiB/s
+_PROGRESS_RE = re.compile(
+    r'^\[download\]\s+(?P<percent>\d+(?:\.\d+)?)%'
+    r'(?:\s+of\s+~?\s*(?P<total>\d+(?:\.\d+)?\s*[KMGT]?i?B))?'
+    r'.*?(?:\s+at\s+(?P<speed>\d+(?:\.\d+)?\s*[KMGT]?i?B)/s)?'
+    r'(?:\s+ETA\s+(?P<eta>\d+(?::\d+)*))?'
+)
+
+# 다운로드 이후 ffmpeg 후처리 단계 출력 (예: [ExtractAudio], [Merger])
+_POSTPROCESS_RE = re.compile(r'^\[(ExtractAudio|Merger|VideoConvertor|VideoRemuxer|FixupM3u8|Fixup\w*)\]')
+
+_UNITS = {
+    'B': 1,
+    'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4,
+    'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4,
+}
+
+
+@dataclass
+class ProgressUpdate:
+    percent: Optional[float] = None      # 다운로드 진행률 (0-100)
+    total_bytes: Optional[int] = None
+    speed: Optional[int] = None          # bytes/s
+    eta: Optional[int] = None            # 초
+    postprocessing: bool = False         # ffmpeg 후처리 단계 진입 여부
+
+
+def parse_size(value: str) -> Optional[int]:
+    """
+    '10.00MiB' 같은 yt-dlp 크기 문자열을 바이트 수로 변환
+    """
+    match = re.match(r'^(\d+(?:\.\d+)?)\s*([KMGT]?i?B)$', value.strip())
+    if not match or match.group(2) not in _UNITS:
+        return None
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+def parse_eta(value: str) -> Optional[int]:
+    """
+    'HH:MM:SS' 또는 'MM:SS' 형식을 초 단위로 변환
+    """
+    seconds = 0
+    try:
+        for part in value.split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return None
+    return seconds
+
+
+def parse_progress_line(line: str) -> Optional[ProgressUpdate]:
+    """
+    yt-dlp 출력 한 줄을 해석하여 진행 정보를 반환
+    진행 정보가 없는 줄이면 None 반환
+    """
+    line = line.strip()
+
+    if _POSTPROCESS_RE.match(line):
+        return ProgressUpdate(postprocessing=True)
+
+    match = _PROGRESS_RE.match(line)
+    if not match:
+        return None
+
+    update = ProgressUpdate(percent=min(100.0, float(match.group('percent'))))
+    if match.group('total'):
+        update.total_bytes = parse_size(match.group('total'))
+    if match.group('speed'):
+        update.speed = parse_size(match.group('speed'))
+    if match.group('eta'):
+        update.eta = parse_eta(match.group('eta'))
+    return update
+
+
+def parse_progress_hook(status: dict) -> Optional[ProgressUpdate]:
+    """
+    YoutubeDL progress_hooks로 받은 상태를 ProgressUpdate로 변환 (풀 엔진에서 사용)
+    전체 크기를 알 수 없는 상태면 None 반환
+    """
+    if status.get('status') == 'finished':
+        return ProgressUpdate(percent=100.0, total_bytes=status.get('total_bytes'))
+    if status.get('status') != 'downloading':
+        return None
+
+    total = status.get('total_bytes') or status.get('total_bytes_estimate')
+    downloaded = status.get('downloaded_bytes')
+    if not total or downloaded is None:
+        return None
+
+    update = ProgressUpdate(percent=min(100.0, downloaded * 100 / total), total_bytes=int(total))
+    if status.get('speed'):
+        update.speed = int(status['speed'])
+    if status.get('eta') is not None:
+        update.eta = int(status['eta'])
+    return update
+
+
+def parse_postprocessor_hook(status: dict) -> Optional[ProgressUpdate]:
+    """
+    YoutubeDL postprocessor_hooks로 받은 상태가 ffmpeg 후처리 단계 시작이면 ProgressUpdate 반환
+    """
+    if status.get('status') != 'started':
+        return None
+    if not _POSTPROCESS_RE.match(f"[{status.get('postprocessor')}]"):
+        return None
+    return ProgressUpdate(postprocessing=True)
@@ -0,0 +1,82 @@
+import re
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+# YouTube 영상 ID는 11자리 [A-Za-z0-9_-]
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+_YOUTUBE_HOSTS = {
+    'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'www.youtube-nocookie.com',
+}
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    YouTube URL에서 영상 ID를 추출
+    지원 형식: watch?v=, youtu.be/, /shorts/, /embed/, /live/, /v/
+    YouTube URL이 아니거나 ID를 찾을 수 없으면 None 반환
+
+    Args:
+        url: 사용자가 입력한 URL
+
+    Returns:
+        11자리 영상 ID 또는 None
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    host = (parsed.hostname or '').lower()
+    path_parts = [part for part in parsed.path.split('/') if part]
+
+    candidate = None
+    if host in ('youtu.be', 'www.youtu.be'):
+        candidate = path_parts[0] if path_parts else None
+    elif host in _YOUTUBE_HOSTS:
+        if parsed.path == '/watch':
+            candidate = parse_qs(parsed.query).get('v', [None])[0]
+        elif len(path_parts) >= 2 and path_parts[0] in ('shorts', 'embed', 'live', 'v'):
+            candidate = path_parts[1]
+
+    if candidate and _VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def canonical_url(video_id: str) -> str:
+    """
+    영상 ID로 표준 watch URL 생성 (재생목록/타임스탬프 등 부가 파라미터 제거)
+    """
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def extract_playlist_id(url: str) -> Optional[str]:
+    """
+    YouTube 재생목록 URL에서 재생목록 ID를 추출
+    영상 URL에 list= 파라미터가 붙은 경우(재생목록 안의 영상)는 영상 하나로 취급하여 None 반환
+
+    Args:
+        url: 사용자가 입력한 URL
+
+    Returns:
+        재생목록 ID 또는 None
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    host = (parsed.hostname or '').lower()
+    if host not in _YOUTUBE_HOSTS or parsed.path != '/playlist':
+        return None
+    return parse_qs(parsed.query).get('list', [None])[0]
@@ -0,0 +1,61 @@
+import time
+import zipfile
+from contextlib import closing
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+# 파일에서 한 번에 읽어 ZIP으로 내보내는 크기
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkBuffer:
+    """
+    ZipFile이 쓰는 바이트를 모아 두었다가 drain()으로 꺼내는 쓰기 전용 스트림
+    seek()를 제공하지 않으므로 ZipFile은 data descriptor 방식으로 순차 기록함
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(files: Iterable[tuple[Callable[[], tuple[BinaryIO, float]], str]],
+             chunk_size: int = ZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    파일들을 무압축(store) ZIP으로 묶어 조각 단위로 반환
+    - 임시 파일 없이 즉석에서 생성하며, 메모리에는 최대 chunk_size 정도만 보관
+    - ZIP64를 사용하므로 4GB를 넘는 파일/묶음도 가능
+    - 파일은 차례가 되었을 때 열며, 열 수 없으면 OSError로 중단 (일부가 빠진 ZIP을 정상처럼 보내지 않음)
+
+    Args:
+        files: (파일을 열어 (읽기 스트림, 수정 시각)을 반환하는 함수, ZIP 안에서 사용할 이름) 목록
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for open_file, arcname in files:
+            source, mtime = open_file()
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_STORED
+            with closing(source), archive.open(info, "w", force_zip64=True) as target:
+                while chunk := source.read(chunk_size):
+                    target.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    # 중앙 디렉터리
+    yield buffer.drain()
@@ -0,0 +1,99 @@
+"""
+벤치마크용 가짜 ffmpeg
+
+인코딩 없이 입력(파일 또는 pipe:0)을 받는 대로 모든 출력 파일에 그대로 기록하고
+-progress pipe:1이면 ffmpeg와 같은 형식의 진행 정보(out_time_us=..., progress=continue/end)를 stdout으로 낸다.
+load_test.py가 fake_ytdlp.py와 함께 PATH 앞쪽에 ffmpeg라는 이름으로 연결하여
+원본 캐시(캐시된 원본에서 변환)와 다운로드 중 MP3 변환(yt-dlp -o - | ffmpeg) 경로를 실제 설정 그대로 실행한다.
+
+환경 변수
+- FAKE_FFMPEG_FAIL_RATE: 실패 확률 (0-1, 기본값 0)
+"""
+import os
+import random
+import sys
+
+FAIL_RATE = float(os.getenv("FAKE_FFMPEG_FAIL_RATE", "0"))
+
+# 값을 받지 않는 옵션 (나머지 -옵션은 다음 인자를 값으로 받음)
+FLAGS = {"-y", "-n", "-nostdin", "-hide_banner", "-nostats", "-vn", "-an", "-sn"}
+
+CHUNK_SIZE = 256 * 1024
+
+
+def _parse(args: list[str]) -> tuple[list[str], list[str], bool]:
+    """
+    (입력 목록, 출력 목록, 진행 정보 출력 여부)
+    """
+    inputs, outputs = [], []
+    progress = False
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in FLAGS:
+            index += 1
+        elif arg.startswith("-") and arg != "-":
+            value = args[index + 1] if index + 1 < len(args) else ""
+            if arg == "-i":
+                inputs.append(value)
+            elif arg == "-progress":
+                progress = value == "pipe:1"
+            index += 2
+        else:
+            outputs.append(arg)
+            index += 1
+    return inputs, outputs, progress
+
+
+def _progress(written: int, state: str):
+    # 실제 ffmpeg는 재생 시간 기준이지만 여기서는 받은 바이트 수로 대신함
+    sys.stdout.write(f"total_size={written}\nout_time_us={written}\nprogress={state}\n")
+    sys.stdout.flush()
+
+
+def main(args: list[str]) -> int:
+    if "-version" in args:
+        sys.stdout.write("ffmpeg version 0.0-fake\n")
+        return 0
+
+    inputs, outputs, progress = _parse(args)
+    if not inputs or not outputs:
+        sys.stderr.write("At least one input and one output file must be specified\n")
+        return 1
+
+    source_name = inputs[0]
+    if source_name in ("pipe:0", "pipe:", "-"):
+        source = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    else:
+        try:
+            source = open(source_name, "rb")
+        except OSError as e:
+            sys.stderr.write(f"{source_name}: {e.strerror}\n")
+            return 1
+
+    written = 0
+    targets = [open(path, "wb") for path in outputs]
+    try:
+        with source:
+            while chunk := source.read1(CHUNK_SIZE):
+                for target in targets:
+                    target.write(chunk)
+                    # 변환 중에도 결과 파일을 읽을 수 있도록 바로 기록 (-flush_packets 1)
+                    target.flush()
+                written += len(chunk)
+                if progress:
+                    _progress(written, "continue")
+    finally:
+        for target in targets:
+            target.close()
+
+    if random.random() < FAIL_RATE:
+        sys.stderr.write("Error while decoding stream #0:0: Invalid data found when processing input (fake failure)\n")
+        return 1
+    if progress:
+        _progress(written, "end")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
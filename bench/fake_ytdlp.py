@@ -0,0 +1,216 @@
+"""
+벤치마크용 가짜 yt-dlp
+
+네트워크 없이 yt-dlp와 같은 형식의 출력(메타데이터 JSON, [download] 진행률, 후처리)을 내고
+지정한 크기의 파일을 만든다. load_test.py가 PATH 앞쪽에 yt-dlp라는 이름으로 연결해 사용한다.
+
+환경 변수
+- FAKE_YTDLP_DURATION: 다운로드에 걸리는 시간 (초, 기본값 2)
+- FAKE_YTDLP_SIZE_MB: 만들 파일 크기 (MB, 기본값 5)
+- FAKE_YTDLP_FAIL_RATE: 실패 확률 (0-1, 기본값 0)
+- FAKE_YTDLP_EXTRACT_DELAY: 메타데이터 추출에 걸리는 시간 (초, 기본값 0.3, --load-info-json이면 생략)
+- FAKE_YTDLP_PLAYLIST_SIZE: --flat-playlist로 펼칠 때 반환할 항목 수 (기본값 10)
+- FAKE_YTDLP_MEDIA_URL: 설정하면 시간 대신 이 주소(media_server.py)에서 실제로 받음
+  --proxy, --concurrent-fragments를 지키며 FAKE_YTDLP_FRAGMENT_MB 크기의 조각으로 나눠 받음
+
+-o -(stdout으로 내보내기, ffmpeg 파이프 변환)이면 진행률은 stderr로, 메타데이터는 --print-to-file로 기록하고
+-o의 %(ext)s(원본 캐시의 audio.%(ext)s, av.%(ext)s)는 선택된 포맷의 확장자로 바꾼다.
+"""
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DURATION = float(os.getenv("FAKE_YTDLP_DURATION", "2"))
+SIZE_MB = float(os.getenv("FAKE_YTDLP_SIZE_MB", "5"))
+FAIL_RATE = float(os.getenv("FAKE_YTDLP_FAIL_RATE", "0"))
+EXTRACT_DELAY = float(os.getenv("FAKE_YTDLP_EXTRACT_DELAY", "0.3"))
+PLAYLIST_SIZE = int(os.getenv("FAKE_YTDLP_PLAYLIST_SIZE", "10"))
+MEDIA_URL = os.getenv("FAKE_YTDLP_MEDIA_URL")
+FRAGMENT_MB = float(os.getenv("FAKE_YTDLP_FRAGMENT_MB", "1"))
+
+# 진행률 출력 간격 (실제 yt-dlp --newline과 비슷한 빈도)
+PROGRESS_STEPS = 20
+CHUNK = b"\0" * (1024 * 1024)
+
+
+def _option(args: list[str], name: str):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return None
+
+
+def _video_id(url: str) -> str:
+    for marker in ("v=", "youtu.be/", "/shorts/"):
+        if marker in url:
+            return url.split(marker, 1)[1][:11]
+    return url.rsplit("/", 1)[-1][:11] or "unknown"
+
+
+def _info(video_id: str) -> dict:
+    return {
+        "id": video_id,
+        "title": f"Benchmark video {video_id}",
+        "duration": 213,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "formats": [
+            {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129},
+            {"format_id": "18", "ext": "mp4", "acodec": "mp4a.40.2", "vcodec": "avc1", "height": 360},
+            {"format_id": "22", "ext": "mp4", "acodec": "mp4a.40.2", "vcodec": "avc1", "height": 720},
+        ],
+    }
+
+
+def _print(line: str):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def _log(line: str, log_to_stdout: bool):
+    # 미디어를 stdout으로 내보내는 동안에는 실제 yt-dlp처럼 진행률을 stderr로 출력
+    stream = sys.stdout if log_to_stdout else sys.stderr
+    stream.write(line + "\n")
+    stream.flush()
+
+
+def _output_path(template: str, args: list[str]) -> str:
+    if "--merge-output-format" in args:
+        ext = _option(args, "--merge-output-format")
+    elif "--extract-audio" in args:
+        ext = _option(args, "--audio-format") or "mp3"
+    else:
+        ext = "m4a" if (_option(args, "-f") or "").startswith("bestaudio") else "mp4"
+    return template.replace("%(ext)s", ext)
+
+
+def _open_output(output_path: str):
+    if output_path == "-":
+        return os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    return open(output_path, "wb")
+
+
+def _flat_playlist(url: str) -> int:
+    playlist_id = url.split("list=", 1)[-1].split("&")[0]
+    entries = [
+        {"id": f"pl{index:09d}", "url": f"https://www.youtube.com/watch?v=pl{index:09d}", "title": f"Entry {index}"}
+        for index in range(PLAYLIST_SIZE)
+    ]
+    _print(json.dumps({"id": playlist_id, "_type": "playlist", "entries": entries}))
+    return 0
+
+
+def _download(args: list[str]) -> int:
+    output_path = _output_path(_option(args, "-o"), args)
+    info_json_path = _option(args, "--load-info-json")
+
+    if info_json_path:
+        with open(info_json_path, encoding="utf-8") as f:
+            info = json.load(f)
+    else:
+        time.sleep(EXTRACT_DELAY)
+        info = _info(_video_id(args[-1]))
+
+    if random.random() < FAIL_RATE:
+        sys.stderr.write(f"ERROR: [youtube] {info['id']}: Video unavailable (fake failure)\n")
+        return 1
+
+    if "--dump-json" in args:
+        _print(json.dumps(info))
+    if "--print-to-file" in args:
+        # --print-to-file <템플릿> <파일> (템플릿은 %()j로 가정)
+        print_path = args[args.index("--print-to-file") + 2]
+        with open(print_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(info) + "\n")
+
+    log_to_stdout = output_path != "-"
+    total_bytes = int(SIZE_MB * 1024 * 1024)
+    _log(f"[download] Destination: {output_path}", log_to_stdout)
+    try:
+        with _open_output(output_path) as f:
+            if MEDIA_URL:
+                _fetch(args, f, total_bytes, log_to_stdout)
+            else:
+                _write(f, total_bytes, log_to_stdout)
+    except BrokenPipeError:
+        # 받는 쪽(ffmpeg)이 먼저 종료됨 (취소 등)
+        sys.stderr.write("ERROR: unable to write data: Broken pipe\n")
+        return 1
+
+    if "--extract-audio" in args:
+        _print(f"[ExtractAudio] Destination: {output_path}")
+    elif "--merge-output-format" in args:
+        _print(f"[Merger] Merging formats into \"{output_path}\"")
+    return 0
+
+
+def _write(f, total_bytes: int, log_to_stdout: bool):
+    total_mib = total_bytes / 1024 / 1024
+    speed_mib = total_mib / DURATION if DURATION > 0 else total_mib
+
+    written = 0
+    for step in range(1, PROGRESS_STEPS + 1):
+        target = total_bytes * step // PROGRESS_STEPS
+        while written < target:
+            size = min(len(CHUNK), target - written)
+            f.write(CHUNK[:size])
+            written += size
+        f.flush()
+        time.sleep(DURATION / PROGRESS_STEPS)
+        percent = step * 100 / PROGRESS_STEPS
+        eta = int(DURATION * (PROGRESS_STEPS - step) / PROGRESS_STEPS)
+        _log(
+            f"[download] {percent:5.1f}% of {total_mib:8.2f}MiB at {speed_mib:8.2f}MiB/s "
+            f"ETA {eta // 60:02d}:{eta % 60:02d}",
+            log_to_stdout
+        )
+    _log(f"[download] 100% of {total_mib:8.2f}MiB in 00:00:{int(DURATION):02d} at {speed_mib:.2f}MiB/s", log_to_stdout)
+
+
+def _fetch(args: list[str], f, total_bytes: int, log_to_stdout: bool):
+    """
+    미디어 서버에서 조각을 --concurrent-fragments개씩 동시에 받아 순서대로 기록
+    """
+    proxy = _option(args, "--proxy")
+    fragments = int(_option(args, "--concurrent-fragments") or 1)
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({"http": proxy} if proxy else {}))
+    fragment_bytes = max(1, int(FRAGMENT_MB * 1024 * 1024))
+    sizes = [min(fragment_bytes, total_bytes - offset) for offset in range(0, total_bytes, fragment_bytes)]
+    total_mib = total_bytes / 1024 / 1024
+
+    def get(size: int) -> bytes:
+        with opener.open(f"{MEDIA_URL}?bytes={size}", timeout=60) as response:
+            return response.read()
+
+    started = time.monotonic()
+    written = 0
+    with ThreadPoolExecutor(max_workers=fragments) as executor:
+        for index, data in enumerate(executor.map(get, sizes), start=1):
+            f.write(data)
+            f.flush()
+            written += len(data)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            speed_mib = written / elapsed / 1024 / 1024
+            eta = int((total_bytes - written) / (written / elapsed))
+            _log(
+                f"[download] {written * 100 / total_bytes:5.1f}% of {total_mib:8.2f}MiB at {speed_mib:8.2f}MiB/s "
+                f"ETA {eta // 60:02d}:{eta % 60:02d} (frag {index}/{len(sizes)})",
+                log_to_stdout
+            )
+
+
+def main(args: list[str]) -> int:
+    if "--version" in args:
+        _print("2099.01.01-fake")
+        return 0
+    if "--flat-playlist" in args:
+        return _flat_playlist(args[-1])
+    return _download(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,455 @@
+"""
+오프라인 부하 테스트
+
+가짜 yt-dlp(fake_ytdlp.py)와 가짜 ffmpeg(fake_ffmpeg.py)를 PATH에 연결하고 임시 SQLite DB/다운로드 경로로 서버를 띄운 뒤,
+여러 클라이언트가 동시에 /convert, /api/jobs, /jobs, /download를 호출하여
+처리량(jobs/sec), API 지연 시간(p50/p99), DB 잠금 경합을 측정한다.
+
+네트워크와 실제 yt-dlp가 필요 없으므로 스케줄러/페이지네이션/캐시 변경 전후를 같은 조건으로 비교할 수 있다.
+
+사용 예
+    python bench/load_test.py --jobs 200 --clients 20 --duration 1 --size-mb 2
+    python bench/load_test.py --jobs 100 --fail-rate 0.1 --repeat-ratio 0.3 --json result.json
+    python bench/load_test.py --jobs 40 --size-mb 8 --media-link-mb 20 --env DOWNLOAD_BANDWIDTH_LIMIT=10485760
+
+서버 설정(MAX_WORKERS 등)은 --env KEY=VALUE로 전달
+원본 캐시와 다운로드 중 MP3 변환은 운영 기본값대로 켜져 있음 (끄고 비교하려면 --env SOURCE_CACHE_TTL=0 --env PROGRESSIVE_MP3=false)
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, quote
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+import media_server  # noqa: E402
+APP_DIR = BENCH_DIR.parent / "app"
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# /metrics 텍스트 형식의 지표 한 줄 (이름{라벨} 값)
+_METRIC_RE = re.compile(r'^(?P<name>[a-z_]+)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)$')
+
+
+class LatencyRecorder:
+    """
+    엔드포인트별 응답 시간과 오류 수 집계 (여러 스레드에서 호출)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if status >= 500 or status == 0:
+                self.errors[endpoint] += 1
+
+    def summary(self) -> dict[str, dict]:
+        result = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            result[endpoint] = {
+                "requests": len(ordered),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+                "p99_ms": round(_percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return result
+
+
+class Client:
+    """
+    스레드 하나가 사용하는 keep-alive HTTP 클라이언트
+    """
+
+    def __init__(self, port: int, recorder: LatencyRecorder):
+        self.port = port
+        self.recorder = recorder
+        self._conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, endpoint: str, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[dict] = None) -> tuple[int, bytes]:
+        started = time.perf_counter()
+        try:
+            self._conn.request(method, path, body=body, headers=headers or {})
+            response = self._conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # 연결이 끊기면 다시 연결하고 오류로 기록
+            self._conn.close()
+            self._conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            status, data = 0, b""
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        return status, data
+
+    def close(self):
+        self._conn.close()
+
+
+def _percentile(ordered: list[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _install_stub(bin_dir: Path):
+    """
+    fake_ytdlp.py, fake_ffmpeg.py를 yt-dlp, ffmpeg라는 이름으로 실행할 수 있게 연결
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, script in (("yt-dlp", "fake_ytdlp.py"), ("ffmpeg", "fake_ffmpeg.py")):
+        shim = bin_dir / name
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{BENCH_DIR / script}" "$@"\n')
+        shim.chmod(0o755)
+
+
+def _video_urls(count: int, repeat_ratio: float) -> list[str]:
+    """
+    영상 URL 목록 (repeat_ratio만큼은 앞서 나온 영상을 다시 요청하여 결과 파일 공유/합류 경로를 사용)
+    """
+    urls = []
+    for index in range(count):
+        if urls and random.random() < repeat_ratio:
+            urls.append(random.choice(urls))
+        else:
+            urls.append(f"https://www.youtube.com/watch?v=bench{index:06d}")
+    return urls
+
+
+def _start_server(args, work_dir: Path, port: int, log_file,
+                  media_url: Optional[str] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "PATH": f"{work_dir / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{work_dir / 'bench.db'}",
+        "DOWNLOAD_DIR": str(work_dir / "downloads"),
+        "YTDLP_ENGINE": "subprocess",
+        "MAX_WORKERS": str(args.workers),
+        "FAKE_YTDLP_DURATION": str(args.duration),
+        "FAKE_YTDLP_SIZE_MB": str(args.size_mb),
+        "FAKE_YTDLP_FAIL_RATE": str(args.fail_rate),
+        # 한 클라이언트가 대량으로 제출하므로 수락 제어는 끔 (--env로 다시 켜서 부하 차단 동작 측정 가능)
+        "RATE_LIMIT_PER_MINUTE": "0",
+        "ADMISSION_MAX_QUEUE": "0",
+        "ADMISSION_MIN_FREE_BYTES": "0",
+    })
+    if media_url:
+        # 가짜 yt-dlp가 로컬 미디어 서버에서 실제로 받음 (대역폭 관리 프록시/동시 조각 수 측정)
+        env["FAKE_YTDLP_MEDIA_URL"] = media_url
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    (work_dir / "downloads").mkdir(parents=True, exist_ok=True)
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}, see {log_file.name}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/ping")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server did not start within 30s")
+
+
+def _scrape_metrics(port: int) -> dict[tuple[str, str], float]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", "/metrics")
+        text = conn.getresponse().read().decode()
+    finally:
+        conn.close()
+    values = {}
+    for line in text.splitlines():
+        match = _METRIC_RE.match(line)
+        if match:
+            values[(match.group("name"), match.group("labels") or "")] = float(match.group("value"))
+    return values
+
+
+def _histogram_quantile(before: dict, after: dict, name: str, quantile: float,
+                        label_filter: str = "") -> Optional[float]:
+    """
+    두 시점 사이에 관측된 값으로 히스토그램 분위수(버킷 상한)를 계산
+    """
+    buckets = defaultdict(float)
+    for (metric, labels), value in after.items():
+        if metric != f"{name}_bucket" or label_filter not in labels:
+            continue
+        bound = re.search(r'le="([^"]+)"', labels).group(1)
+        buckets[float(bound)] += value - before.get((metric, labels), 0.0)
+    if not buckets:
+        return None
+    total = buckets[float("inf")]
+    if total <= 0:
+        return None
+    for bound in sorted(buckets):
+        if buckets[bound] >= total * quantile:
+            return bound
+    return None
+
+
+def _counter_delta(before: dict, after: dict, name: str, label_filter: str = "") -> float:
+    return sum(
+        value - before.get(key, 0.0)
+        for key, value in after.items()
+        if key[0] == name and label_filter in key[1]
+    )
+
+
+def _job_ids_by_url(db_path: Path) -> dict[str, list[str]]:
+    """
+    /convert는 작업 ID를 반환하지 않으므로 벤치마크가 만든 DB에서 직접 읽음 (제출이 끝난 뒤 한 번만)
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute("SELECT url, job_id FROM conversion_jobs ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    job_ids = defaultdict(list)
+    for url, job_id in rows:
+        job_ids[url].append(job_id)
+    return job_ids
+
+
+def _submit(client: Client, urls: list[str], fmt: str, quality: str):
+    for url in urls:
+        body = urlencode({"ext": fmt, "quality": quality, "url": url}).encode()
+        client.request("POST /convert", "POST", "/convert", body,
+                       {"Content-Type": "application/x-www-form-urlencoded"})
+
+
+def _poll(client: Client, job_ids: list[str], poll_interval: float, timeout: float,
+          list_every: int) -> dict[str, dict]:
+    """
+    담당 작업이 모두 끝날 때까지 /api/jobs로 상태를 조회하고, 중간중간 /jobs 목록 페이지도 요청
+    """
+    jobs: dict[str, dict] = {}
+    remaining = list(job_ids)
+    deadline = time.monotonic() + timeout
+    rounds = 0
+    while remaining and time.monotonic() < deadline:
+        query = urlencode([("job_ids", job_id) for job_id in remaining])
+        status, data = client.request("GET /api/jobs", "GET", f"/api/jobs?{query}")
+        if status == 200:
+            payload = json.loads(data)
+            for job in payload if isinstance(payload, list) else []:
+                if job["status"] in TERMINAL_STATUSES:
+                    jobs[job["job_id"]] = job
+            remaining = [job_id for job_id in remaining if job_id not in jobs]
+
+        rounds += 1
+        if list_every and rounds % list_every == 0:
+            client.request("GET /jobs", "GET", "/jobs?per_page=20")
+        if remaining:
+            time.sleep(poll_interval)
+    return jobs
+
+
+def _download(client: Client, filename: str):
+    client.request("GET /download", "GET", f"/download/{quote(filename)}")
+
+
+def run(args) -> dict:
+    random.seed(args.seed)
+    work_dir = Path(tempfile.mkdtemp(prefix="ytc-bench-"))
+    _install_stub(work_dir / "bin")
+    port = _free_port()
+    log_path = work_dir / "server.log"
+    recorder = LatencyRecorder()
+
+    media = None
+    media_url = None
+    if args.media_link_mb or args.media_connection_mb:
+        media = media_server.start(0, args.media_link_mb * 1024 * 1024, args.media_connection_mb * 1024 * 1024)
+        media_url = f"http://127.0.0.1:{media.server_address[1]}/fragment"
+
+    with open(log_path, "w") as log_file:
+        server = _start_server(args, work_dir, port, log_file, media_url)
+        try:
+            metrics_before = _scrape_metrics(port)
+            urls = _video_urls(args.jobs, args.repeat_ratio)
+            shares = [urls[index::args.clients] for index in range(args.clients)]
+            clients = [Client(port, recorder) for _ in range(args.clients)]
+
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                # 1. 동시 제출
+                started = time.perf_counter()
+                list(executor.map(lambda pair: _submit(pair[0], pair[1], args.format, args.quality),
+                                  zip(clients, shares)))
+                submitted = time.perf_counter()
+
+                # 2. 클라이언트마다 자기가 제출한 작업의 완료를 기다림
+                job_ids = _job_ids_by_url(work_dir / "bench.db")
+                client_jobs = []
+                for share in shares:
+                    ids = []
+                    for url in share:
+                        if job_ids.get(url):
+                            ids.append(job_ids[url].pop(0))
+                    client_jobs.append(ids)
+                results = list(executor.map(
+                    lambda pair: _poll(pair[0], pair[1], args.poll_interval, args.timeout, args.list_every),
+                    zip(clients, client_jobs)
+                ))
+                finished = time.perf_counter()
+
+                # 3. 완료된 파일 동시 다운로드
+                filenames = [
+                    job["filename"] for jobs in results for job in jobs.values()
+                    if job["status"] == "completed" and job.get("filename")
+                ]
+                downloads = [filenames[index::args.clients] for index in range(args.clients)]
+                list(executor.map(lambda pair: [_download(pair[0], name) for name in pair[1]],
+                                  zip(clients, downloads)))
+
+            for client in clients:
+                client.close()
+            metrics_after = _scrape_metrics(port)
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            if media:
+                media.shutdown()
+
+    statuses = defaultdict(int)
+    for jobs in results:
+        for job in jobs.values():
+            statuses[job["status"]] += 1
+    total_jobs = sum(len(ids) for ids in client_jobs)
+    statuses["unfinished"] = total_jobs - sum(statuses.values())
+    log_text = log_path.read_text(errors="replace")
+
+    report = {
+        "config": {
+            "jobs": args.jobs, "clients": args.clients, "workers": args.workers,
+            "duration": args.duration, "size_mb": args.size_mb, "fail_rate": args.fail_rate,
+            "repeat_ratio": args.repeat_ratio, "format": args.format, "quality": args.quality,
+            "media_link_mb": args.media_link_mb, "media_connection_mb": args.media_connection_mb,
+        },
+        "jobs": dict(statuses),
+        "submit_seconds": round(submitted - started, 3),
+        "total_seconds": round(finished - started, 3),
+        "jobs_per_sec": round(
+            (statuses["completed"] + statuses["failed"]) / (finished - started), 3
+        ) if finished > started else 0.0,
+        "latency": recorder.summary(),
+        # 대역폭 관리 프록시(DOWNLOAD_BANDWIDTH_LIMIT)를 거쳐 받은 양 / 전체 시간
+        "proxy_mb_per_sec": round(
+            _counter_delta(metrics_before, metrics_after, "ytc_download_bytes_total") / 1024 / 1024
+            / (finished - started), 3
+        ) if finished > started else 0.0,
+        "db": {
+            "locked_errors": len(re.findall(r"database is locked", log_text)),
+            "rollbacks": _counter_delta(metrics_before, metrics_after,
+                                        "ytc_db_transaction_seconds_count", 'outcome="rollback"'),
+            "transaction_p99_s": _histogram_quantile(metrics_before, metrics_after,
+                                                     "ytc_db_transaction_seconds", 0.99),
+            "query_p99_s": _histogram_quantile(metrics_before, metrics_after, "ytc_db_query_seconds", 0.99),
+        },
+        "server_log": str(log_path),
+    }
+    if not args.keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        report["server_log"] = None
+    return report
+
+
+def _print_report(report: dict):
+    config = report["config"]
+    print(f"jobs={config['jobs']} clients={config['clients']} workers={config['workers']} "
+          f"duration={config['duration']}s size={config['size_mb']}MB fail_rate={config['fail_rate']} "
+          f"repeat_ratio={config['repeat_ratio']}")
+    print(f"jobs: {report['jobs']}")
+    print(f"submit: {report['submit_seconds']}s  total: {report['total_seconds']}s  "
+          f"throughput: {report['jobs_per_sec']} jobs/sec")
+    if report["proxy_mb_per_sec"]:
+        print(f"download via bandwidth proxy: {report['proxy_mb_per_sec']} MB/s")
+    print()
+    print(f"{'endpoint':<18}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, stats in report["latency"].items():
+        print(f"{endpoint:<18}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print()
+    db = report["db"]
+    print(f"db: locked_errors={db['locked_errors']} rollbacks={int(db['rollbacks'])} "
+          f"transaction_p99<={db['transaction_p99_s']}s query_p99<={db['query_p99_s']}s")
+    if report["server_log"]:
+        print(f"server log: {report['server_log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 yt-dlp를 사용한 오프라인 부하 테스트")
+    parser.add_argument("--jobs", type=int, default=100, help="제출할 작업 수")
+    parser.add_argument("--clients", type=int, default=10, help="동시 클라이언트 수")
+    parser.add_argument("--workers", type=int, default=4, help="서버 MAX_WORKERS")
+    parser.add_argument("--duration", type=float, default=1.0, help="작업당 가짜 다운로드 시간 (초)")
+    parser.add_argument("--size-mb", type=float, default=2.0, help="작업당 결과 파일 크기 (MB)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="가짜 yt-dlp 실패 확률 (0-1)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="이미 요청한 영상을 다시 요청하는 비율 (결과 공유/합류 경로)")
+    parser.add_argument("--media-link-mb", type=float, default=0,
+                        help="로컬 미디어 서버에서 실제로 받을 때 서버 전체 전송 속도 (MB/s, 0이면 미디어 서버 없이 시간만 지연)")
+    parser.add_argument("--media-connection-mb", type=float, default=0,
+                        help="로컬 미디어 서버의 연결당 전송 속도 (MB/s)")
+    parser.add_argument("--format", default="mp3", choices=["mp3", "mp4"])
+    parser.add_argument("--quality", default="192")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="/api/jobs 조회 간격 (초)")
+    parser.add_argument("--list-every", type=int, default=4, help="/api/jobs 조회 N번마다 /jobs 요청 (0이면 생략)")
+    parser.add_argument("--timeout", type=float, default=600, help="작업 완료 대기 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="서버에 전달할 환경 변수 (여러 번 사용 가능)")
+    parser.add_argument("--json", metavar="PATH", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--keep", action="store_true", help="임시 DB/다운로드/서버 로그를 삭제하지 않음")
+    args = parser.parse_args()
+
+    report = run(args)
+    _print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+벤치마크용 로컬 미디어 서버
+
+원본 서버(영상 CDN) 대신 지정한 크기의 바이트를 HTTP로 내려준다.
+FAKE_YTDLP_MEDIA_URL로 이 서버를 가리키면 가짜 yt-dlp가 --proxy / --concurrent-fragments를 지키며
+조각 단위로 받아, 대역폭 관리(DOWNLOAD_BANDWIDTH_LIMIT) 프록시를 네트워크 없이 측정할 수 있다.
+
+요청 형식
+    GET /fragment?bytes=<크기>
+
+사용 예
+    python bench/media_server.py --port 8099 --link-mb 20 --connection-mb 4
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+WRITE_CHUNK = 64 * 1024
+ZEROS = b"\0" * WRITE_CHUNK
+
+
+class Pacer:
+    """
+    초당 전송량 제한 (여러 스레드가 공유하면 전체 링크 용량 역할)
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self, size: int):
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + size / self.rate
+            delay = self._next - size / self.rate - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def make_handler(link: Optional[Pacer], connection_rate: float):
+    class MediaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            size = int(query.get("bytes", ["1048576"])[0])
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+
+            connection = Pacer(connection_rate) if connection_rate else None
+            sent = 0
+            while sent < size:
+                chunk = min(WRITE_CHUNK, size - sent)
+                if link:
+                    link.wait(chunk)
+                if connection:
+                    connection.wait(chunk)
+                self.wfile.write(ZEROS[:chunk])
+                sent += chunk
+
+        def log_message(self, format, *args):
+            pass
+
+    return MediaHandler
+
+
+def start(port: int = 0, link_rate: float = 0, connection_rate: float = 0) -> ThreadingHTTPServer:
+    """
+    백그라운드 스레드로 서버를 띄우고 반환 (server.server_address[1]이 실제 포트)
+
+    Args:
+        link_rate: 모든 연결이 나눠 쓰는 전송 속도 (bytes/s, 0이면 제한 없음)
+        connection_rate: 연결 하나의 전송 속도 (bytes/s, 0이면 제한 없음)
+    """
+    link = Pacer(link_rate) if link_rate else None
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(link, connection_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 로컬 미디어 서버")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--link-mb", type=float, default=0, help="전체 전송 속도 (MB/s, 0이면 제한 없음)")
+    parser.add_argument("--connection-mb", type=float, default=0, help="연결당 전송 속도 (MB/s, 0이면 제한 없음)")
+    args = parser.parse_args()
+
+    server = start(args.port, args.link_mb * 1024 * 1024, args.connection_mb * 1024 * 1024)
+    print(f"serving on http://127.0.0.1:{server.server_address[1]}/fragment")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
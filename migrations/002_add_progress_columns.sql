@@ -0,0 +1,15 @@
+-- Migration: Add download speed/eta columns to conversion_jobs table
+-- Date: 2026-10-17
+-- Description: Stores download speed (bytes/s) and ETA (seconds) parsed from yt-dlp output
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN speed INTEGER;
+ALTER TABLE conversion_jobs ADD COLUMN eta INTEGER;
+
+-- For PostgreSQL (if using PostgreSQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN speed INTEGER;
+-- ALTER TABLE conversion_jobs ADD COLUMN eta INTEGER;
+
+-- For MySQL (if using MySQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN speed INT;
+-- ALTER TABLE conversion_jobs ADD COLUMN eta INT;
@@ -0,0 +1,25 @@
+-- Migration: Add video_id column and conversion_artifacts table
+-- Date: 2026-10-17
+-- Description: Canonical YouTube video ID per job and a reference-counted index of converted files
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN video_id VARCHAR(32);
+CREATE INDEX ix_conversion_jobs_video_id ON conversion_jobs (video_id);
+
+CREATE TABLE conversion_artifacts (
+    id INTEGER PRIMARY KEY,
+    video_id VARCHAR(32) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    quality VARCHAR(10) NOT NULL,
+    title VARCHAR(500),
+    filename VARCHAR(255) NOT NULL UNIQUE,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_conversion_artifacts_id ON conversion_artifacts (id);
+CREATE INDEX ix_conversion_artifacts_key ON conversion_artifacts (video_id, format, quality);
+
+-- For PostgreSQL / MySQL (if using instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN video_id VARCHAR(32);
+-- CREATE INDEX ix_conversion_jobs_video_id ON conversion_jobs (video_id);
+-- (conversion_artifacts: 위와 동일, id는 SERIAL / AUTO_INCREMENT 사용)
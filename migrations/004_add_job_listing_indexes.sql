@@ -0,0 +1,7 @@
+-- Migration: Add composite indexes for the /jobs listing
+-- Date: 2026-10-17
+-- Description: Keyset pagination over (created_at, id) and status-filtered listing over (status, created_at, id)
+
+-- For SQLite / PostgreSQL / MySQL
+CREATE INDEX ix_conversion_jobs_created_at_id ON conversion_jobs (created_at, id);
+CREATE INDEX ix_conversion_jobs_status_created_at_id ON conversion_jobs (status, created_at, id);
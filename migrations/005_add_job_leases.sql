@@ -0,0 +1,15 @@
+-- Migration: Add job lease columns to conversion_jobs table
+-- Date: 2026-10-17
+-- Description: Worker ID and lease expiry used to claim jobs across processes/containers
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN claimed_by VARCHAR(64);
+ALTER TABLE conversion_jobs ADD COLUMN lease_expires_at DATETIME;
+
+-- For PostgreSQL (if using PostgreSQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN claimed_by VARCHAR(64);
+-- ALTER TABLE conversion_jobs ADD COLUMN lease_expires_at TIMESTAMP WITH TIME ZONE;
+
+-- For MySQL (if using MySQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN claimed_by VARCHAR(64);
+-- ALTER TABLE conversion_jobs ADD COLUMN lease_expires_at DATETIME;
@@ -0,0 +1,15 @@
+-- Migration: Add storage lifecycle columns to conversion_jobs table
+-- Date: 2026-10-17
+-- Description: Result file size and last download time used for size-budgeted LRU eviction of DOWNLOAD_DIR
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN file_size BIGINT;
+ALTER TABLE conversion_jobs ADD COLUMN last_downloaded_at DATETIME;
+
+-- For PostgreSQL (if using PostgreSQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN file_size BIGINT;
+-- ALTER TABLE conversion_jobs ADD COLUMN last_downloaded_at TIMESTAMP WITH TIME ZONE;
+
+-- For MySQL (if using MySQL instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN file_size BIGINT;
+-- ALTER TABLE conversion_jobs ADD COLUMN last_downloaded_at DATETIME;
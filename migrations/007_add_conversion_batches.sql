@@ -0,0 +1,24 @@
+-- Migration: Add conversion_batches table and batch_id column
+-- Date: 2026-10-17
+-- Description: Groups jobs created from one URL list / playlist submission for aggregate progress
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN batch_id VARCHAR(36);
+CREATE INDEX ix_conversion_jobs_batch_id ON conversion_jobs (batch_id);
+
+CREATE TABLE conversion_batches (
+    id INTEGER PRIMARY KEY,
+    batch_id VARCHAR(36) UNIQUE,
+    source_url TEXT,
+    format VARCHAR(10) NOT NULL,
+    quality VARCHAR(10) NOT NULL,
+    total INTEGER NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_conversion_batches_id ON conversion_batches (id);
+CREATE UNIQUE INDEX ix_conversion_batches_batch_id ON conversion_batches (batch_id);
+
+-- For PostgreSQL / MySQL (if using instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN batch_id VARCHAR(36);
+-- CREATE INDEX ix_conversion_jobs_batch_id ON conversion_jobs (batch_id);
+-- (conversion_batches: 위와 동일, id는 SERIAL / AUTO_INCREMENT 사용)
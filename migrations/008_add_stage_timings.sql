@@ -0,0 +1,9 @@
+-- Migration: Add stage_timings column
+-- Date: 2026-10-17
+-- Description: Stores per-stage durations (queue wait, metadata, download, postprocess, total) as JSON for each finished job
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN stage_timings TEXT;
+
+-- For PostgreSQL / MySQL (if using instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN stage_timings TEXT;
@@ -0,0 +1,15 @@
+-- Migration: Add scheduling columns
+-- Date: 2026-10-17
+-- Description: Adds submitter, priority and duration for fair-share / priority / shortest-job-first scheduling
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN submitter VARCHAR(64);
+ALTER TABLE conversion_jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversion_jobs ADD COLUMN duration INTEGER;
+CREATE INDEX ix_conversion_jobs_status_submitter_priority ON conversion_jobs (status, submitter, priority, created_at);
+
+-- For PostgreSQL / MySQL (if using instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN submitter VARCHAR(64);
+-- ALTER TABLE conversion_jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0;
+-- ALTER TABLE conversion_jobs ADD COLUMN duration INTEGER;
+-- CREATE INDEX ix_conversion_jobs_status_submitter_priority ON conversion_jobs (status, submitter, priority, created_at);
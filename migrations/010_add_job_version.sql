@@ -0,0 +1,9 @@
+-- Migration: Add job version column
+-- Date: 2026-10-17
+-- Description: Adds a per-job version counter used as the ETag of the job status APIs
+
+-- For SQLite
+ALTER TABLE conversion_jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+
+-- For PostgreSQL / MySQL (if using instead)
+-- ALTER TABLE conversion_jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
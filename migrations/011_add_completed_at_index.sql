@@ -0,0 +1,6 @@
+-- Migration: Add completed_at index
+-- Date: 2026-10-17
+-- Description: Index for the admission controller's recent-throughput count (completed_at range scan)
+
+-- For SQLite / PostgreSQL / MySQL
+CREATE INDEX ix_conversion_jobs_completed_at ON conversion_jobs (completed_at);
@@ -0,0 +1,11 @@
+-- Migration: Reorder the scheduler candidate index
+-- Date: 2026-10-17
+-- Description: Matches the per-submitter candidate query ORDER BY (priority DESC, created_at, id) so each submitter's LIMIT stops early instead of sorting its whole backlog
+
+-- For SQLite / PostgreSQL
+DROP INDEX IF EXISTS ix_conversion_jobs_status_submitter_priority;
+CREATE INDEX ix_conversion_jobs_status_submitter_priority ON conversion_jobs (status, submitter, priority DESC, created_at, id);
+
+-- For MySQL (if using instead)
+-- DROP INDEX ix_conversion_jobs_status_submitter_priority ON conversion_jobs;
+-- CREATE INDEX ix_conversion_jobs_status_submitter_priority ON conversion_jobs (status, submitter, priority DESC, created_at, id);